@@ -0,0 +1,84 @@
+"""Request throughput of AsyncBankDatabase with many concurrent clients.
+
+Starts the given number of client coroutines against one AsyncBankDatabase.
+Each client sends a stream of requests: mostly balance reads, plus deposits
+and transfers. The benchmark runs once with calls on the event loop and once
+offloaded to a thread pool, and reports requests/sec and how many account
+reads were coalesced.
+
+Usage:
+    python -m f5.benchmarks.async_clients [--clients 1000] [--requests 100]
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from f5.demo.async_database import AsyncBankDatabase
+from f5.demo.database import BankDatabase
+from f5.demo.storage import ConcurrentMemoryStorage
+
+
+def make_database(accounts):
+    """Create a database with one funded account per user."""
+    database = BankDatabase(storage=ConcurrentMemoryStorage())
+    users = database.bulk_create_users(
+        {"name": f"User {i}", "email": f"user{i}@example.com"} for i in range(accounts)
+    )
+    database.bulk_create_accounts((user.id, "checking", 1000.0) for user in users)
+    return database
+
+
+async def client(database, account_ids, requests, seed):
+    """Send a stream of requests from one client."""
+    rng = random.Random(seed)
+    for _ in range(requests):
+        roll = rng.random()
+        if roll < 0.8:
+            await database.get_account(rng.choice(account_ids))
+        elif roll < 0.9:
+            await database.deposit(rng.choice(account_ids), 1)
+        else:
+            try:
+                await database.transfer(rng.choice(account_ids), rng.choice(account_ids), 1)
+            except ValueError:
+                pass  # Insufficient funds is an ordinary outcome here
+
+
+async def run(clients, requests, accounts, executor):
+    """Run all clients to completion on a fresh database.
+
+    Returns:
+        A tuple of (requests per second, coalesced account reads)
+    """
+    database = AsyncBankDatabase(make_database(accounts), executor=executor)
+    account_ids = [account.id for account in database.database.get_all_accounts()]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(database, account_ids, requests, seed)
+                           for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    return clients * requests / elapsed, database.coalesced_reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100,
+                        help="requests sent by each client")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8,
+                        help="thread pool size for the offloaded run")
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'clients':>8} {'requests/sec':>13} {'coalesced':>10}")
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        for mode, pool in (("inline", None), ("offload", executor)):
+            throughput, coalesced = asyncio.run(
+                run(args.clients, args.requests, args.accounts, pool))
+            print(f"{mode:>8} {args.clients:>8} {throughput:>13,.0f} {coalesced:>10,}")
+
+
+if __name__ == "__main__":
+    main()
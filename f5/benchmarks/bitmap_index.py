@@ -0,0 +1,120 @@
+"""Memory and speed of BankBitmapIndex against the set-based BankIndex.
+
+Indexes two low-cardinality account fields (account_type and a status)
+with both index kinds and compares the memory each index takes and the
+time of AND, OR, AND NOT and count lookups, checking that both return the
+same accounts.
+
+Usage:
+    python -m f5.benchmarks.bitmap_index [--accounts N] [--repeat 3]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from f5.demo.bitmap import BankBitmapIndex, RowIds
+from f5.demo.index import BankIndex
+
+ACCOUNT_TYPES = ("checking", "savings", "business")
+STATUSES = ("active", "active", "active", "dormant", "frozen")
+
+
+class _Account:
+    """Stand-in account holding only the indexed fields."""
+
+    __slots__ = ("id", "account_type", "status")
+
+
+def accounts(ids, seed=0):
+    """Generate accounts with random field values, reusing one object."""
+    rng = random.Random(seed)
+    account = _Account()
+    for record_id in ids:
+        account.id = record_id
+        account.account_type = rng.choice(ACCOUNT_TYPES)
+        account.status = rng.choice(STATUSES)
+        yield account
+
+
+def build(index_class, ids):
+    """Build an account_type and a status index.
+
+    Returns:
+        A tuple of (type index, status index, bytes allocated)
+    """
+    tracemalloc.start()
+    by_type, by_status = index_class("account_type"), index_class("status")
+    for account in accounts(ids):
+        by_type.add_account(account)
+        by_status.add_account(account)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return by_type, by_status, size
+
+
+def set_lookups(by_type, by_status):
+    """Lookups on set indexes: name -> function returning a result size."""
+    return {
+        "savings AND active": lambda: len(by_type.find("savings") & by_status.find("active")),
+        "checking OR business": lambda: len(by_type.find("checking") | by_type.find("business")),
+        "savings AND NOT frozen": lambda: len(by_type.find("savings") - by_status.find("frozen")),
+        "count savings": lambda: len(by_type.find("savings")),
+    }
+
+
+def bitmap_lookups(by_type, by_status):
+    """The same lookups on bitmap indexes."""
+    return {
+        "savings AND active": lambda: len(by_type.bitmap("savings") & by_status.bitmap("active")),
+        "checking OR business": lambda: len(
+            by_type.bitmap("checking") | by_type.bitmap("business")),
+        "savings AND NOT frozen": lambda: len(
+            by_type.bitmap("savings") - by_status.bitmap("frozen")),
+        "count savings": lambda: by_type.count("savings"),
+    }
+
+
+def timed(lookup, repeat):
+    """Run a lookup and return (best seconds, result size)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = lookup()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Created up front, as a storage would, so neither index is charged for them
+    ids = [str(i) for i in range(1, args.accounts + 1)]
+
+    set_type, set_status, set_bytes = build(BankIndex, ids)
+    bitmap_type, bitmap_status, bitmap_bytes = build(BankBitmapIndex, ids)
+    if set(RowIds(bitmap_type.bitmap("savings"))) != set_type.find("savings"):
+        raise AssertionError("Bitmap and set indexes disagree")
+
+    print(f"{args.accounts:,} accounts, two indexes each")
+    print(f"{'':<28} {'set':>12} {'bitmap':>12} {'ratio':>8}")
+    print(f"{'memory (MiB)':<28} {set_bytes / 2**20:>12.1f} {bitmap_bytes / 2**20:>12.1f} "
+          f"{set_bytes / bitmap_bytes:>8.1f}")
+
+    set_queries = set_lookups(set_type, set_status)
+    bitmap_queries = bitmap_lookups(bitmap_type, bitmap_status)
+    for name, lookup in set_queries.items():
+        set_time, expected = timed(lookup, args.repeat)
+        bitmap_time, size = timed(bitmap_queries[name], args.repeat)
+        if size != expected:
+            raise AssertionError(f"{name}: {size} rows from bitmaps, {expected} from sets")
+        print(f"{name + ' (ms)':<28} {set_time * 1e3:>12.2f} {bitmap_time * 1e3:>12.2f} "
+              f"{set_time / bitmap_time:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Multi-threaded stress benchmark for BankDatabase storage backends.
+
+Runs the same mixed read/write workload against one shared BankDatabase from
+a growing number of threads, once on MemoryStorage and once on
+ConcurrentMemoryStorage, and reports throughput together with the number of
+records lost to duplicate IDs.
+
+Usage:
+    python -m f5.benchmarks.concurrency [--ops N] [--threads 1,2,4,8] [--writes 0.2]
+"""
+import argparse
+import random
+import threading
+import time
+
+from f5.demo.database import BankDatabase
+from f5.demo.storage import ConcurrentMemoryStorage, MemoryStorage
+
+STORAGES = {
+    "memory": MemoryStorage,
+    "concurrent": ConcurrentMemoryStorage,
+}
+
+
+def make_database(storage_class, users=10_000):
+    """Create a database with one account per user."""
+    database = BankDatabase(storage=storage_class())
+    created = database.bulk_create_users(
+        {"name": f"User {i}", "email": f"user{i}@example.com"} for i in range(users)
+    )
+    database.bulk_create_accounts((user.id, "checking", 100.0) for user in created)
+    return database
+
+
+def worker(database, user_ids, account_ids, ops, write_ratio, seed, counts):
+    """Run a share of the mixed workload and record how many records it created."""
+    rng = random.Random(seed)
+    created_users = created_accounts = 0
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < write_ratio / 2:
+            database.create_user("New User", "new@example.com")
+            created_users += 1
+        elif roll < write_ratio:
+            database.create_account(rng.choice(user_ids), "savings")
+            created_accounts += 1
+        elif roll < (1 + write_ratio) / 2:
+            database.get_user(rng.choice(user_ids))
+        else:
+            database.get_account(rng.choice(account_ids))
+    counts.append((created_users, created_accounts))
+
+
+def run(storage_class, threads, ops, write_ratio):
+    """Run the workload on a fresh database.
+
+    Returns:
+        A tuple of (operations per second, records lost to duplicate IDs)
+    """
+    database = make_database(storage_class)
+    user_ids = [user.id for user in database.get_all_users()]
+    account_ids = [account.id for account in database.get_all_accounts()]
+    users_before, accounts_before = len(user_ids), len(account_ids)
+
+    counts = []
+    share = ops // threads
+    pool = [
+        threading.Thread(target=worker, args=(database, user_ids, account_ids,
+                                              share, write_ratio, seed, counts))
+        for seed in range(threads)
+    ]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    expected = (users_before + sum(users for users, _ in counts) +
+                accounts_before + sum(accounts for _, accounts in counts))
+    stored = len(database.get_all_users()) + len(database.get_all_accounts())
+    return share * threads / elapsed, expected - stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=400_000)
+    parser.add_argument("--threads", default="1,2,4,8",
+                        help="comma-separated thread counts")
+    parser.add_argument("--writes", type=float, default=0.2,
+                        help="fraction of operations that create records")
+    args = parser.parse_args()
+
+    print(f"{'storage':>10} {'threads':>8} {'ops/sec':>12} {'lost':>6}")
+    for name, storage_class in STORAGES.items():
+        for threads in (int(count) for count in args.threads.split(",")):
+            throughput, lost = run(storage_class, threads, args.ops, args.writes)
+            print(f"{name:>10} {threads:>8} {throughput:>12,.0f} {lost:>6}")
+
+
+if __name__ == "__main__":
+    main()
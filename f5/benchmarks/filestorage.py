@@ -0,0 +1,89 @@
+"""Write throughput and restart time benchmark for FileStorage.
+
+Creates users, accounts and deposits through BankDatabase with different
+group commit batch sizes, then measures how long reopening the storage
+takes when replaying the whole log and after compacting it into a snapshot.
+
+Usage:
+    python -m f5.benchmarks.filestorage [--users N] [--batches 1,10,100,1000]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from f5.demo.database import BankDatabase
+from f5.demo.storage import FileStorage
+
+
+def write_workload(database, users):
+    """Create users with one account each and deposit into every account.
+
+    Returns:
+        Number of storage writes performed
+    """
+    for i in range(users):
+        user = database.create_user(f"User {i}", f"user{i}@example.com")
+        account = database.create_account(user.id, "checking", 100.0)
+        database.deposit(account.id, 1.0)
+    return users * 3
+
+
+def run(users, batches):
+    """Measure write throughput per batch size and restart times.
+
+    Returns:
+        Dict with "writes" mapping sync_every to writes/sec, and "restart"
+        mapping "log" and "snapshot" to seconds
+    """
+    results = {"writes": {}, "restart": {}}
+    for sync_every in batches:
+        path = tempfile.mkdtemp()
+        try:
+            storage = FileStorage(path, sync_every=sync_every, compact_every=None)
+            start = time.perf_counter()
+            writes = write_workload(BankDatabase(storage=storage), users)
+            storage.close()
+            results["writes"][sync_every] = writes / (time.perf_counter() - start)
+        finally:
+            shutil.rmtree(path)
+
+    path = tempfile.mkdtemp()
+    try:
+        storage = FileStorage(path, sync_every=max(batches), compact_every=None)
+        write_workload(BankDatabase(storage=storage), users)
+        storage.close()
+
+        start = time.perf_counter()
+        storage = FileStorage(path, compact_every=None)
+        results["restart"]["log"] = time.perf_counter() - start
+
+        storage.compact()
+        storage.close()
+        start = time.perf_counter()
+        FileStorage(path, compact_every=None).close()
+        results["restart"]["snapshot"] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--batches", default="1,10,100,1000",
+                        help="comma-separated sync_every values")
+    args = parser.parse_args()
+    batches = [int(batch) for batch in args.batches.split(",")]
+
+    results = run(args.users, batches)
+    print(f"{args.users:,} users, {args.users * 3:,} writes per run")
+    print(f"{'sync_every':>10} {'writes/sec':>12}")
+    for sync_every, rate in results["writes"].items():
+        print(f"{sync_every:>10} {rate:>12,.0f}")
+    print(f"restart from log:      {results['restart']['log']:.3f}s")
+    print(f"restart from snapshot: {results['restart']['snapshot']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Memory benchmark for bank records.
+
+Builds the same users and accounts with the old __dict__-based record layout
+and with the slotted User/Account classes, and reports bytes per record. Field values are created up front so only the record overhead is
+measured.
+
+Usage:
+    python -m f5.benchmarks.memory [--users N] [--accounts N]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from f5.demo.record import User, Account
+
+
+class DictUser:
+    """User with a per-instance __dict__, as records were before __slots__."""
+
+    def __init__(self, user_id=None, name=None, email=None, address=None):
+        self.id = user_id
+        self.name = name
+        self.email = email
+        self.address = address
+
+
+class DictAccount:
+    """Account with a per-instance __dict__, as records were before __slots__."""
+
+    def __init__(self, account_id=None, user_id=None, account_type=None, balance=0.0):
+        self.id = account_id
+        self.user_id = user_id
+        self.account_type = account_type
+        self.balance = balance
+
+
+ACCOUNT_TYPES = ("checking", "savings", "credit")
+
+
+def make_values(users, accounts):
+    """Create the field values shared by every layout."""
+    user_ids = [str(i) for i in range(1, users + 1)]
+    names = [f"User {i}" for i in range(users)]
+    emails = [f"user{i}@example.com" for i in range(users)]
+    account_ids = [str(i) for i in range(1, accounts + 1)]
+    balances = [float(i % 10000) for i in range(accounts)]
+    return user_ids, names, emails, account_ids, balances
+
+
+def measure(build):
+    """Run build() and return the bytes it allocated and kept alive."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(users, accounts):
+    """Measure bytes per user and per account for each record layout.
+
+    Returns:
+        Dict mapping layout name to (bytes per user, bytes per account)
+    """
+    user_ids, names, emails, account_ids, balances = make_values(users, accounts)
+
+    def build_users(cls):
+        return [cls(user_ids[i], names[i], emails[i]) for i in range(users)]
+
+    def build_accounts(cls):
+        return [
+            cls(account_ids[i], user_ids[i % users], ACCOUNT_TYPES[i % 3], balances[i])
+            for i in range(accounts)
+        ]
+
+    results = {
+        "dict": (measure(lambda: build_users(DictUser)) / users,
+                 measure(lambda: build_accounts(DictAccount)) / accounts),
+        "slots": (measure(lambda: build_users(User)) / users,
+                  measure(lambda: build_accounts(Account)) / accounts),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=3_000_000)
+    args = parser.parse_args()
+
+    results = run(args.users, args.accounts)
+    print(f"{args.users:,} users, {args.accounts:,} accounts")
+    print(f"{'layout':<10} {'bytes/user':>12} {'bytes/account':>14}")
+    for layout, (per_user, per_account) in results.items():
+        print(f"{layout:<10} {per_user:>12.1f} {per_account:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
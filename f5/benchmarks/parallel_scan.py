@@ -0,0 +1,81 @@
+"""Speedup of parallel BankQuery scans against the number of processes.
+
+Builds a large account collection and runs a filtered, sorted full-scan
+query sequentially and with each process count, checking that every run
+returns the same results.
+
+Usage:
+    python -m f5.benchmarks.parallel_scan [--accounts N] [--processes 2,4,8,16,32]
+"""
+import argparse
+import os
+import random
+import time
+
+from f5.demo.database import BankDatabase
+from f5.demo.query import BankQuery
+
+
+def make_database(accounts, seed=0):
+    """Create a database with random accounts spread over some users."""
+    rng = random.Random(seed)
+    database = BankDatabase()
+    users = database.bulk_create_users(
+        {"name": f"User {i}", "email": f"user{i}@example.com"} for i in range(accounts // 10)
+    )
+    database.bulk_create_accounts(
+        (rng.choice(users).id, rng.choice(("checking", "savings", "business")),
+         round(rng.uniform(0, 10_000), 2))
+        for _ in range(accounts)
+    )
+    return database
+
+
+def build_query(database, processes):
+    """Build the benchmark query, parallel when processes is set."""
+    query = (BankQuery(database).accounts()
+             .filter_account_type("savings")
+             .filter_min_balance(5_000)
+             .sort_by("balance", reverse=True))
+    return query.parallel(processes) if processes else query
+
+
+def timed(database, processes, repeat):
+    """Run the query and return (best seconds, result IDs)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = build_query(database, processes).execute()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, [record.id for record in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=2_000_000)
+    parser.add_argument("--processes", default=None,
+                        help="comma-separated process counts, defaults to powers of two "
+                             "up to the CPU count")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.processes:
+        counts = [int(count) for count in args.processes.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        counts = [2 ** power for power in range(1, cpus.bit_length()) if 2 ** power <= cpus]
+
+    database = make_database(args.accounts)
+    baseline, expected = timed(database, None, args.repeat)
+    print(f"{'processes':>9} {'seconds':>8} {'speedup':>8}")
+    print(f"{1:>9} {baseline:>8.3f} {1.0:>8.2f}")
+    for processes in counts:
+        seconds, ids = timed(database, processes, args.repeat)
+        if ids != expected:
+            raise AssertionError(f"Parallel results differ with {processes} processes")
+        print(f"{processes:>9} {seconds:>8.3f} {baseline / seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
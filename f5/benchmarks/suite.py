@@ -0,0 +1,248 @@
+"""Reproducible benchmark suite for the f5 bank database.
+
+For each scale, builds a seeded synthetic dataset (one user and one account
+per record), then times single operations and a matrix of BankQuery shapes,
+first without indexes and then with them. Reports throughput, p50/p99
+latency and the peak memory of building the dataset as JSON, and flags
+regressions against a stored baseline.
+
+Usage:
+    python -m f5.benchmarks.suite [--scales 10000,100000] [--output results.json]
+        [--baseline baseline.json] [--save-baseline baseline.json] [--threshold 0.2]
+
+Exits with status 1 when a regression is found.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from f5.demo.database import BankDatabase
+from f5.demo.query import BankQuery
+
+ACCOUNT_TYPES = ("checking", "savings", "business")
+
+# Query matrix: name -> function building a query from the database, a
+# random generator and the number of users
+QUERIES = {
+    "email_lookup": lambda database, rng, users: BankQuery(database).filter_email(
+        f"user{rng.randrange(users)}@example.com"),
+    "account_type": lambda database, rng, users: BankQuery(database).filter_account_type(
+        rng.choice(ACCOUNT_TYPES)),
+    "balance_range": lambda database, rng, users: BankQuery(database).accounts()
+        .filter_min_balance(5_000).filter_max_balance(5_050),
+    "name_contains": lambda database, rng, users: BankQuery(database).filter_name(
+        f"son{rng.randrange(users)}"),
+    "sorted_top10": lambda database, rng, users: BankQuery(database).accounts()
+        .sort_by("balance", reverse=True).limit(10),
+}
+
+# Indexes created for the indexed half of the query matrix
+INDEXES = (
+    ("users", "email", "hash"),
+    ("users", "name", "text"),
+    ("accounts", "account_type", "hash"),
+    ("accounts", "balance", "sorted"),
+)
+
+
+def percentile(sorted_values, fraction):
+    """Get a nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[position]
+
+
+def summarize(latencies_ns):
+    """Turn per-call latencies into throughput and percentiles."""
+    latencies = sorted(latencies_ns)
+    total = sum(latencies) / 1e9
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else 0.0,
+        "p50_us": percentile(latencies, 0.50) / 1e3,
+        "p99_us": percentile(latencies, 0.99) / 1e3,
+    }
+
+
+def measure(calls):
+    """Time each call in an iterable of zero-argument functions."""
+    latencies = []
+    clock = time.perf_counter_ns
+    for call in calls:
+        start = clock()
+        try:
+            call()
+        except ValueError:
+            pass  # Failed operations, such as overdrawn transfers, still count
+        latencies.append(clock() - start)
+    return summarize(latencies)
+
+
+def build_dataset(scale, rng):
+    """Create a database with scale users and scale accounts.
+
+    Returns:
+        A tuple of (database, dataset report)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    database = BankDatabase()
+    users = database.bulk_create_users(
+        {"name": f"User {i} Johnson{i}", "email": f"user{i}@example.com"} for i in range(scale)
+    )
+    database.bulk_create_accounts(
+        (user.id, rng.choice(ACCOUNT_TYPES), round(rng.uniform(1_000, 10_000), 2))
+        for user in users
+    )
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return database, {
+        "users": scale,
+        "accounts": scale,
+        "build_seconds": seconds,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_scale(scale, seed, samples, query_samples):
+    """Run every benchmark at one scale.
+
+    Returns:
+        Dict with the "dataset" report and per-operation "operations" results
+    """
+    rng = random.Random(seed)
+    database, dataset = build_dataset(scale, rng)
+    user_ids = [user.id for user in database.get_all_users()]
+    account_ids = [account.id for account in database.get_all_accounts()]
+    samples = min(samples, scale)
+    operations = {}
+
+    operations["create_user"] = measure(
+        lambda i=i: database.create_user(f"New {i}", f"new{i}@example.com")
+        for i in range(samples))
+    operations["create_account"] = measure(
+        lambda user_id=rng.choice(user_ids): database.create_account(user_id, "savings", 100.0)
+        for _ in range(samples))
+    operations["deposit"] = measure(
+        lambda account_id=rng.choice(account_ids): database.deposit(account_id, 10)
+        for _ in range(samples))
+    operations["withdraw"] = measure(
+        lambda account_id=rng.choice(account_ids): database.withdraw(account_id, 10)
+        for _ in range(samples))
+    operations["transfer"] = measure(
+        lambda pair=(rng.choice(account_ids), rng.choice(account_ids)):
+            database.transfer(pair[0], pair[1], 10)
+        for _ in range(samples))
+    operations["get_user_accounts"] = measure(
+        lambda user_id=rng.choice(user_ids): database.get_user_accounts(user_id)
+        for _ in range(samples))
+
+    for indexed in (False, True):
+        if indexed:
+            for collection, field, kind in INDEXES:
+                database.create_index(collection, field, kind)
+        suffix = "indexed" if indexed else "scan"
+        for name, build in QUERIES.items():
+            queries = [build(database, rng, scale).execute for _ in range(query_samples)]
+            operations[f"query_{name}_{suffix}"] = measure(queries)
+
+    # Last, since it shrinks the dataset
+    doomed = rng.sample(user_ids, samples)
+    operations["delete_user"] = measure(
+        lambda user_id=user_id: database.delete_user(user_id) for user_id in doomed)
+
+    return {"dataset": dataset, "operations": operations}
+
+
+def compare(results, baseline, threshold):
+    """Find operations that got slower than the baseline.
+
+    An operation regresses when its p50 latency or its throughput is worse
+    than the baseline's by more than threshold (a fraction).
+
+    Returns:
+        List of (scale, operation, metric, baseline value, current value)
+    """
+    regressions = []
+    for scale, current in results["results"].items():
+        previous = baseline.get("results", {}).get(scale)
+        if previous is None:
+            continue
+        for name, stats in current["operations"].items():
+            old = previous["operations"].get(name)
+            if old is None:
+                continue
+            if stats["p50_us"] > old["p50_us"] * (1 + threshold):
+                regressions.append((scale, name, "p50_us", old["p50_us"], stats["p50_us"]))
+            if stats["ops_per_sec"] < old["ops_per_sec"] / (1 + threshold):
+                regressions.append((scale, name, "ops_per_sec",
+                                    old["ops_per_sec"], stats["ops_per_sec"]))
+        old_peak = previous["dataset"]["peak_memory_bytes"]
+        new_peak = current["dataset"]["peak_memory_bytes"]
+        if new_peak > old_peak * (1 + threshold):
+            regressions.append((scale, "dataset", "peak_memory_bytes", old_peak, new_peak))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000",
+                        help="comma-separated dataset sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=2000,
+                        help="calls timed per single-record operation")
+    parser.add_argument("--query-samples", type=int, default=20,
+                        help="runs timed per query shape")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against this JSON report")
+    parser.add_argument("--save-baseline", help="also write the report here as a new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown as a fraction before flagging a regression")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "samples": args.samples,
+            "query_samples": args.query_samples,
+        },
+        "results": {},
+    }
+    for scale in scales:
+        print(f"scale {scale:,}...", file=sys.stderr)
+        results["results"][str(scale)] = run_scale(
+            scale, args.seed, args.samples, args.query_samples)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for scale, name, metric, old, new in regressions:
+            print(f"REGRESSION scale={scale} {name} {metric}: {old:,.1f} -> {new:,.1f}",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("no regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Throughput benchmark for TransferEngine under contention.
+
+Runs the same batch of random transfers with different thread counts, once
+over a few hot accounts (high contention) and once over many accounts (low
+contention), and checks that no money was created or lost.
+
+Usage:
+    python -m f5.benchmarks.transfers [--transfers N] [--workers 1,2,4,8]
+"""
+import argparse
+import random
+
+from f5.demo.database import BankDatabase
+from f5.demo.transfer import TransferEngine
+
+
+def make_database(accounts):
+    """Create a database with one funded account per user."""
+    database = BankDatabase()
+    users = database.bulk_create_users(
+        {"name": f"User {i}", "email": f"user{i}@example.com"} for i in range(accounts)
+    )
+    database.bulk_create_accounts((user.id, "checking", 1000.0) for user in users)
+    return database
+
+
+def run(transfers, accounts, workers, seed=0):
+    """Run a random transfer batch and return the engine report."""
+    database = make_database(accounts)
+    ids = [account.id for account in database.get_all_accounts()]
+    total_before = sum(account.balance for account in database.get_all_accounts())
+
+    rng = random.Random(seed)
+    batch = [(rng.choice(ids), rng.choice(ids), rng.randint(1, 50)) for _ in range(transfers)]
+    report = TransferEngine(database, workers=workers).run(batch)
+
+    total_after = sum(account.balance for account in database.get_all_accounts())
+    if total_after != total_before:
+        raise AssertionError(f"Balance drift: {total_before} -> {total_after}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transfers", type=int, default=100_000)
+    parser.add_argument("--workers", default="1,2,4,8",
+                        help="comma-separated thread counts")
+    args = parser.parse_args()
+
+    print(f"{'accounts':>8} {'workers':>8} {'transfers/sec':>14} {'failed':>8}")
+    for accounts in (10, 10_000):
+        for workers in (int(count) for count in args.workers.split(",")):
+            report = run(args.transfers, accounts, workers)
+            print(f"{accounts:>8} {workers:>8} {report['transfers_per_sec']:>14,.0f} "
+                  f"{report['failed']:>8}")
+
+
+if __name__ == "__main__":
+    main()
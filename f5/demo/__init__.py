@@ -1,22 +1,45 @@
-from .database import Database, BankDatabase
+from .database import Database, Collection, BankDatabase
+from .snapshot import Snapshot
+from .async_database import AsyncBankDatabase
 from .record import Record, User, Account, BankRecord
-from .storage import Storage, MemoryStorage, FileStorage, BankStorage
-from .index import Index, BankIndex
+from .storage import Storage, MemoryStorage, ConcurrentMemoryStorage, FileStorage, BankStorage
+from .cache import CachingStorage
+from .aggregates import BalanceAggregates
+from .columnar import ColumnarStorage
+from .mapped import MappedStorage
+from .index import Index, BankIndex, BankCompositeIndex, BankSortedIndex, BankTextIndex
+from .bitmap import Bitmap, BitmapIndex, BankBitmapIndex
 from .query import Query, BankQuery
+from .transfer import TransferEngine
 
 __all__ = [
     'Database',
+    'Collection',
     'BankDatabase',
+    'Snapshot',
+    'AsyncBankDatabase',
     'Record',
     'User',
     'Account',
     'BankRecord',
     'Storage',
     'MemoryStorage',
+    'ConcurrentMemoryStorage',
     'FileStorage',
     'BankStorage',
+    'CachingStorage',
+    'BalanceAggregates',
+    'ColumnarStorage',
+    'MappedStorage',
     'Index',
     'BankIndex',
+    'BankCompositeIndex',
+    'BankSortedIndex',
+    'BankTextIndex',
+    'Bitmap',
+    'BitmapIndex',
+    'BankBitmapIndex',
     'Query',
-    'BankQuery'
+    'BankQuery',
+    'TransferEngine'
 ]
\ No newline at end of file
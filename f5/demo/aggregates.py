@@ -0,0 +1,232 @@
+import heapq
+import math
+import threading
+from collections import Counter
+
+
+class _ExactSum:
+    """Running float sum that can also subtract without accumulating error.
+
+    The value is kept as a list of non-overlapping partial sums, so it
+    always equals math.fsum() of the values added so far.
+    """
+
+    __slots__ = ("_partials",)
+
+    def __init__(self):
+        self._partials = []
+
+    def add(self, value):
+        """Add a value; subtract by adding its negation."""
+        i = 0
+        partials = self._partials
+        for partial in partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                partials[i] = low
+                i += 1
+            value = high
+        partials[i:] = [value]
+
+    @property
+    def value(self):
+        return math.fsum(self._partials)
+
+
+class BalanceGroup:
+    """Count, sum, min and max of the balances in one group of accounts.
+
+    Sum and count change in O(1). Minimum and maximum come from a pair of
+    heaps with lazy deletion: removed balances stay in the heaps until they
+    reach the top, and the heaps are rebuilt when stale entries outnumber
+    live ones.
+    """
+
+    __slots__ = ("count", "_sum", "_live", "_low", "_high", "_stale")
+
+    def __init__(self):
+        self.count = 0
+        self._sum = _ExactSum()
+        self._live = Counter()  # balance -> number of accounts holding it
+        self._low = []  # min-heap of balances
+        self._high = []  # max-heap of negated balances
+        self._stale = 0
+
+    def add(self, balance):
+        """Add an account's balance to the group."""
+        self.count += 1
+        if balance is None:
+            return
+        self._sum.add(balance)
+        self._live[balance] += 1
+        heapq.heappush(self._low, balance)
+        heapq.heappush(self._high, -balance)
+
+    def remove(self, balance):
+        """Remove an account's balance from the group."""
+        self.count -= 1
+        if balance is None:
+            return
+        self._sum.add(-balance)
+        self._live[balance] -= 1
+        if not self._live[balance]:
+            del self._live[balance]
+        self._stale += 1
+        if self._stale > len(self._low) // 2:
+            self._rebuild()
+
+    def _rebuild(self):
+        """Drop stale heap entries."""
+        self._low = list(self._live.elements())
+        heapq.heapify(self._low)
+        self._high = [-balance for balance in self._low]
+        heapq.heapify(self._high)
+        self._stale = 0
+
+    @property
+    def total(self):
+        """Sum of the balances."""
+        return self._sum.value
+
+    @property
+    def minimum(self):
+        """Smallest balance, or None if the group has none."""
+        while self._low and self._low[0] not in self._live:
+            heapq.heappop(self._low)
+        return self._low[0] if self._low else None
+
+    @property
+    def maximum(self):
+        """Largest balance, or None if the group has none."""
+        while self._high and -self._high[0] not in self._live:
+            heapq.heappop(self._high)
+        return -self._high[0] if self._high else None
+
+    def summary(self):
+        """Get the group's aggregates as a dict."""
+        return {"count": self.count, "sum": self.total,
+                "min": self.minimum, "max": self.maximum}
+
+
+class BalanceAggregates:
+    """Running balance aggregates per user, per account type and bank-wide.
+
+    BankDatabase keeps these up to date from its write hooks, so reading
+    an aggregate never scans the accounts.
+    """
+
+    def __init__(self, accounts=()):
+        """Initialize the aggregates.
+
+        Args:
+            accounts: Existing accounts to start from
+        """
+        self._bank = BalanceGroup()
+        self._users = {}  # user_id -> BalanceGroup
+        self._types = {}  # account_type -> BalanceGroup
+        self._lock = threading.Lock()
+        self.add_accounts(accounts)
+
+    def _groups(self, user_id, account_type, create):
+        """Get the bank, user and account type groups an account belongs to."""
+        if create:
+            return (self._bank,
+                    self._users.setdefault(user_id, BalanceGroup()),
+                    self._types.setdefault(account_type, BalanceGroup()))
+        return self._bank, self._users[user_id], self._types[account_type]
+
+    def _add(self, user_id, account_type, balance):
+        for group in self._groups(user_id, account_type, create=True):
+            group.add(balance)
+
+    def _remove(self, user_id, account_type, balance):
+        for group in self._groups(user_id, account_type, create=False):
+            group.remove(balance)
+        # Forget empty groups, so deleted users don't linger
+        if not self._users[user_id].count:
+            del self._users[user_id]
+        if not self._types[account_type].count:
+            del self._types[account_type]
+
+    # Write notifications from BankDatabase
+
+    def add_accounts(self, accounts):
+        """Count newly created accounts."""
+        with self._lock:
+            for account in accounts:
+                self._add(account.user_id, account.account_type, account.balance)
+
+    def remove_accounts(self, accounts):
+        """Stop counting deleted accounts."""
+        with self._lock:
+            for account in accounts:
+                self._remove(account.user_id, account.account_type, account.balance)
+
+    def update_account(self, account, old_values):
+        """Move an account's balance after an in-place update.
+
+        Args:
+            account: The account in its new state
+            old_values: Field values from before the update
+        """
+        with self._lock:
+            self._remove(old_values["user_id"], old_values["account_type"],
+                         old_values["balance"])
+            self._add(account.user_id, account.account_type, account.balance)
+
+    # Reading
+
+    def bank(self):
+        """Get the bank-wide aggregates.
+
+        Returns:
+            A dict with the "count", "sum", "min" and "max" of the balances
+        """
+        with self._lock:
+            return self._bank.summary()
+
+    def user(self, user_id):
+        """Get the aggregates over one user's accounts; see bank()."""
+        with self._lock:
+            return self._users.get(user_id, BalanceGroup()).summary()
+
+    def account_type(self, account_type):
+        """Get the aggregates over one account type; see bank()."""
+        with self._lock:
+            return self._types.get(account_type, BalanceGroup()).summary()
+
+    def by_account_type(self):
+        """Get the aggregates of every account type.
+
+        Returns:
+            Dict mapping account type to its aggregates
+        """
+        with self._lock:
+            return {name: group.summary() for name, group in self._types.items()}
+
+    def verify(self, accounts):
+        """Compare the running aggregates with a full recomputation.
+
+        Args:
+            accounts: All accounts in the database
+
+        Returns:
+            List of ("bank" | "user" | "account_type", key) groups whose
+            aggregates differ; empty if everything matches
+        """
+        expected = BalanceAggregates(accounts)
+        with self._lock:
+            mismatches = []
+            if expected._bank.summary() != self._bank.summary():
+                mismatches.append(("bank", None))
+            for kind, actual_groups, expected_groups in (
+                    ("user", self._users, expected._users),
+                    ("account_type", self._types, expected._types)):
+                for key in actual_groups.keys() | expected_groups.keys():
+                    actual = actual_groups.get(key, BalanceGroup()).summary()
+                    if actual != expected_groups.get(key, BalanceGroup()).summary():
+                        mismatches.append((kind, key))
+            return mismatches
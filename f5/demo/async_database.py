@@ -0,0 +1,124 @@
+import asyncio
+from functools import partial
+
+from .database import BankDatabase
+from .query import BankQuery
+
+
+class AsyncBankDatabase:
+    """asyncio front end for a BankDatabase.
+
+    Each operation is a coroutine that runs the matching BankDatabase call,
+    so locking, index maintenance and rollback behave exactly as in the
+    synchronous API. In-memory storages answer in microseconds, so by
+    default calls run directly on the event loop. For storages that block
+    on I/O, turn on offload (or pass an executor) to run calls on worker
+    threads instead; the storage must then be safe to call from several
+    threads, such as ConcurrentMemoryStorage.
+
+    Concurrent get_account() calls for the same account share a single
+    storage read.
+    """
+
+    def __init__(self, database=None, executor=None, offload=False):
+        """Initialize the async front end.
+
+        Args:
+            database: The BankDatabase to wrap, defaults to a new one
+            executor: concurrent.futures executor for offloaded calls;
+                passing one turns on offload
+            offload: If True, run calls on the executor (the event loop's
+                default executor if none is given) instead of the loop
+        """
+        self.database = database if database is not None else BankDatabase()
+        self.executor = executor
+        self.offload = offload or executor is not None
+        self._account_reads = {}  # account_id -> in-flight read
+        self.coalesced_reads = 0
+
+    async def _run(self, func, *args):
+        """Run a synchronous database call, offloading it if configured."""
+        if not self.offload:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    # User and account operations
+
+    async def create_user(self, name, email, address=None):
+        """Create a new bank user; see BankDatabase.create_user()."""
+        return await self._run(self.database.create_user, name, email, address)
+
+    async def get_user(self, user_id):
+        """Get a user by ID; see BankDatabase.get_user()."""
+        return await self._run(self.database.get_user, user_id)
+
+    async def create_account(self, user_id, account_type, initial_balance=0.0):
+        """Create a new bank account; see BankDatabase.create_account()."""
+        return await self._run(self.database.create_account, user_id, account_type,
+                               initial_balance)
+
+    async def get_account(self, account_id):
+        """Get an account by ID; see BankDatabase.get_account().
+
+        If a read of the same account is already in flight, its result is
+        shared instead of reading the storage again.
+        """
+        pending = self._account_reads.get(account_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._run(self.database.get_account, account_id))
+            self._account_reads[account_id] = pending
+            pending.add_done_callback(partial(self._finish_read, account_id))
+        else:
+            self.coalesced_reads += 1
+        # Shield the shared read so one cancelled caller doesn't cancel it
+        # for the others
+        return await asyncio.shield(pending)
+
+    def _finish_read(self, account_id, pending):
+        """Forget a completed account read."""
+        if self._account_reads.get(account_id) is pending:
+            del self._account_reads[account_id]
+
+    # Banking operations
+
+    async def deposit(self, account_id, amount):
+        """Deposit money into an account; see BankDatabase.deposit()."""
+        return await self._run(self.database.deposit, account_id, amount)
+
+    async def withdraw(self, account_id, amount):
+        """Withdraw money from an account; see BankDatabase.withdraw()."""
+        return await self._run(self.database.withdraw, account_id, amount)
+
+    async def transfer(self, from_account_id, to_account_id, amount):
+        """Transfer money between accounts; see BankDatabase.transfer()."""
+        return await self._run(self.database.transfer, from_account_id, to_account_id, amount)
+
+    # Queries
+
+    def query(self):
+        """Start a BankQuery against the wrapped database.
+
+        Returns:
+            A new BankQuery to build and pass to execute(), count() or first()
+        """
+        return BankQuery(self.database)
+
+    async def execute(self, query):
+        """Execute a BankQuery.
+
+        Args:
+            query: The query to execute
+
+        Returns:
+            List of matching users or accounts
+        """
+        return await self._run(query.execute)
+
+    async def count(self, query):
+        """Count the records matching a BankQuery."""
+        return await self._run(query.count)
+
+    async def first(self, query):
+        """Get the first record matching a BankQuery, or None."""
+        return await self._run(query.first)
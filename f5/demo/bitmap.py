@@ -0,0 +1,480 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+# A container switches from a sorted array to a bitset above this many rows,
+# where the 8 KiB bitset becomes the smaller of the two
+ARRAY_LIMIT = 4096
+
+_BITSET_BYTES = 1 << 13  # 65536 bits
+
+# Positions of the set bits in every byte value
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+class _Bits:
+    """Dense container: a 65536-bit bitset with its cardinality."""
+
+    __slots__ = ("bits", "count")
+
+    def __init__(self, bits, count):
+        self.bits = bits  # bytearray of _BITSET_BYTES bytes
+        self.count = count
+
+    @classmethod
+    def from_int(cls, value):
+        return cls(bytearray(value.to_bytes(_BITSET_BYTES, "little")), value.bit_count())
+
+    def to_int(self):
+        return int.from_bytes(self.bits, "little")
+
+    def __contains__(self, low):
+        return self.bits[low >> 3] >> (low & 7) & 1
+
+    def __iter__(self):
+        for position, byte in enumerate(self.bits):
+            if byte:
+                base = position << 3
+                for bit in _BYTE_BITS[byte]:
+                    yield base + bit
+
+
+def _normalize(container):
+    """Pick the smaller representation for a container, or None if empty."""
+    if isinstance(container, _Bits):
+        if container.count == 0:
+            return None
+        if container.count <= ARRAY_LIMIT:
+            return array("H", container)
+        return container
+    if not container:
+        return None
+    if len(container) > ARRAY_LIMIT:
+        value = 0
+        for low in container:
+            value |= 1 << low
+        return _Bits.from_int(value)
+    return container
+
+
+def _as_int(container):
+    """Get a container's rows as an integer bitset."""
+    if isinstance(container, _Bits):
+        return container.to_int()
+    value = 0
+    for low in container:
+        value |= 1 << low
+    return value
+
+
+def _and(a, b):
+    if isinstance(a, _Bits) and isinstance(b, _Bits):
+        return _normalize(_Bits.from_int(a.to_int() & b.to_int()))
+    if isinstance(a, _Bits):
+        a, b = b, a
+    if isinstance(b, _Bits):
+        return _normalize(array("H", (low for low in a if low in b)))
+    return _normalize(array("H", sorted(set(a).intersection(b))))
+
+
+def _or(a, b):
+    if isinstance(a, _Bits) or isinstance(b, _Bits):
+        return _normalize(_Bits.from_int(_as_int(a) | _as_int(b)))
+    return _normalize(array("H", sorted(set(a).union(b))))
+
+
+def _andnot(a, b):
+    if isinstance(a, _Bits):
+        return _normalize(_Bits.from_int(a.to_int() & ~_as_int(b)))
+    if isinstance(b, _Bits):
+        return _normalize(array("H", (low for low in a if low not in b)))
+    return _normalize(array("H", sorted(set(a).difference(b))))
+
+
+class Bitmap:
+    """Compressed set of non-negative integer rows, in the style of a
+    roaring bitmap.
+
+    Rows are grouped by their high 16 bits. Each group is stored as a
+    sorted array of 16-bit values while it is sparse and as a 65536-bit
+    bitset once it is dense, so memory stays proportional to the number of
+    rows for sparse data and to one bit per row for dense data. AND, OR and
+    AND NOT work group by group, on whole bitsets at once where both sides
+    are dense.
+    """
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, rows=()):
+        """Initialize a bitmap.
+
+        Args:
+            rows: Rows to add
+        """
+        self._containers = {}  # high 16 bits -> array("H") or _Bits
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        """Add a row."""
+        high, low = row >> 16, row & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = array("H", (low,))
+        elif isinstance(container, _Bits):
+            mask = 1 << (low & 7)
+            if not container.bits[low >> 3] & mask:
+                container.bits[low >> 3] |= mask
+                container.count += 1
+        else:
+            # Rows usually arrive in ascending order, making this an append
+            if container[-1] < low:
+                container.append(low)
+            else:
+                position = bisect_left(container, low)
+                if position < len(container) and container[position] == low:
+                    return
+                container.insert(position, low)
+            if len(container) > ARRAY_LIMIT:
+                self._containers[high] = _normalize(container)
+
+    def discard(self, row):
+        """Remove a row if present."""
+        high, low = row >> 16, row & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, _Bits):
+            mask = 1 << (low & 7)
+            if container.bits[low >> 3] & mask:
+                container.bits[low >> 3] &= ~mask
+                container.count -= 1
+                if container.count <= ARRAY_LIMIT:
+                    self._set(high, _normalize(container))
+        else:
+            position = bisect_left(container, low)
+            if position < len(container) and container[position] == low:
+                del container[position]
+                if not container:
+                    del self._containers[high]
+
+    def _set(self, high, container):
+        """Store a container, dropping the group if it is empty."""
+        if container is None:
+            self._containers.pop(high, None)
+        else:
+            self._containers[high] = container
+
+    def __contains__(self, row):
+        container = self._containers.get(row >> 16)
+        if container is None:
+            return False
+        low = row & 0xFFFF
+        if isinstance(container, _Bits):
+            return bool(low in container)
+        position = bisect_left(container, low)
+        return position < len(container) and container[position] == low
+
+    def __len__(self):
+        """Count the rows (a popcount of every group)."""
+        return sum(container.count if isinstance(container, _Bits) else len(container)
+                   for container in list(self._containers.values()))
+
+    def __bool__(self):
+        return bool(self._containers)
+
+    def __iter__(self):
+        """Iterate over the rows in ascending order."""
+        for high in sorted(self._containers):
+            base = high << 16
+            for low in self._containers[high]:
+                yield base | low
+
+    def _combine(self, other, operation, keys):
+        result = Bitmap()
+        for high in keys:
+            container = operation(self._containers.get(high, array("H")),
+                                  other._containers.get(high, array("H")))
+            if container is not None:
+                result._containers[high] = container
+        return result
+
+    def __and__(self, other):
+        keys = self._containers.keys() & other._containers.keys()
+        return self._combine(other, _and, keys)
+
+    def __or__(self, other):
+        keys = self._containers.keys() | other._containers.keys()
+        return self._combine(other, _or, keys)
+
+    def __sub__(self, other):
+        """Rows in this bitmap but not in other (AND NOT)."""
+        result = Bitmap()
+        for high, container in self._containers.items():
+            other_container = other._containers.get(high)
+            if other_container is None:
+                result._containers[high] = _copy(container)
+            else:
+                container = _andnot(container, other_container)
+                if container is not None:
+                    result._containers[high] = container
+        return result
+
+    def copy(self):
+        """Get an independent copy of the bitmap.
+
+        Safe to call while another thread adds or removes rows; the copy
+        has each group as it was when it was copied.
+        """
+        result = Bitmap()
+        # list() takes the groups in one step, so the dict can't change
+        # size while they are copied
+        result._containers = {high: _copy(container)
+                              for high, container in list(self._containers.items())}
+        return result
+
+
+def _copy(container):
+    if isinstance(container, _Bits):
+        return _Bits(bytearray(container.bits), container.count)
+    return array("H", container)
+
+
+# Record IDs are mapped to bitmap rows. Canonical decimal IDs, which is what
+# every storage hands out, are their own row numbers; any other ID gets a
+# row above _EXTRA_ROWS, shared by all bitmap indexes so their rows agree.
+_EXTRA_ROWS = 1 << 40
+_extra_rows = {}  # record_id -> row
+_extra_ids = []  # row - _EXTRA_ROWS -> record_id
+_extra_lock = threading.Lock()
+
+
+def _numeric_row(record_id):
+    """Get the row of a canonical decimal ID, or None for any other ID."""
+    if (type(record_id) is str and record_id.isascii() and record_id.isdigit()
+            and (record_id[0] != "0" or record_id == "0")):
+        row = int(record_id)
+        if row < _EXTRA_ROWS:
+            return row
+    return None
+
+
+def find_row(record_id):
+    """Get the bitmap row for a record ID, or None if it has never had one.
+
+    Unlike row_of(), this never assigns a row, so lookups of unknown IDs
+    don't grow the shared ID table.
+    """
+    row = _numeric_row(record_id)
+    if row is None:
+        row = _extra_rows.get(record_id)
+    return row
+
+
+def row_of(record_id):
+    """Get the bitmap row for a record ID, assigning one if it has none.
+
+    Only for adding records; lookups use find_row().
+    """
+    row = _numeric_row(record_id)
+    if row is not None:
+        return row
+    row = _extra_rows.get(record_id)
+    if row is None:
+        with _extra_lock:
+            row = _extra_rows.get(record_id)
+            if row is None:
+                row = _extra_rows[record_id] = _EXTRA_ROWS + len(_extra_ids)
+                _extra_ids.append(record_id)
+    return row
+
+
+def id_of(row):
+    """Get the record ID for a bitmap row."""
+    return str(row) if row < _EXTRA_ROWS else _extra_ids[row - _EXTRA_ROWS]
+
+
+class RowIds:
+    """Read-only view of a Bitmap as a collection of record IDs."""
+
+    __slots__ = ("bitmap",)
+
+    def __init__(self, bitmap):
+        self.bitmap = bitmap
+
+    def __len__(self):
+        return len(self.bitmap)
+
+    def __iter__(self):
+        return map(id_of, self.bitmap)
+
+    def __contains__(self, record_id):
+        row = find_row(record_id)
+        return row is not None and row in self.bitmap
+
+
+class _BitmapIndex:
+    """Shared implementation of the bitmap indexes: one Bitmap per value."""
+
+    def __init__(self, field):
+        """Initialize a new bitmap index for a specific field.
+
+        Args:
+            field: The field name to index on
+        """
+        self.field = field
+        self._bitmaps = {}  # Maps field values to Bitmaps of rows
+
+    @staticmethod
+    def _key(value):
+        """Make a value usable as a dict key, as the set-based indexes do."""
+        if not isinstance(value, (str, int, float, bool, tuple)):
+            value = str(value)
+        return value
+
+    def _add_value(self, record_id, value):
+        if value is None or not record_id:
+            return False
+        key = self._key(value)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = self._bitmaps[key] = Bitmap()
+        bitmap.add(row_of(record_id))
+        return True
+
+    def _remove_value(self, record_id, value):
+        if value is None or record_id is None:
+            return False
+        key = self._key(value)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            return False
+        row = find_row(record_id)
+        if row is None or row not in bitmap:
+            return False
+        bitmap.discard(row)
+        if not bitmap:  # Clean up empty bitmaps
+            del self._bitmaps[key]
+        return True
+
+    def bitmap(self, value):
+        """Get the bitmap of rows with a value.
+
+        The bitmap belongs to the index and must not be modified.
+
+        Args:
+            value: The value to look up
+
+        Returns:
+            A Bitmap, empty if no record has the value
+        """
+        if value is None:
+            return Bitmap()
+        return self._bitmaps.get(self._key(value)) or Bitmap()
+
+    def find(self, value):
+        """Find all record IDs with the given field value.
+
+        Args:
+            value: The value to search for
+
+        Returns:
+            A set of record IDs matching the value
+        """
+        return set(RowIds(self.bitmap(value)))
+
+    def count(self, value):
+        """Count the records with a value without listing them."""
+        return len(self.bitmap(value))
+
+    def clear(self):
+        """Clear the index."""
+        self._bitmaps = {}
+
+    def values(self):
+        """Get all unique values in this index."""
+        return list(self._bitmaps.keys())
+
+
+class BankBitmapIndex(_BitmapIndex):
+    """Bitmap index for bank users and accounts, for low-cardinality fields
+    such as account_type.
+
+    Has the same interface as BankIndex, plus bitmap() lookups that
+    BankQuery combines with bitmap AND and AND NOT.
+    """
+
+    def add_user(self, user):
+        """Add a user to the index.
+
+        Returns:
+            True if indexed, False otherwise
+        """
+        if not user:
+            return False
+        return self._add_value(user.id, getattr(user, self.field, None))
+
+    def add_account(self, account):
+        """Add an account to the index.
+
+        Returns:
+            True if indexed, False otherwise
+        """
+        if not account:
+            return False
+        return self._add_value(account.id, getattr(account, self.field, None))
+
+    def add_users(self, users):
+        """Add a batch of users.
+
+        Returns:
+            Number of users indexed
+        """
+        return sum(1 for user in users if self.add_user(user))
+
+    def add_accounts(self, accounts):
+        """Add a batch of accounts.
+
+        Returns:
+            Number of accounts indexed
+        """
+        return sum(1 for account in accounts if self.add_account(account))
+
+    def remove(self, record_id, value):
+        """Remove a record from the index.
+
+        Args:
+            record_id: The ID of the record to remove
+            value: The value to remove it from
+
+        Returns:
+            True if removed, False otherwise
+        """
+        return self._remove_value(record_id, value)
+
+
+class BitmapIndex(_BitmapIndex):
+    """Bitmap index for generic database records, with the same interface
+    as Index.
+
+    Query combines bitmap indexes with bitmap OR for "in" conditions and
+    bitmap AND across conditions.
+    """
+
+    def add(self, record):
+        """Add a record to the index."""
+        if not record:
+            return False
+        return self._add_value(record.id, record.get(self.field))
+
+    def remove(self, record):
+        """Remove a record from the index."""
+        if not record:
+            return False
+        return self._remove_value(record.id, record.get(self.field))
+
+    def update(self, record, old_value=None):
+        """Update the index for a record."""
+        if old_value is not None:
+            self._remove_value(record.id, old_value)
+        return self.add(record)
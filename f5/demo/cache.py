@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .storage import BankStorage
+
+
+class CachingStorage(BankStorage):
+    """Read-through LRU cache in front of another BankStorage.
+
+    get_user() and get_account() are answered from a bounded cache of
+    recently used records, falling back to the wrapped storage on a miss.
+    Saves are written through to the wrapped storage and refresh the cache;
+    deletes, including the accounts removed along with a user, drop the
+    affected entries. Listing calls such as get_all_accounts() always go to
+    the wrapped storage.
+    """
+
+    def __init__(self, storage, max_size=10000, ttl=None):
+        """Initialize the cache.
+
+        Args:
+            storage: The BankStorage to cache
+            max_size: Maximum number of cached users and accounts together
+            ttl: Seconds a cached record stays valid, or None for no expiry
+        """
+        super().__init__()
+        if not isinstance(storage, BankStorage):
+            raise TypeError("Storage must be an instance of BankStorage")
+        self.storage = storage
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (kind, id) -> (record, expiry time)
+        self._loading = {}  # (kind, id) -> tickets of misses being read
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # Cache helpers
+
+    def _lookup(self, key):
+        """Get a cached record.
+
+        Returns:
+            A tuple of (record, None) on a hit, or (None, ticket) on a miss;
+            the ticket must be passed to _fill() once the wrapped storage
+            has been read
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                record, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return record, None
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            ticket = object()
+            self._loading.setdefault(key, set()).add(ticket)
+            return None, ticket
+
+    def _fill(self, key, ticket, record):
+        """Cache a record read from the wrapped storage after a miss.
+
+        The record is dropped if the key was saved or deleted since the
+        miss, as the read may have happened before that write.
+        """
+        with self._lock:
+            tickets = self._loading.get(key)
+            if tickets is None or ticket not in tickets:
+                return
+            tickets.discard(ticket)
+            if not tickets:
+                del self._loading[key]
+            self._store(key, record)
+
+    def _store(self, key, record):
+        """Cache a record, evicting the least recently used ones if full.
+
+        Must be called with the lock held.
+        """
+        if record is None or self.max_size <= 0:
+            return
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (record, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _remember(self, key, record):
+        """Cache a record just written, voiding misses still reading it."""
+        with self._lock:
+            self._loading.pop(key, None)
+            self._store(key, record)
+
+    def _forget(self, key):
+        """Drop a record if cached, voiding misses still reading it."""
+        with self._lock:
+            self._loading.pop(key, None)
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every cached record."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get the cache counters.
+
+        Returns:
+            A dict with "hits", "misses", "evictions", "expirations", the
+            current "size" and the "hit_rate"
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    # User operations
+
+    def save_user(self, user):
+        """Save a user to the wrapped storage and cache it."""
+        user = self.storage.save_user(user)
+        self._remember(("user", user.id), user)
+        return user
+
+    def save_users(self, users):
+        """Save a batch of users to the wrapped storage.
+
+        The batch is not cached, so a bulk load doesn't push hot records
+        out; stale entries for the saved users are dropped.
+        """
+        users = self.storage.save_users(users)
+        for user in users:
+            self._forget(("user", user.id))
+        return users
+
+    def get_user(self, user_id):
+        """Get a user from the cache or the wrapped storage."""
+        key = ("user", user_id)
+        user, ticket = self._lookup(key)
+        if ticket is not None:
+            try:
+                user = self.storage.get_user(user_id)
+            finally:
+                self._fill(key, ticket, user)
+        return user
+
+    def delete_user(self, user_id):
+        """Delete a user and their accounts, dropping them from the cache."""
+        # The wrapped storage deletes the accounts too, so find them first
+        account_ids = [account.id for account in self.storage.get_user_accounts(user_id)]
+        deleted = self.storage.delete_user(user_id)
+        self._forget(("user", user_id))
+        for account_id in account_ids:
+            self._forget(("account", account_id))
+        return deleted
+
+    def get_all_users(self):
+        """Get all users from the wrapped storage."""
+        return self.storage.get_all_users()
+
+    # Account operations
+
+    def save_account(self, account):
+        """Save an account to the wrapped storage and cache it."""
+        account = self.storage.save_account(account)
+        self._remember(("account", account.id), account)
+        return account
+
+    def save_accounts(self, accounts):
+        """Save a batch of accounts to the wrapped storage without caching them."""
+        accounts = self.storage.save_accounts(accounts)
+        for account in accounts:
+            self._forget(("account", account.id))
+        return accounts
+
+    def get_account(self, account_id):
+        """Get an account from the cache or the wrapped storage."""
+        key = ("account", account_id)
+        account, ticket = self._lookup(key)
+        if ticket is not None:
+            try:
+                account = self.storage.get_account(account_id)
+            finally:
+                self._fill(key, ticket, account)
+        return account
+
+    def delete_account(self, account_id):
+        """Delete an account from the wrapped storage and the cache."""
+        deleted = self.storage.delete_account(account_id)
+        self._forget(("account", account_id))
+        return deleted
+
+    def get_all_accounts(self):
+        """Get all accounts from the wrapped storage."""
+        return self.storage.get_all_accounts()
+
+    def get_user_accounts(self, user_id):
+        """Get all accounts for a user from the wrapped storage."""
+        return self.storage.get_user_accounts(user_id)
+
+    # Query pushdown
+
+    def split_account_conditions(self, conditions):
+        """Split account conditions as the wrapped storage does."""
+        return self.storage.split_account_conditions(conditions)
+
+    def find_accounts(self, conditions):
+        """Evaluate pushed account conditions in the wrapped storage."""
+        return self.storage.find_accounts(conditions)
@@ -0,0 +1,387 @@
+import operator
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it filters are not vectorized
+    np = None
+
+from .record import Account
+from .storage import BankStorage
+
+# Balance comparisons that can be evaluated on the whole column at once
+BALANCE_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+
+def split_column_conditions(conditions):
+    """Split account query conditions into those column_mask() can evaluate
+    and the rest.
+
+    Balance comparisons and account_type/user_id equality are supported when
+    NumPy is available.
+
+    Args:
+        conditions: List of (field, operator, value) tuples
+
+    Returns:
+        A tuple of (supported conditions, remaining conditions)
+    """
+    if np is None:
+        return [], list(conditions)
+
+    pushed = []
+    remaining = []
+    for field, operator_, value in conditions:
+        if value is None:
+            supported = False
+        elif field == "balance":
+            supported = (operator_ in BALANCE_OPERATORS and
+                         isinstance(value, (int, float)) and not isinstance(value, bool))
+        else:
+            supported = field in ("account_type", "user_id") and operator_ in ("=", "!=")
+        (pushed if supported else remaining).append((field, operator_, value))
+    return pushed, remaining
+
+
+def column_mask(conditions, live, balance, account_types, user_ids, type_code, user_code):
+    """Evaluate account conditions on NumPy columns.
+
+    Args:
+        conditions: Conditions accepted by split_column_conditions()
+        live: Column that is non-zero for rows holding an account
+        balance: Balance column, with NaN for None
+        account_types: Integer-coded account_type column
+        user_ids: Integer-coded user_id column
+        type_code: Function mapping an account type to its code, or None
+        user_code: Function mapping a user ID to its code, or None
+
+    Returns:
+        A boolean NumPy array with one entry per row
+    """
+    mask = live.astype(bool)
+    for field, operator_, value in conditions:
+        if field == "balance":
+            if operator_ not in ("=", "!="):
+                # As in BankQuery, a zero balance fails range conditions
+                mask &= balance != 0
+            mask &= BALANCE_OPERATORS[operator_](balance, value)
+            continue
+
+        if field == "account_type":
+            code, column = type_code(value), account_types
+        else:
+            code, column = user_code(value), user_ids
+
+        if operator_ == "=":
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= column == code
+        elif code is not None:
+            mask &= column != code
+    return mask
+
+
+def column_totals(live, balance, account_types, type_names):
+    """Sum balances per account type on NumPy columns.
+
+    Args:
+        live: Column that is non-zero for rows holding an account
+        balance: Balance column, with NaN for None
+        account_types: Integer-coded account_type column
+        type_names: List mapping type codes to account types
+
+    Returns:
+        Dict mapping account type to total balance
+    """
+    live = live.astype(bool)
+    balance = balance[live]
+    codes = account_types[live]
+    valid = ~np.isnan(balance)
+    size = len(type_names)
+    totals = np.bincount(codes[valid], weights=balance[valid], minlength=size)
+    counts = np.bincount(codes, minlength=size)
+    return {type_names[code]: float(totals[code]) for code in range(size) if counts[code]}
+
+
+class AccountRow(Account):
+    """Lightweight view of one account row in a ColumnarStorage.
+
+    Reads and writes go straight to the storage's columns, so a row view
+    behaves like an Account without keeping its own copy of the data.
+    """
+
+    __slots__ = ("_storage", "_row")
+
+    def __init__(self, storage, row):
+        """Initialize a view of a row.
+
+        Args:
+            storage: The ColumnarStorage holding the row
+            row: Row number in the storage's columns
+        """
+        self._storage = storage
+        self._row = row
+
+    @property
+    def id(self):
+        """The account ID."""
+        return self._storage._ids[self._row]
+
+    @property
+    def user_id(self):
+        """ID of the user who owns this account."""
+        return self._storage._user_ids[self._storage._user_codes[self._row]]
+
+    @user_id.setter
+    def user_id(self, user_id):
+        self._storage._set_user_id(self._row, user_id)
+
+    @property
+    def account_type(self):
+        """Type of account (checking, savings, etc.)."""
+        return self._storage._type_names[self._storage._type_codes[self._row]]
+
+    @account_type.setter
+    def account_type(self, account_type):
+        self._storage._type_codes[self._row] = self._storage._type_code(account_type)
+
+    @property
+    def balance(self):
+        """Current account balance."""
+        balance = self._storage._balance[self._row]
+        return None if balance != balance else balance  # NaN stands for None
+
+    @balance.setter
+    def balance(self, balance):
+        self._storage._balance[self._row] = float("nan") if balance is None else balance
+
+    def copy(self):
+        """Get a detached Account with the row's current values."""
+        return Account(self.id, self.user_id, self.account_type, self.balance)
+
+
+class ColumnarStorage(BankStorage):
+    """Column-oriented implementation of the BankStorage interface.
+
+    Accounts are stored as parallel typed arrays (balance, integer-coded
+    account_type and user_id) instead of one object per account, and are
+    handed out as AccountRow views. With NumPy installed, balance, type and
+    owner conditions of a BankQuery are evaluated on whole columns at once.
+    Users are kept as User objects.
+    """
+
+    def __init__(self):
+        """Initialize a new columnar storage instance."""
+        super().__init__()
+        self._users = {}  # user_id -> User
+        self._next_user_id = 1
+        self._next_account_id = 1
+
+        # Account columns, indexed by row number
+        self._ids = []  # row -> account_id
+        self._user_codes = array("q")
+        self._type_codes = array("H")
+        self._balance = array("d")
+        self._live = array("B")  # 1 while the row holds an account, 0 once deleted
+        self._rows = {}  # account_id -> row
+
+        # Dictionaries for the integer-coded columns; code 0 stands for None
+        self._user_ids = [None]
+        self._user_id_codes = {}
+        self._type_names = [None]
+        self._type_name_codes = {}
+        self._user_rows = {}  # user code -> set of rows
+
+    # Column helpers
+
+    def _encode(self, values, codes, value):
+        """Get the integer code for a value, assigning a new one if needed."""
+        if value is None:
+            return 0
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            codes[value] = code
+        return code
+
+    def _type_code(self, account_type):
+        """Get the integer code for an account type."""
+        return self._encode(self._type_names, self._type_name_codes, account_type)
+
+    def _set_user_id(self, row, user_id):
+        """Change the owner of a row, keeping the user -> rows map in step."""
+        code = self._encode(self._user_ids, self._user_id_codes, user_id)
+        old_code = self._user_codes[row]
+        if code == old_code:
+            return
+        self._user_codes[row] = code
+        if self._live[row]:
+            self._unlink_row(row, old_code)
+            self._user_rows.setdefault(code, set()).add(row)
+
+    def _unlink_row(self, row, code):
+        """Remove a row from its user's entry in the user -> rows map."""
+        rows = self._user_rows.get(code)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:  # Clean up empty sets
+                del self._user_rows[code]
+
+    # User operations
+
+    def save_user(self, user):
+        """Save a user to columnar storage."""
+        if user.id is None:
+            user.id = str(self._next_user_id)
+            self._next_user_id += 1
+
+        self._users[user.id] = user
+        return user
+
+    def get_user(self, user_id):
+        """Get a user from columnar storage."""
+        return self._users.get(user_id)
+
+    def delete_user(self, user_id):
+        """Delete a user and their accounts from columnar storage."""
+        if user_id in self._users:
+            del self._users[user_id]
+            code = self._user_id_codes.get(user_id)
+            for row in list(self._user_rows.get(code, ())):
+                self.delete_account(self._ids[row])
+            return True
+        return False
+
+    def get_all_users(self):
+        """Get all users from columnar storage."""
+        return list(self._users.values())
+
+    # Account operations
+
+    def save_account(self, account):
+        """Save an account to columnar storage.
+
+        Returns:
+            An AccountRow view of the stored account
+        """
+        if isinstance(account, AccountRow) and account._storage is self:
+            return account  # Its writes already went to the columns
+
+        if account.id is None:
+            account.id = str(self._next_account_id)
+            self._next_account_id += 1
+
+        row = self._rows.get(account.id)
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(account.id)
+            self._user_codes.append(0)
+            self._type_codes.append(0)
+            self._balance.append(0.0)
+            self._live.append(1)
+            self._rows[account.id] = row
+            self._user_rows.setdefault(0, set()).add(row)
+
+        view = AccountRow(self, row)
+        view.user_id = account.user_id
+        view.account_type = account.account_type
+        view.balance = account.balance
+        return view
+
+    def get_account(self, account_id):
+        """Get an account view from columnar storage."""
+        row = self._rows.get(account_id)
+        return None if row is None else AccountRow(self, row)
+
+    def delete_account(self, account_id):
+        """Delete an account from columnar storage."""
+        row = self._rows.pop(account_id, None)
+        if row is None:
+            return False
+        self._live[row] = 0
+        self._unlink_row(row, self._user_codes[row])
+        return True
+
+    def get_all_accounts(self):
+        """Get views of all accounts in columnar storage."""
+        return [AccountRow(self, row) for row in self._rows.values()]
+
+    def get_user_accounts(self, user_id):
+        """Get views of all accounts for a specific user."""
+        code = self._user_id_codes.get(user_id)
+        return [AccountRow(self, row) for row in self._user_rows.get(code, ())]
+
+    # Vectorized evaluation
+
+    def split_account_conditions(self, conditions):
+        """Split account query conditions into those evaluated on columns and the rest."""
+        return split_column_conditions(conditions)
+
+    def _mask(self, conditions):
+        """Evaluate conditions on the columns.
+
+        Returns:
+            A boolean NumPy array with one entry per row
+        """
+        return column_mask(
+            conditions,
+            live=np.frombuffer(self._live, dtype=np.uint8),
+            balance=np.frombuffer(self._balance, dtype=np.float64),
+            account_types=np.frombuffer(self._type_codes, dtype=np.uint16),
+            user_ids=np.frombuffer(self._user_codes, dtype=np.int64),
+            type_code=self._type_name_codes.get,
+            user_code=self._user_id_codes.get,
+        )
+
+    def find_accounts(self, conditions):
+        """Get views of the accounts matching conditions pushed by
+        split_account_conditions().
+
+        Args:
+            conditions: List of (field, operator, value) tuples
+
+        Returns:
+            List of matching AccountRow views in row order
+        """
+        if not self._ids:
+            return []
+        rows = np.flatnonzero(self._mask(conditions))
+        return [AccountRow(self, row) for row in rows.tolist()]
+
+    def total_balance_by_type(self):
+        """Sum the balances of all accounts per account type.
+
+        Returns:
+            Dict mapping account type to total balance
+        """
+        if np is not None and self._ids:
+            return column_totals(
+                live=np.frombuffer(self._live, dtype=np.uint8),
+                balance=np.frombuffer(self._balance, dtype=np.float64),
+                account_types=np.frombuffer(self._type_codes, dtype=np.uint16),
+                type_names=self._type_names,
+            )
+
+        totals = {}
+        for row in self._rows.values():
+            name = self._type_names[self._type_codes[row]]
+            balance = self._balance[row]
+            totals[name] = totals.get(name, 0.0) + (balance if balance == balance else 0.0)
+        return totals
+
+    def total_balance(self):
+        """Sum the balances of all accounts.
+
+        Returns:
+            The total balance
+        """
+        return sum(self.total_balance_by_type().values())
@@ -0,0 +1,76 @@
+import base64
+import json
+
+
+def encode_cursor(sort_field, reverse, value, record_id):
+    """Build an opaque cursor for the position just past a record.
+
+    Args:
+        sort_field: Field the query sorts on
+        reverse: Whether the query sorts in descending order
+        value: The record's sort value
+        record_id: The record's ID, which breaks ties between equal values
+
+    Returns:
+        A URL-safe string
+
+    Raises:
+        ValueError: If the sort value can't be stored in a cursor
+    """
+    try:
+        data = json.dumps([sort_field, bool(reverse), value, record_id], separators=(",", ":"))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cannot build a cursor from sort value {value!r}") from e
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Read a cursor made by encode_cursor().
+
+    Returns:
+        A tuple of (sort_field, reverse, value, record_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_field, reverse, value, record_id = json.loads(data)
+    except (TypeError, ValueError) as e:  # Includes bad base64 and JSON
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if isinstance(value, list):
+        value = tuple(value)  # JSON has no tuples
+    return sort_field, reverse, value, record_id
+
+
+def order_key(value, record_id):
+    """Get the key BankQuery sorts records by.
+
+    Records whose sort value is None come before every other value, then
+    records are ordered by value, with ties broken by ID. A sorted index
+    iterates in the same order.
+    """
+    return value is not None, value, record_id
+
+
+def cursor_position(decoded, sort_field, reverse):
+    """Get the (value, record_id) key a decoded cursor continues after.
+
+    Args:
+        decoded: Tuple returned by decode_cursor()
+        sort_field: Field the query sorts on
+        reverse: Whether the query sorts in descending order
+
+    Returns:
+        The (value, record_id) key
+
+    Raises:
+        ValueError: If the cursor was made for a different sort order
+    """
+    cursor_field, cursor_reverse, value, record_id = decoded
+    if sort_field is None:
+        raise ValueError("Cursor pagination needs a sort order, e.g. sort by \"id\"")
+    if cursor_field != sort_field or cursor_reverse != bool(reverse):
+        raise ValueError(f"Cursor was made for a query sorted by {cursor_field!r}"
+                         f"{' descending' if cursor_reverse else ''}")
+    return value, record_id
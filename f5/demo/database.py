@@ -1,9 +1,260 @@
-from .record import User, Account
-from .storage import BankStorage, MemoryStorage
+import threading
+from itertools import islice
+
+from .record import Record, User, Account
+from .aggregates import BalanceAggregates
+from .storage import Storage, BankStorage, MemoryStorage
+from .index import Index, BankIndex, BankCompositeIndex, BankSortedIndex, BankTextIndex
+from .bitmap import BitmapIndex, BankBitmapIndex
+from .locks import AccountLocks
+from .query import Query
+from .query_cache import QueryCache
+from .snapshot import Snapshot, VersionStore
+
+
+class Collection:
+    """Named set of schema-less records in a Database.
+    
+    Indexes created with create_index() are kept up to date on every write
+    and used by queries for "=" and "in" conditions.
+    """
+    
+    # Index classes available to create_index(), by kind
+    INDEX_KINDS = {
+        "hash": Index,
+        "bitmap": BitmapIndex,
+    }
+    
+    def __init__(self, name, storage):
+        """Initialize a collection.
+        
+        Args:
+            name: Name of the collection
+            storage: Storage holding the collection's records
+        """
+        self.name = name
+        self.storage = storage
+        self._indexes = {}  # field -> Index
+        self._lock = threading.Lock()  # Serializes index maintenance
+    
+    # Index operations
+    
+    def create_index(self, field, kind="hash"):
+        """Create an index on a field, built from the existing records.
+        
+        Args:
+            field: The field to index on
+            kind: "hash" for a set per value, "bitmap" for a compressed
+                bitmap per value, best for low-cardinality fields
+            
+        Returns:
+            The index; an existing index on the field is returned as is
+            
+        Raises:
+            ValueError: If the index kind is unknown
+        """
+        if kind not in self.INDEX_KINDS:
+            raise ValueError(f"Unknown index kind: {kind}")
+        
+        with self._lock:
+            index = self._indexes.get(field)
+            if index is None:
+                index = self.INDEX_KINDS[kind](field)
+                for record in self.storage.get_all(self.name):
+                    index.add(record)
+                self._indexes[field] = index
+            return index
+    
+    def get_index(self, field):
+        """Get the index on a field, or None if there is none."""
+        return self._indexes.get(field)
+    
+    def get_indexes(self):
+        """Get all indexes of the collection."""
+        return list(self._indexes.values())
+    
+    def drop_index(self, field):
+        """Remove the index on a field.
+        
+        Returns:
+            True if there was an index, False otherwise
+        """
+        with self._lock:
+            return self._indexes.pop(field, None) is not None
+    
+    # Record operations
+    
+    def insert(self, data):
+        """Insert a new record.
+        
+        Args:
+            data: Dict of field values
+            
+        Returns:
+            The created record
+        """
+        record = self.storage.save(self.name, Record(data))
+        with self._lock:
+            for index in self._indexes.values():
+                index.add(record)
+        return record
+    
+    def insert_many(self, items):
+        """Insert many new records with one storage call.
+        
+        Args:
+            items: Iterable of dicts of field values
+            
+        Returns:
+            List of created records
+        """
+        records = self.storage.save_many(self.name, (Record(data) for data in items))
+        with self._lock:
+            for index in self._indexes.values():
+                for record in records:
+                    index.add(record)
+        return records
+    
+    def get(self, record_id):
+        """Get a record by ID, or None if it doesn't exist."""
+        return self.storage.get(self.name, record_id)
+    
+    def update(self, record_id, data):
+        """Update some fields of a record.
+        
+        Args:
+            record_id: The ID of the record to update
+            data: Dict of the field values to set
+            
+        Returns:
+            The updated record if found, None otherwise
+        """
+        record = self.storage.get(self.name, record_id)
+        if record is None:
+            return None
+        
+        with self._lock:
+            old_values = {field: record.get(field) for field in self._indexes}
+            record.update(data)
+            self.storage.save(self.name, record)
+            for field, index in self._indexes.items():
+                if old_values[field] != record.get(field):
+                    index.update(record, old_values[field])
+        return record
+    
+    def delete(self, record_id):
+        """Delete a record by ID.
+        
+        Returns:
+            True if the record was deleted, False otherwise
+        """
+        record = self.storage.get(self.name, record_id)
+        if record is None:
+            return False
+        
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove(record)
+            return self.storage.delete(self.name, record_id)
+    
+    def get_all_records(self):
+        """Get all records in the collection."""
+        return self.storage.get_all(self.name)
+    
+    def count(self):
+        """Count the records in the collection."""
+        return self.storage.count(self.name)
+    
+    def query(self):
+        """Start a query on this collection.
+        
+        Returns:
+            A new Query
+        """
+        return Query(self)
+
+
+class Database:
+    """Schema-less document database made of named collections."""
+    
+    def __init__(self, storage=None):
+        """Initialize a new database.
+        
+        Args:
+            storage: Storage backend to use, defaults to an in-memory Storage
+        """
+        if storage is not None and not isinstance(storage, Storage):
+            raise TypeError("Storage must be an instance of Storage")
+        self.storage = storage or Storage()
+        self._collections = {}  # name -> Collection
+        self._lock = threading.Lock()
+    
+    def collection(self, name):
+        """Get a collection, creating it if needed.
+        
+        Args:
+            name: Name of the collection
+            
+        Returns:
+            The Collection
+        """
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.setdefault(name, Collection(name, self.storage))
+        return collection
+    
+    def collections(self):
+        """Get the names of all collections."""
+        return list(self._collections)
+    
+    def drop_collection(self, name):
+        """Delete a collection with its records and indexes.
+        
+        Returns:
+            True if the collection existed, False otherwise
+        """
+        with self._lock:
+            existed = self._collections.pop(name, None) is not None
+        return self.storage.drop(name) or existed
+    
+    def create_index(self, collection, field, kind="hash"):
+        """Create an index on a field of a collection; see Collection.create_index()."""
+        return self.collection(collection).create_index(field, kind)
+    
+    def insert(self, collection, data):
+        """Insert a record into a collection; see Collection.insert()."""
+        return self.collection(collection).insert(data)
+    
+    def get(self, collection, record_id):
+        """Get a record from a collection; see Collection.get()."""
+        return self.collection(collection).get(record_id)
+    
+    def update(self, collection, record_id, data):
+        """Update a record in a collection; see Collection.update()."""
+        return self.collection(collection).update(record_id, data)
+    
+    def delete(self, collection, record_id):
+        """Delete a record from a collection; see Collection.delete()."""
+        return self.collection(collection).delete(record_id)
+    
+    def query(self, collection):
+        """Start a query on a collection; see Collection.query()."""
+        return self.collection(collection).query()
+
 
 class BankDatabase:
     """Main bank database class for managing users and accounts."""
     
+    # Index classes available to create_index(), by kind
+    INDEX_KINDS = {
+        "hash": BankIndex,
+        "sorted": BankSortedIndex,
+        "text": BankTextIndex,
+        "bitmap": BankBitmapIndex,
+        "composite": BankCompositeIndex,
+    }
+    
     def __init__(self, name="MyBank", storage=None):
         """Initialize a new bank database.
         
@@ -16,6 +267,290 @@ class BankDatabase:
         if storage is not None and not isinstance(storage, BankStorage):
             raise TypeError("Storage must be an instance of BankStorage")
         self.storage = storage or MemoryStorage()
+        self._indexes = {"users": [], "accounts": []}  # collection -> [BankIndex]
+        # Balance changes lock their accounts; index maintenance is serialized
+        self._account_locks = AccountLocks()
+        self._index_lock = threading.Lock()
+        self.query_cache = None  # QueryCache once enabled
+        self.aggregates = None  # BalanceAggregates once enabled
+        self._versions = VersionStore()  # Prior record versions for snapshots
+        # Writes logged for indexes and aggregates being built; see _backfill()
+        self._write_logs = {"users": [], "accounts": []}
+    
+    # Index operations
+    
+    def add_index(self, collection, index):
+        """Register an index so queries can use it.
+        
+        Args:
+            collection: Either "users" or "accounts"
+            index: The BankIndex to register
+            
+        Returns:
+            The registered index
+            
+        Raises:
+            ValueError: If the collection is unknown
+        """
+        if collection not in self._indexes:
+            raise ValueError(f"Unknown collection: {collection}")
+        self._indexes[collection].append(index)
+        return index
+    
+    def create_index(self, collection, field, kind="hash"):
+        """Create an index that is kept up to date on every write.
+        
+        Args:
+            collection: Either "users" or "accounts"
+            field: The field to index on, or a tuple of fields for a
+                "composite" index
+            kind: "hash" for equality lookups, "sorted" for range and
+                ordered lookups, "text" for prefix and substring lookups,
+                "bitmap" for equality lookups on low-cardinality fields,
+                "composite" for equality lookups on a leading prefix of
+                several fields
+            
+        Returns:
+            The created index
+            
+        Raises:
+            ValueError: If the collection or index kind is unknown
+        """
+        if collection not in self._indexes:
+            raise ValueError(f"Unknown collection: {collection}")
+        if kind not in self.INDEX_KINDS:
+            raise ValueError(f"Unknown index kind: {kind}")
+        
+        index = self.INDEX_KINDS[kind](field)
+        if collection == "users":
+            build = index.add_users
+        else:
+            build = index.add_accounts
+        return self._backfill(
+            collection, build,
+            lambda *write: self._apply_to_index(collection, index, *write),
+            lambda: self.add_index(collection, index))
+    
+    def get_indexes(self, collection):
+        """Get the indexes registered for a collection.
+        
+        Args:
+            collection: Either "users" or "accounts"
+            
+        Returns:
+            List of registered indexes
+        """
+        return list(self._indexes.get(collection, ()))
+    
+    def enable_query_cache(self, max_size=256):
+        """Cache BankQuery results until a write could change them.
+        
+        Args:
+            max_size: Maximum number of cached results
+            
+        Returns:
+            The QueryCache, for its stats()
+        """
+        if self.query_cache is None:
+            self.query_cache = QueryCache(max_size)
+        return self.query_cache
+    
+    def enable_aggregates(self):
+        """Keep running balance aggregates per user, per account type and
+        bank-wide, updated on every account write.
+        
+        Returns:
+            The BalanceAggregates
+        """
+        if self.aggregates is not None:
+            return self.aggregates
+        aggregates = BalanceAggregates()
+        
+        def register():
+            if self.aggregates is None:  # Unless enabled meanwhile
+                self.aggregates = aggregates
+            return self.aggregates
+        
+        return self._backfill(
+            "accounts", aggregates.add_accounts,
+            lambda *write: _apply_to_aggregates(aggregates, *write), register)
+    
+    def check_aggregates(self):
+        """Compare the running aggregates with a full recomputation.
+        
+        Returns:
+            List of the groups whose aggregates differ; empty if they all match
+            
+        Raises:
+            ValueError: If aggregates are not enabled
+        """
+        if self.aggregates is None:
+            raise ValueError("Aggregates are not enabled")
+        return self.aggregates.verify(self.storage.get_all_accounts())
+    
+    def snapshot(self):
+        """Get a read-only view of the database as it is now.
+        
+        Taking a snapshot doesn't copy anything: while it is open, writes
+        keep a copy of each record's previous state, which the snapshot
+        reads instead of the changed record. Writers are never blocked by
+        readers of the snapshot. Close it when done to free those copies.
+        
+        Returns:
+            A Snapshot with the read methods of BankDatabase, usable with
+            BankQuery and as a context manager
+        """
+        return Snapshot(self, self._versions)
+    
+    def _backfill(self, collection, build, replay, register):
+        """Build state from all of a collection's records without holding
+        back writes, for an index or the aggregates.
+        
+        The state is built from a snapshot, while the writes made after it
+        was taken are logged and then replayed onto it. Writes are held
+        back only to replay the end of the log and register the state, from
+        when on the write hooks keep it up to date.
+        
+        Args:
+            collection: Either "users" or "accounts"
+            build: Called with the records in the snapshot
+            replay: Called with each logged write as (operation, record,
+                old_values); see _log_write()
+            register: Called once the log is replayed, with writes held back
+            
+        Returns:
+            What register returns
+        """
+        log = []
+        logs = self._write_logs[collection]
+        snapshot = Snapshot(self, self._versions, on_open=lambda: logs.append(log))
+        try:
+            try:
+                if collection == "users":
+                    build(snapshot.get_all_users())
+                else:
+                    build(snapshot.get_all_accounts())
+            finally:
+                snapshot.close()
+            
+            # Catch up with most of the log while writes go on
+            with self._index_lock:
+                caught_up = len(log)
+            for write in log[:caught_up]:
+                replay(*write)
+            with self._versions.exclusive():
+                for write in log[caught_up:]:
+                    replay(*write)
+                return register()
+        finally:
+            with self._index_lock:
+                logs[:] = [other for other in logs if other is not log]
+    
+    def _log_write(self, collection, operation, record, old_values=None):
+        """Log a write for the backfills in progress; needs the index lock.
+        
+        Args:
+            collection: Either "users" or "accounts"
+            operation: "insert", "update" or "delete"
+            record: The record, in its new state for an update
+            old_values: Field values from before an update
+        """
+        logs = self._write_logs[collection]
+        if logs:
+            write = (operation, record.copy(), old_values)
+            for log in logs:
+                log.append(write)
+    
+    def _index_record(self, collection, index, record):
+        """Add a record to a single index."""
+        if collection == "users":
+            return index.add_user(record)
+        return index.add_account(record)
+    
+    def _apply_to_index(self, collection, index, operation, record, old_values=None):
+        """Apply one write to a single index; see _log_write() for the arguments."""
+        if operation == "insert":
+            self._index_record(collection, index, record)
+        elif operation == "update":
+            old_value = _indexed_value(index, old_values)
+            if old_value != _indexed_value(index, record):
+                index.remove(record.id, old_value)
+                self._index_record(collection, index, record)
+        else:
+            index.remove(record.id, _indexed_value(index, record))
+    
+    def _before_insert(self, collection, records):
+        """Hide records that are about to be created from open snapshots."""
+        self._versions.begin_inserts(records)
+    
+    def _after_insert_many(self, collection, records):
+        """Update indexes, caches and aggregates after a batch of records was created."""
+        self._versions.end_inserts(collection, records)
+        with self._index_lock:
+            for index in self._indexes[collection]:
+                if collection == "users":
+                    index.add_users(records)
+                else:
+                    index.add_accounts(records)
+            if collection == "accounts" and self.aggregates is not None:
+                self.aggregates.add_accounts(records)
+            for record in records:
+                self._log_write(collection, "insert", record)
+        if self.query_cache is not None:
+            self.query_cache.records_inserted(collection, records)
+    
+    def _before_update(self, collection, record):
+        """Capture a record's field values before it is changed in place.
+        
+        Returns:
+            The values to pass to _after_update()
+        """
+        self._versions.record_changes(collection, (record,))
+        return record.to_dict()
+    
+    def _before_delete(self, collection, records):
+        """Keep records that are about to be deleted for open snapshots."""
+        self._versions.record_changes(collection, records)
+    
+    def _after_insert(self, collection, record):
+        """Update indexes, caches and aggregates after a record was created."""
+        self._versions.end_inserts(collection, (record,))
+        with self._index_lock:
+            for index in self._indexes[collection]:
+                self._index_record(collection, index, record)
+            if collection == "accounts" and self.aggregates is not None:
+                self.aggregates.add_accounts((record,))
+            self._log_write(collection, "insert", record)
+        if self.query_cache is not None:
+            self.query_cache.records_inserted(collection, (record,))
+    
+    def _after_update(self, collection, record, old_values):
+        """Update indexes, caches and aggregates after a record was changed.
+        
+        Args:
+            collection: Either "users" or "accounts"
+            record: The record in its new state
+            old_values: Field values captured by _before_update()
+        """
+        with self._index_lock:
+            for index in self._indexes[collection]:
+                self._apply_to_index(collection, index, "update", record, old_values)
+            if collection == "accounts" and self.aggregates is not None:
+                self.aggregates.update_account(record, old_values)
+            self._log_write(collection, "update", record, old_values)
+        if self.query_cache is not None:
+            self.query_cache.record_updated(collection, record, old_values)
+    
+    def _after_delete(self, collection, record):
+        """Update indexes, caches and aggregates after a record was deleted."""
+        with self._index_lock:
+            for index in self._indexes[collection]:
+                self._apply_to_index(collection, index, "delete", record)
+            if collection == "accounts" and self.aggregates is not None:
+                self.aggregates.remove_accounts((record,))
+            self._log_write(collection, "delete", record)
+        if self.query_cache is not None:
+            self.query_cache.records_deleted(collection, (record,))
     
     # User operations
     
@@ -31,7 +566,39 @@ class BankDatabase:
             The created user
         """
         user = User(name=name, email=email, address=address)
-        return self.storage.save_user(user)
+        with self._versions.writing():
+            self._before_insert("users", (user,))
+            user = self.storage.save_user(user)
+            self._after_insert("users", user)
+        return user
+    
+    def bulk_create_users(self, users, batch_size=10000):
+        """Create many users, saving and indexing them in batches.
+        
+        Args:
+            users: Iterable of dicts with the create_user() arguments, or of
+                (name, email[, address]) tuples; generators are consumed one
+                batch at a time
+            batch_size: Number of users to save per storage call
+            
+        Returns:
+            List of created users
+        """
+        created = []
+        for batch in _batches(users, batch_size):
+            records = []
+            for data in batch:
+                if isinstance(data, dict):
+                    records.append(User(name=data["name"], email=data["email"],
+                                        address=data.get("address")))
+                else:
+                    records.append(User(None, *data))
+            with self._versions.writing():
+                self._before_insert("users", records)
+                records = self.storage.save_users(records)
+                self._after_insert_many("users", records)
+            created.extend(records)
+        return created
     
     def get_user(self, user_id):
         """Get a user by ID.
@@ -60,14 +627,18 @@ class BankDatabase:
         if not user:
             return None
             
-        if name is not None:
-            user.name = name
-        if email is not None:
-            user.email = email
-        if address is not None:
-            user.address = address
-            
-        return self.storage.save_user(user)
+        with self._versions.writing():
+            old_values = self._before_update("users", user)
+            if name is not None:
+                user.name = name
+            if email is not None:
+                user.email = email
+            if address is not None:
+                user.address = address
+                
+            user = self.storage.save_user(user)
+            self._after_update("users", user, old_values)
+        return user
     
     def delete_user(self, user_id):
         """Delete a user and all their accounts.
@@ -78,7 +649,33 @@ class BankDatabase:
         Returns:
             True if the user was deleted, False otherwise
         """
-        return self.storage.delete_user(user_id)
+        if not self.storage.get_user(user_id):
+            return False
+        
+        # The storage cascades to the user's accounts, so collect them first
+        # and hold their locks, so no balance change in progress can save
+        # one of them back after it is deleted
+        account_ids = {account.id for account in self.storage.get_user_accounts(user_id)}
+        while True:
+            with self._account_locks.hold(*account_ids), self._versions.writing():
+                accounts = self.storage.get_user_accounts(user_id)
+                if {account.id for account in accounts} != account_ids:
+                    # An account was created or deleted meanwhile
+                    account_ids = {account.id for account in accounts}
+                    continue
+                
+                user = self.storage.get_user(user_id)
+                if not user:
+                    return False
+                self._before_delete("accounts", accounts)
+                self._before_delete("users", (user,))
+                if not self.storage.delete_user(user_id):
+                    return False
+                
+                for account in accounts:
+                    self._after_delete("accounts", account)
+                self._after_delete("users", user)
+                return True
     
     def get_all_users(self):
         """Get all users in the database.
@@ -113,7 +710,54 @@ class BankDatabase:
             account_type=account_type, 
             balance=initial_balance
         )
-        return self.storage.save_account(account)
+        with self._versions.writing():
+            self._before_insert("accounts", (account,))
+            account = self.storage.save_account(account)
+            self._after_insert("accounts", account)
+        return account
+    
+    def bulk_create_accounts(self, accounts, batch_size=10000):
+        """Create many accounts, saving and indexing them in batches.
+        
+        Each owner is looked up once and then remembered, instead of once per
+        account. A batch is validated before any of it is saved; batches
+        before a failing one stay created.
+        
+        Args:
+            accounts: Iterable of dicts with the create_account() arguments,
+                or of (user_id, account_type[, initial_balance]) tuples;
+                generators are consumed one batch at a time
+            batch_size: Number of accounts to save per storage call
+            
+        Returns:
+            List of created accounts
+            
+        Raises:
+            ValueError: If an owner doesn't exist
+        """
+        known_users = set()
+        created = []
+        for batch in _batches(accounts, batch_size):
+            records = []
+            for data in batch:
+                if isinstance(data, dict):
+                    account = Account(user_id=data["user_id"], account_type=data["account_type"],
+                                      balance=data.get("initial_balance", 0.0))
+                else:
+                    account = Account(None, *data)
+                
+                if account.user_id not in known_users:
+                    if not self.storage.get_user(account.user_id):
+                        raise ValueError(f"User with ID {account.user_id} not found")
+                    known_users.add(account.user_id)
+                records.append(account)
+            
+            with self._versions.writing():
+                self._before_insert("accounts", records)
+                records = self.storage.save_accounts(records)
+                self._after_insert_many("accounts", records)
+            created.extend(records)
+        return created
     
     def get_account(self, account_id):
         """Get an account by ID.
@@ -135,7 +779,26 @@ class BankDatabase:
         Returns:
             True if the account was deleted, False otherwise
         """
-        return self.storage.delete_account(account_id)
+        # Under the account's lock, like balance changes, so none of them
+        # can save the account back after it is deleted
+        with self._account_locks.hold(account_id), self._versions.writing():
+            account = self.storage.get_account(account_id)
+            if not account:
+                return False
+            
+            self._before_delete("accounts", (account,))
+            if not self.storage.delete_account(account_id):
+                return False
+            self._after_delete("accounts", account)
+        return True
+    
+    def get_all_accounts(self):
+        """Get all accounts in the database.
+        
+        Returns:
+            List of all accounts
+        """
+        return self.storage.get_all_accounts()
     
     def get_user_accounts(self, user_id):
         """Get all accounts for a specific user.
@@ -163,13 +826,16 @@ class BankDatabase:
         Raises:
             ValueError: If the account doesn't exist or amount is invalid
         """
-        account = self.storage.get_account(account_id)
-        if not account:
-            raise ValueError(f"Account with ID {account_id} not found")
-            
-        account.deposit(amount)
-        self.storage.save_account(account)
-        return account.balance
+        with self._account_locks.hold(account_id), self._versions.writing():
+            account = self.storage.get_account(account_id)
+            if not account:
+                raise ValueError(f"Account with ID {account_id} not found")
+                
+            old_values = self._before_update("accounts", account)
+            account.deposit(amount)
+            self._save_locked_account(account)
+            self._after_update("accounts", account, old_values)
+            return account.balance
     
     def withdraw(self, account_id, amount):
         """Withdraw money from an account.
@@ -184,13 +850,16 @@ class BankDatabase:
         Raises:
             ValueError: If the account doesn't exist, amount is invalid or insufficient funds
         """
-        account = self.storage.get_account(account_id)
-        if not account:
-            raise ValueError(f"Account with ID {account_id} not found")
-            
-        account.withdraw(amount)
-        self.storage.save_account(account)
-        return account.balance
+        with self._account_locks.hold(account_id), self._versions.writing():
+            account = self.storage.get_account(account_id)
+            if not account:
+                raise ValueError(f"Account with ID {account_id} not found")
+                
+            old_values = self._before_update("accounts", account)
+            account.withdraw(amount)
+            self._save_locked_account(account)
+            self._after_update("accounts", account, old_values)
+            return account.balance
     
     def transfer(self, from_account_id, to_account_id, amount):
         """Transfer money between accounts.
@@ -206,25 +875,65 @@ class BankDatabase:
         Raises:
             ValueError: If accounts don't exist, amount is invalid or insufficient funds
         """
-        from_account = self.storage.get_account(from_account_id)
-        to_account = self.storage.get_account(to_account_id)
-        
-        if not from_account:
-            raise ValueError(f"Source account with ID {from_account_id} not found")
-        if not to_account:
-            raise ValueError(f"Destination account with ID {to_account_id} not found")
+        # Lock both accounts (in a fixed order, so concurrent transfers can't
+        # deadlock) for the whole read-modify-write
+        with self._account_locks.hold(from_account_id, to_account_id), \
+                self._versions.writing():
+            from_account = self.storage.get_account(from_account_id)
+            to_account = self.storage.get_account(to_account_id)
             
-        # Withdraw from source account
-        from_account.withdraw(amount)
-        
-        # Deposit to destination account
-        to_account.deposit(amount)
+            if not from_account:
+                raise ValueError(f"Source account with ID {from_account_id} not found")
+            if not to_account:
+                raise ValueError(f"Destination account with ID {to_account_id} not found")
+                
+            from_values = self._before_update("accounts", from_account)
+            to_values = self._before_update("accounts", to_account)
+            
+            changed = []  # (account, old values) of accounts modified so far
+            saved = []  # Accounts saved so far
+            try:
+                # Withdraw from source account
+                from_account.withdraw(amount)
+                changed.append((from_account, from_values))
+                
+                # Deposit to destination account
+                to_account.deposit(amount)
+                changed.append((to_account, to_values))
+                
+                # Save both accounts
+                self._save_locked_account(from_account)
+                saved.append(from_account)
+                self._save_locked_account(to_account)
+                saved.append(to_account)
+            except Exception:
+                # Put back the balances changed so far, so a failed transfer
+                # never loses or creates money, and only save again what
+                # was already saved
+                for account, values in reversed(changed):
+                    account.balance = values["balance"]
+                for account in saved:
+                    self.storage.save_account(account)
+                raise
+            
+            self._after_update("accounts", from_account, from_values)
+            self._after_update("accounts", to_account, to_values)
+            
+            return (from_account.balance, to_account.balance)
+    
+    def _save_locked_account(self, account):
+        """Save an account changed under its lock, checking it still exists.
         
-        # Save both accounts
-        self.storage.save_account(from_account)
-        self.storage.save_account(to_account)
+        Deletes take the same lock, so this only fails if the account was
+        deleted some other way, such as by a storage cascade; saving it
+        anyway would bring it back.
         
-        return (from_account.balance, to_account.balance)
+        Raises:
+            ValueError: If the account no longer exists
+        """
+        if not self.storage.get_account(account.id):
+            raise ValueError(f"Account with ID {account.id} not found")
+        self.storage.save_account(account)
     
     def get_account_balance(self, account_id):
         """Get the current balance of an account.
@@ -242,4 +951,43 @@ class BankDatabase:
         if not account:
             raise ValueError(f"Account with ID {account_id} not found")
             
-        return account.balance
\ No newline at end of file
+        return account.balance
+
+
+def _indexed_value(index, record):
+    """Get the value an index keys a record by.
+    
+    Args:
+        index: The index
+        record: A record, or a dict of field values from _before_update()
+        
+    Returns:
+        The field's value, or a tuple of values for a composite index
+    """
+    if isinstance(record, dict):
+        get = record.get
+    else:
+        get = lambda field: getattr(record, field, None)
+    if isinstance(index, BankCompositeIndex):
+        return tuple(get(field) for field in index.fields)
+    return get(index.field)
+
+
+def _apply_to_aggregates(aggregates, operation, account, old_values=None):
+    """Apply one account write to BalanceAggregates; see BankDatabase._log_write()."""
+    if operation == "insert":
+        aggregates.add_accounts((account,))
+    elif operation == "update":
+        aggregates.update_account(account, old_values)
+    else:
+        aggregates.remove_accounts((account,))
+
+
+def _batches(iterable, size):
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -1,3 +1,7 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from operator import itemgetter
+
 class Index:
     """Class for indexing database records by specific fields."""
     
@@ -168,6 +172,30 @@ class BankIndex:
         self._index[value].add(account.id)
         return True
     
+    def add_users(self, users):
+        """Add a batch of users to the index.
+        
+        Args:
+            users: Iterable of users to index
+            
+        Returns:
+            Number of users indexed
+        """
+        add_user = self.add_user
+        return sum(1 for user in users if add_user(user))
+    
+    def add_accounts(self, accounts):
+        """Add a batch of accounts to the index.
+        
+        Args:
+            accounts: Iterable of accounts to index
+            
+        Returns:
+            Number of accounts indexed
+        """
+        add_account = self.add_account
+        return sum(1 for account in accounts if add_account(account))
+    
     def find(self, value):
         """Find all record IDs with the given field value.
         
@@ -214,4 +242,644 @@ class BankIndex:
         
     def values(self):
         """Get all unique values in this index."""
-        return list(self._index.keys())
\ No newline at end of file
+        return list(self._index.keys())
+
+
+class BankCompositeIndex:
+    """Index of bank users or accounts by an ordered tuple of fields.
+    
+    A (user_id, account_type) index answers user_id = ... AND
+    account_type = ... with one hash probe, and also serves lookups on any
+    leading prefix of its fields, such as user_id alone.
+    """
+    
+    def __init__(self, fields):
+        """Initialize a new composite index.
+        
+        Args:
+            fields: The field names to index on, in order
+        """
+        if isinstance(fields, str):
+            fields = (fields,)
+        self.fields = tuple(fields)
+        self._index = {}  # Maps full value tuples to sets of record IDs
+        # For each shorter prefix length, maps prefix tuples to the set of
+        # full value tuples that extend them
+        self._prefixes = [{} for _ in self.fields[:-1]]
+    
+    @staticmethod
+    def _hashable(value):
+        """Make a field value usable in a key, as BankIndex does."""
+        if value is None or isinstance(value, (str, int, float, bool, tuple)):
+            return value
+        return str(value)
+    
+    def value_of(self, record):
+        """Get the tuple of a record's values for the indexed fields."""
+        return tuple(getattr(record, field, None) for field in self.fields)
+    
+    def _add(self, record):
+        if not record or not record.id:
+            return False
+            
+        key = tuple(self._hashable(value) for value in self.value_of(record))
+        # A record without the leading field can't match any lookup
+        if key[0] is None:
+            return False
+            
+        ids = self._index.get(key)
+        if ids is None:
+            ids = self._index[key] = set()
+            for length, prefixes in enumerate(self._prefixes, 1):
+                prefixes.setdefault(key[:length], set()).add(key)
+        ids.add(record.id)
+        return True
+    
+    def add_user(self, user):
+        """Add a user to the index.
+        
+        Returns:
+            True if indexed, False otherwise
+        """
+        return self._add(user)
+    
+    def add_account(self, account):
+        """Add an account to the index.
+        
+        Returns:
+            True if indexed, False otherwise
+        """
+        return self._add(account)
+    
+    def add_users(self, users):
+        """Add a batch of users to the index.
+        
+        Returns:
+            Number of users indexed
+        """
+        return sum(1 for user in users if self._add(user))
+    
+    def add_accounts(self, accounts):
+        """Add a batch of accounts to the index.
+        
+        Returns:
+            Number of accounts indexed
+        """
+        return sum(1 for account in accounts if self._add(account))
+    
+    def find(self, values):
+        """Find all record IDs matching values for a prefix of the fields.
+        
+        Args:
+            values: Tuple of values for the first len(values) fields
+            
+        Returns:
+            A set of record IDs matching the values
+            
+        Raises:
+            ValueError: If more values than fields are given
+        """
+        if not values or len(values) > len(self.fields):
+            raise ValueError(f"Expected 1 to {len(self.fields)} values, got {len(values)}")
+            
+        key = tuple(self._hashable(value) for value in values)
+        if len(key) == len(self.fields):
+            return self._index.get(key, set())
+            
+        keys = self._prefixes[len(key) - 1].get(key, ())
+        if len(keys) == 1:
+            return self._index[next(iter(keys))]
+        ids = set()
+        for full_key in keys:
+            ids |= self._index[full_key]
+        return ids
+    
+    def remove(self, record_id, value):
+        """Remove a record from the index.
+        
+        Args:
+            record_id: The ID of the record to remove
+            value: The tuple of field values to remove it from
+            
+        Returns:
+            True if removed, False otherwise
+        """
+        if value is None or record_id is None:
+            return False
+            
+        key = tuple(self._hashable(item) for item in value)
+        ids = self._index.get(key)
+        if ids is None or record_id not in ids:
+            return False
+        ids.remove(record_id)
+        if not ids:  # Clean up empty sets, and the prefixes pointing at them
+            del self._index[key]
+            for length, prefixes in enumerate(self._prefixes, 1):
+                keys = prefixes[key[:length]]
+                keys.discard(key)
+                if not keys:
+                    del prefixes[key[:length]]
+        return True
+    
+    def clear(self):
+        """Clear the index."""
+        self._index = {}
+        self._prefixes = [{} for _ in self.fields[:-1]]
+        
+    def values(self):
+        """Get all unique value tuples in this index."""
+        return list(self._index.keys())
+
+
+class BankSortedIndex:
+    """Class for indexing bank users and accounts by an ordered field.
+    
+    Unlike BankIndex, which maps each value to a set of IDs, this index keeps
+    a sorted list of (value, record_id) pairs, so it can answer range and
+    top-k lookups with a binary search instead of a scan. Records whose
+    value is None are kept apart, as they can't be compared with values;
+    ordered() lists them first, as BankQuery sorts them.
+    """
+    
+    def __init__(self, field):
+        """Initialize a new sorted index for a specific field.
+        
+        Args:
+            field: The field name to index on
+        """
+        self.field = field
+        self._keys = []  # Sorted list of (value, record_id) pairs
+        self._none_ids = []  # Sorted IDs of the records whose value is None
+    
+    def _add(self, record):
+        """Insert a record's (value, ID) pair at its sorted position."""
+        if not record or not record.id:
+            return False
+            
+        value = getattr(record, self.field, None)
+        if value is None:
+            position = bisect_left(self._none_ids, record.id)
+            if position == len(self._none_ids) or self._none_ids[position] != record.id:
+                self._none_ids.insert(position, record.id)
+            return True
+            
+        self._add_key((value, record.id))
+        return True
+    
+    def _add_key(self, key):
+        """Insert a (value, record_id) pair at its sorted position."""
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            self._keys.insert(position, key)
+    
+    def add_user(self, user):
+        """Add a user to the index.
+        
+        Args:
+            user: The user to index
+            
+        Returns:
+            True if indexed, False otherwise
+        """
+        return self._add(user)
+    
+    def add_account(self, account):
+        """Add an account to the index.
+        
+        Args:
+            account: The account to index
+            
+        Returns:
+            True if indexed, False otherwise
+        """
+        return self._add(account)
+    
+    def _add_many(self, records):
+        """Insert a batch of new records with one sort instead of one insert each."""
+        field = self.field
+        keys = []
+        none_ids = []
+        for record in records:
+            if record and record.id:
+                value = getattr(record, field, None)
+                if value is None:
+                    none_ids.append(record.id)
+                else:
+                    keys.append((value, record.id))
+        if len(keys) > 1:
+            self._keys.extend(keys)
+            self._keys.sort()
+        elif keys:
+            self._add_key(keys[0])
+        if none_ids:
+            self._none_ids.extend(none_ids)
+            self._none_ids.sort()
+        return len(keys) + len(none_ids)
+    
+    def add_users(self, users):
+        """Add a batch of users that are not in the index yet.
+        
+        Args:
+            users: Iterable of users to index
+            
+        Returns:
+            Number of users indexed
+        """
+        return self._add_many(users)
+    
+    def add_accounts(self, accounts):
+        """Add a batch of accounts that are not in the index yet.
+        
+        Args:
+            accounts: Iterable of accounts to index
+            
+        Returns:
+            Number of accounts indexed
+        """
+        return self._add_many(accounts)
+    
+    def _bounds(self, min_value=None, max_value=None):
+        """Get the slice of _keys whose values fall within [min_value, max_value]."""
+        start = 0
+        end = len(self._keys)
+        if min_value is not None:
+            start = bisect_left(self._keys, min_value, key=itemgetter(0))
+        if max_value is not None:
+            end = bisect_right(self._keys, max_value, key=itemgetter(0))
+        return start, max(start, end)
+    
+    def find(self, value):
+        """Find all record IDs with the given field value.
+        
+        Args:
+            value: The value to search for
+            
+        Returns:
+            A set of record IDs matching the value
+        """
+        if value is None:
+            return set()
+            
+        start, end = self._bounds(value, value)
+        return {record_id for _, record_id in self._keys[start:end]}
+    
+    def range(self, min_value=None, max_value=None, reverse=False):
+        """Find record IDs whose value is within an inclusive range.
+        
+        Args:
+            min_value: Lower bound, or None for no lower bound
+            max_value: Upper bound, or None for no upper bound
+            reverse: If True, return IDs in descending value order
+            
+        Returns:
+            A list of record IDs ordered by value
+        """
+        start, end = self._bounds(min_value, max_value)
+        keys = self._keys[start:end]
+        if reverse:
+            keys.reverse()
+        return [record_id for _, record_id in keys]
+    
+    def count_range(self, min_value=None, max_value=None):
+        """Count the records whose value is within an inclusive range."""
+        start, end = self._bounds(min_value, max_value)
+        return end - start
+    
+    def iter_range(self, min_value=None, max_value=None, reverse=False, after=None):
+        """Lazily iterate over record IDs whose value is within an inclusive range.
+        
+        The index must not be modified while iterating.
+        
+        Args:
+            min_value: Lower bound, or None for no lower bound
+            max_value: Upper bound, or None for no upper bound
+            reverse: If True, iterate in descending value order
+            after: A (value, record_id) key to resume after, skipping it and
+                everything before it in iteration order with a binary search
+            
+        Yields:
+            Record IDs ordered by value, then by ID
+        """
+        start, end = self._bounds(min_value, max_value)
+        if after is not None and after[0] is None:
+            if reverse:  # None sorts first, so nothing comes after it
+                end = start
+        elif after is not None:
+            if reverse:
+                end = min(end, bisect_left(self._keys, after))
+            else:
+                start = max(start, bisect_right(self._keys, after))
+        positions = range(end - 1, start - 1, -1) if reverse else range(start, end)
+        keys = self._keys
+        for position in positions:
+            yield keys[position][1]
+    
+    def ordered(self, reverse=False, after=None):
+        """Iterate over all record IDs in value order.
+        
+        Records whose value is None come first, in ID order, or last when
+        reversed. The index must not be modified while iterating.
+        
+        Args:
+            reverse: If True, iterate in descending value order
+            after: A (value, record_id) key to resume after; see iter_range()
+            
+        Returns:
+            An iterator over record IDs ordered by value
+        """
+        none_ids = self._none_ids
+        if after is not None and after[0] is None:
+            if reverse:
+                none_ids = none_ids[:bisect_left(none_ids, after[1])]
+            else:
+                none_ids = none_ids[bisect_right(none_ids, after[1]):]
+        elif after is not None and not reverse:
+            none_ids = []  # The cursor is already past them
+        keys = self.iter_range(reverse=reverse, after=after)
+        if reverse:
+            return chain(keys, reversed(none_ids))
+        return chain(none_ids, keys)
+    
+    def top(self, k):
+        """Get the IDs of the k records with the largest values.
+        
+        Args:
+            k: Number of IDs to return
+            
+        Returns:
+            A list of record IDs in descending value order
+        """
+        if k <= 0:
+            return []
+        return [record_id for _, record_id in reversed(self._keys[-k:])]
+    
+    def remove(self, record_id, value):
+        """Remove a record from the index.
+        
+        Args:
+            record_id: The ID of the record to remove
+            value: The value to remove it from
+            
+        Returns:
+            True if removed, False otherwise
+        """
+        if record_id is None:
+            return False
+        if value is None:
+            position = bisect_left(self._none_ids, record_id)
+            if position < len(self._none_ids) and self._none_ids[position] == record_id:
+                del self._none_ids[position]
+                return True
+            return False
+            
+        key = (value, record_id)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+            return True
+        return False
+    
+    def clear(self):
+        """Clear the index."""
+        self._keys = []
+        self._none_ids = []
+        
+    def values(self):
+        """Get all unique values in this index."""
+        values = []
+        for value, _ in self._keys:
+            if not values or values[-1] != value:
+                values.append(value)
+        return values
+
+
+class BankTextIndex:
+    """Class for searching bank users and accounts by parts of a text field.
+    
+    Values are matched case-insensitively. A sorted list of (lowercased
+    value, record_id) pairs answers prefix lookups with a binary search,
+    and a trigram index answers substring lookups: every record whose value
+    contains a search string also contains all of its trigrams. Values are
+    padded with boundary markers so short values and short search strings
+    have trigrams too.
+    
+    Substring lookups return candidates that must still be checked against
+    the search string; prefix and equality lookups are exact.
+    """
+    
+    GRAM_SIZE = 3
+    
+    def __init__(self, field):
+        """Initialize a new text index for a specific field.
+        
+        Args:
+            field: The field name to index on
+        """
+        self.field = field
+        self._keys = []  # Sorted list of (lowercased value, record_id) pairs
+        self._grams = {}  # Maps trigrams to sets of record IDs
+        self._values = {}  # Maps record IDs to their indexed value
+    
+    @classmethod
+    def _trigrams(cls, text):
+        """Get the distinct trigrams of a lowercased value, with boundary markers."""
+        padded = f"\x02{text}\x03"
+        size = cls.GRAM_SIZE
+        return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+    
+    def _add(self, record):
+        """Index a record's value for prefix and substring lookups."""
+        if not record or not record.id:
+            return False
+            
+        value = getattr(record, self.field, None)
+        if not isinstance(value, str):
+            return False
+            
+        text = value.lower()
+        key = (text, record.id)
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            self._keys.insert(position, key)
+        for gram in self._trigrams(text):
+            self._grams.setdefault(gram, set()).add(record.id)
+        self._values[record.id] = value
+        return True
+    
+    def add_user(self, user):
+        """Add a user to the index.
+        
+        Args:
+            user: The user to index
+            
+        Returns:
+            True if indexed, False otherwise
+        """
+        return self._add(user)
+    
+    def add_account(self, account):
+        """Add an account to the index.
+        
+        Args:
+            account: The account to index
+            
+        Returns:
+            True if indexed, False otherwise
+        """
+        return self._add(account)
+    
+    def _add_many(self, records):
+        """Index a batch of new records with one sort instead of one insert each."""
+        keys = []
+        grams = self._grams
+        for record in records:
+            if record and record.id:
+                value = getattr(record, self.field, None)
+                if isinstance(value, str):
+                    text = value.lower()
+                    keys.append((text, record.id))
+                    for gram in self._trigrams(text):
+                        ids = grams.get(gram)
+                        if ids is None:
+                            ids = grams[gram] = set()
+                        ids.add(record.id)
+                    self._values[record.id] = value
+        self._keys.extend(keys)
+        self._keys.sort()
+        return len(keys)
+    
+    def add_users(self, users):
+        """Add a batch of users that are not in the index yet.
+        
+        Args:
+            users: Iterable of users to index
+            
+        Returns:
+            Number of users indexed
+        """
+        return self._add_many(users)
+    
+    def add_accounts(self, accounts):
+        """Add a batch of accounts that are not in the index yet.
+        
+        Args:
+            accounts: Iterable of accounts to index
+            
+        Returns:
+            Number of accounts indexed
+        """
+        return self._add_many(accounts)
+    
+    def _prefix_bounds(self, prefix):
+        """Get the slice of _keys whose values start with a lowercased prefix."""
+        start = bisect_left(self._keys, prefix, key=itemgetter(0))
+        end = bisect_left(self._keys, prefix + "\U0010ffff", key=itemgetter(0))
+        return start, end
+    
+    def find(self, value):
+        """Find all record IDs with exactly the given field value.
+        
+        Args:
+            value: The value to search for
+            
+        Returns:
+            A set of record IDs matching the value
+        """
+        if not isinstance(value, str):
+            return set()
+            
+        text = value.lower()
+        start = bisect_left(self._keys, text, key=itemgetter(0))
+        end = bisect_right(self._keys, text, key=itemgetter(0))
+        return {record_id for _, record_id in self._keys[start:end]
+                if self._values.get(record_id) == value}
+    
+    def prefix(self, prefix):
+        """Find all record IDs whose value starts with a prefix, ignoring case.
+        
+        Args:
+            prefix: The prefix to search for
+            
+        Returns:
+            A set of record IDs matching the prefix
+        """
+        start, end = self._prefix_bounds(prefix.lower())
+        return {record_id for _, record_id in self._keys[start:end]}
+    
+    def count_prefix(self, prefix):
+        """Count the records whose value starts with a prefix, ignoring case."""
+        start, end = self._prefix_bounds(prefix.lower())
+        return end - start
+    
+    def search(self, text):
+        """Find candidate record IDs whose value contains a string, ignoring case.
+        
+        Every matching record is included, but some candidates may not
+        contain the string, so they must still be checked.
+        
+        Args:
+            text: The string to search for
+            
+        Returns:
+            A set of candidate record IDs
+        """
+        text = text.lower()
+        if len(text) < self.GRAM_SIZE:
+            # Too short to have a trigram of its own; take every trigram
+            # containing it instead
+            ids = set()
+            for gram, gram_ids in self._grams.items():
+                if text in gram:
+                    ids |= gram_ids
+            return ids
+            
+        grams = sorted(
+            (self._grams.get(text[i:i + self.GRAM_SIZE], set())
+             for i in range(len(text) - self.GRAM_SIZE + 1)),
+            key=len,
+        )
+        ids = set(grams[0])
+        for gram_ids in grams[1:]:
+            if not ids:
+                break
+            ids &= gram_ids
+        return ids
+    
+    def remove(self, record_id, value):
+        """Remove a record from the index.
+        
+        Args:
+            record_id: The ID of the record to remove
+            value: The value to remove it from
+            
+        Returns:
+            True if removed, False otherwise
+        """
+        if not isinstance(value, str) or record_id is None:
+            return False
+            
+        text = value.lower()
+        key = (text, record_id)
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return False
+            
+        del self._keys[position]
+        for gram in self._trigrams(text):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:  # Clean up empty sets
+                    del self._grams[gram]
+        self._values.pop(record_id, None)
+        return True
+    
+    def clear(self):
+        """Clear the index."""
+        self._keys = []
+        self._grams = {}
+        self._values = {}
+        
+    def values(self):
+        """Get all unique values in this index."""
+        return sorted(set(self._values.values()))
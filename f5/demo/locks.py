@@ -0,0 +1,41 @@
+import threading
+from contextlib import contextmanager
+
+
+class AccountLocks:
+    """Striped locks for serializing changes to accounts.
+
+    Each account ID maps to one of a fixed number of locks, so memory does
+    not grow with the number of accounts. Locks for several accounts are
+    always acquired in stripe order, which means two threads locking
+    overlapping sets of accounts can never deadlock.
+    """
+
+    def __init__(self, stripes=1024):
+        """Initialize the lock stripes.
+
+        Args:
+            stripes: Number of locks to spread account IDs over
+        """
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripes(self, account_ids):
+        """Get the distinct stripe numbers for account IDs in acquisition order."""
+        count = len(self._locks)
+        return sorted({hash(account_id) % count for account_id in account_ids})
+
+    @contextmanager
+    def hold(self, *account_ids):
+        """Hold the locks for one or more accounts.
+
+        Args:
+            account_ids: IDs of the accounts to lock
+        """
+        locks = [self._locks[stripe] for stripe in self._stripes(account_ids)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
@@ -0,0 +1,415 @@
+import json
+import mmap
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it scans unpack rows with struct
+    np = None
+
+from .record import Account
+from .storage import BankStorage, MemoryStorage
+from .columnar import column_mask, column_totals, split_column_conditions
+
+MAGIC = b"F5ACCT01"
+
+# The header holds the magic, the number of row slots in use and the account
+# type table as JSON; rows follow it.
+HEADER_SIZE = 4096
+HEADER = struct.Struct("<8sQI")
+
+# Row layout: id, user_id (0 for None), type code (0 for None), live flag,
+# padding, balance (NaN for None)
+ROW = struct.Struct("<qqHB5xd")
+ROW_SIZE = ROW.size
+USER_ID_OFFSET = 8
+TYPE_OFFSET = 16
+LIVE_OFFSET = 18
+BALANCE_OFFSET = 24
+
+INT64 = struct.Struct("<q")
+UINT16 = struct.Struct("<H")
+FLOAT64 = struct.Struct("<d")
+
+if np is not None:
+    ROW_DTYPE = np.dtype({
+        "names": ["id", "user_id", "type", "live", "balance"],
+        "formats": ["<i8", "<i8", "<u2", "u1", "<f8"],
+        "offsets": [0, USER_ID_OFFSET, TYPE_OFFSET, LIVE_OFFSET, BALANCE_OFFSET],
+        "itemsize": ROW_SIZE,
+    })
+
+INITIAL_ROWS = 1024
+
+
+def _numeric_id(record_id):
+    """Convert a record ID to the integer stored in the file.
+
+    Raises:
+        ValueError: If the ID is not a positive integer
+    """
+    try:
+        number = int(record_id)
+    except (TypeError, ValueError):
+        number = 0
+    if number <= 0:
+        raise ValueError(f"MappedStorage requires positive integer IDs, got {record_id!r}")
+    return number
+
+
+def _owner_key(user_code):
+    """Get the user -> rows map key for a stored user ID (0 for None)."""
+    return str(user_code) if user_code else None
+
+
+class MappedAccountRow(Account):
+    """View of one account row inside a MappedStorage file.
+
+    Fields are read from and written to the memory map on access, so no
+    Account object is built when the file is opened.
+    """
+
+    __slots__ = ("_storage", "_row")
+
+    def __init__(self, storage, row):
+        """Initialize a view of a row.
+
+        Args:
+            storage: The MappedStorage holding the row
+            row: Row number in the file
+        """
+        self._storage = storage
+        self._row = row
+
+    def _offset(self):
+        return HEADER_SIZE + self._row * ROW_SIZE
+
+    @property
+    def id(self):
+        """The account ID."""
+        return str(self._row + 1)
+
+    @property
+    def user_id(self):
+        """ID of the user who owns this account."""
+        user_id = INT64.unpack_from(self._storage._map, self._offset() + USER_ID_OFFSET)[0]
+        return str(user_id) if user_id else None
+
+    @user_id.setter
+    def user_id(self, user_id):
+        self._storage._set_user_id(self._row, user_id)
+
+    @property
+    def account_type(self):
+        """Type of account (checking, savings, etc.)."""
+        code = UINT16.unpack_from(self._storage._map, self._offset() + TYPE_OFFSET)[0]
+        return self._storage._type_names[code]
+
+    @account_type.setter
+    def account_type(self, account_type):
+        code = self._storage._type_code(account_type)
+        UINT16.pack_into(self._storage._map, self._offset() + TYPE_OFFSET, code)
+
+    @property
+    def balance(self):
+        """Current account balance."""
+        balance = FLOAT64.unpack_from(self._storage._map, self._offset() + BALANCE_OFFSET)[0]
+        return None if balance != balance else balance  # NaN stands for None
+
+    @balance.setter
+    def balance(self, balance):
+        value = float("nan") if balance is None else balance
+        FLOAT64.pack_into(self._storage._map, self._offset() + BALANCE_OFFSET, value)
+
+    def copy(self):
+        """Get a detached Account with the row's current values."""
+        return Account(self.id, self.user_id, self.account_type, self.balance)
+
+
+class MappedStorage(BankStorage):
+    """BankStorage keeping accounts in a memory-mapped, fixed-width binary file.
+
+    Account N lives in row N - 1, so get_account() is an offset computation
+    and opening the file only maps it instead of loading every account.
+    Scans and vectorized filters read the map through NumPy views when NumPy
+    is installed. Account and user IDs must be positive integers (as strings,
+    like the IDs MemoryStorage hands out).
+
+    Users are kept in a separate storage, MemoryStorage by default; pass a
+    FileStorage to persist them as well.
+
+    The header's row count is written by flush() and close(), so accounts
+    added to the end of the file since then are not seen when it is
+    reopened after a crash.
+    """
+
+    def __init__(self, path, user_storage=None):
+        """Open or create a mapped account file.
+
+        Args:
+            path: Path of the account file
+            user_storage: BankStorage for users, defaults to MemoryStorage
+        """
+        super().__init__()
+        self.path = path
+        self.users = user_storage or MemoryStorage()
+        self._user_rows = None  # user_id (as str) -> set of rows, built on first use
+        self._header_dirty = False  # Row count changed since the header was written
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(HEADER_SIZE + INITIAL_ROWS * ROW_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+        if exists:
+            magic, self._row_count, table_size = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a mapped account file")
+            table = self._map[HEADER.size:HEADER.size + table_size]
+            self._type_names = json.loads(table)
+        else:
+            self._row_count = 0
+            self._type_names = [None]  # Code 0 stands for None
+            self._write_header()
+        self._type_name_codes = {
+            name: code for code, name in enumerate(self._type_names) if code
+        }
+
+    # File helpers
+
+    def _write_header(self):
+        """Write the row count and type table to the header."""
+        table = json.dumps(self._type_names).encode("utf-8")
+        if HEADER.size + len(table) > HEADER_SIZE:
+            raise ValueError("Too many account types for the file header")
+        HEADER.pack_into(self._map, 0, MAGIC, self._row_count, len(table))
+        self._map[HEADER.size:HEADER.size + len(table)] = table
+        self._header_dirty = False
+
+    def _capacity(self):
+        """Number of rows the file currently has room for."""
+        return (len(self._map) - HEADER_SIZE) // ROW_SIZE
+
+    def _ensure_row(self, row):
+        """Grow the file so it has room for a row."""
+        if row < self._capacity():
+            return
+        capacity = max(row + 1, self._capacity() * 2)
+        self._map.close()
+        self._file.truncate(HEADER_SIZE + capacity * ROW_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def _type_code(self, account_type):
+        """Get the code for an account type, adding it to the table if new."""
+        if account_type is None:
+            return 0
+        code = self._type_name_codes.get(account_type)
+        if code is None:
+            code = len(self._type_names)
+            self._type_names.append(account_type)
+            self._type_name_codes[account_type] = code
+            self._write_header()
+        return code
+
+    def _is_live(self, row):
+        return 0 <= row < self._row_count and self._map[HEADER_SIZE + row * ROW_SIZE + LIVE_OFFSET]
+
+    def _rows_view(self):
+        """Get a NumPy structured view of the rows in use."""
+        return np.frombuffer(self._map, dtype=ROW_DTYPE, count=self._row_count,
+                             offset=HEADER_SIZE)
+
+    def _live_rows(self):
+        """Get the numbers of all rows holding an account."""
+        if np is not None:
+            return np.flatnonzero(self._rows_view()["live"]).tolist()
+        start = HEADER_SIZE + LIVE_OFFSET
+        flags = self._map[start:start + self._row_count * ROW_SIZE:ROW_SIZE]
+        return [row for row, live in enumerate(flags) if live]
+
+    def _owner_rows(self):
+        """Get the user -> rows map, building it with one scan on first use."""
+        if self._user_rows is None:
+            self._user_rows = {}
+            for row in self._live_rows():
+                user_id = MappedAccountRow(self, row).user_id
+                self._user_rows.setdefault(user_id, set()).add(row)
+        return self._user_rows
+
+    def _rows_of_user(self, user_id):
+        """Get the rows of a user's accounts, keyed as the file stores the ID."""
+        try:
+            code = 0 if user_id is None else _numeric_id(user_id)
+        except ValueError:
+            return ()  # No row can hold such an owner
+        return self._owner_rows().get(_owner_key(code), ())
+
+    def _set_user_id(self, row, user_id):
+        """Change the owner of a row, keeping the user -> rows map in step."""
+        code = 0 if user_id is None else _numeric_id(user_id)
+        offset = HEADER_SIZE + row * ROW_SIZE + USER_ID_OFFSET
+        old_code = INT64.unpack_from(self._map, offset)[0]
+        INT64.pack_into(self._map, offset, code)
+        if self._user_rows is not None and code != old_code and self._is_live(row):
+            self._unlink_row(row, _owner_key(old_code))
+            self._user_rows.setdefault(_owner_key(code), set()).add(row)
+
+    def _unlink_row(self, row, user_id):
+        """Remove a row from its user's entry in the user -> rows map."""
+        if self._user_rows is None:
+            return
+        rows = self._user_rows.get(user_id)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:  # Clean up empty sets
+                del self._user_rows[user_id]
+
+    def flush(self):
+        """Write the header if needed and flush the memory map to disk."""
+        if self._header_dirty:
+            self._write_header()
+        self._map.flush()
+
+    def close(self):
+        """Flush and close the account file."""
+        if not self._map.closed:
+            self.flush()
+            self._map.close()
+            self._file.close()
+
+    # User operations
+
+    def save_user(self, user):
+        """Save a user to the user storage."""
+        return self.users.save_user(user)
+
+    def get_user(self, user_id):
+        """Get a user from the user storage."""
+        return self.users.get_user(user_id)
+
+    def delete_user(self, user_id):
+        """Delete a user and their accounts."""
+        if self.users.get_user(user_id) is None:
+            return False
+        for row in list(self._rows_of_user(user_id)):
+            self.delete_account(str(row + 1))
+        return self.users.delete_user(user_id)
+
+    def get_all_users(self):
+        """Get all users from the user storage."""
+        return self.users.get_all_users()
+
+    # Account operations
+
+    def save_account(self, account):
+        """Save an account to its row in the file.
+
+        Returns:
+            A MappedAccountRow view of the stored account
+        """
+        if isinstance(account, MappedAccountRow) and account._storage is self:
+            return account  # Its writes already went to the file
+
+        if account.id is None:
+            account.id = str(self._row_count + 1)
+        row = _numeric_id(account.id) - 1
+        self._ensure_row(row)
+
+        offset = HEADER_SIZE + row * ROW_SIZE
+        if self._is_live(row):
+            self._unlink_row(row, MappedAccountRow(self, row).user_id)
+        balance = float("nan") if account.balance is None else account.balance
+        user_code = 0 if account.user_id is None else _numeric_id(account.user_id)
+        ROW.pack_into(self._map, offset, row + 1, user_code,
+                      self._type_code(account.account_type), 1, balance)
+
+        if row >= self._row_count:
+            self._row_count = row + 1
+            self._header_dirty = True
+        if self._user_rows is not None:
+            self._user_rows.setdefault(_owner_key(user_code), set()).add(row)
+        return MappedAccountRow(self, row)
+
+    def get_account(self, account_id):
+        """Get a view of an account by ID."""
+        try:
+            row = _numeric_id(account_id) - 1
+        except ValueError:
+            return None
+        return MappedAccountRow(self, row) if self._is_live(row) else None
+
+    def delete_account(self, account_id):
+        """Delete an account by clearing its live flag."""
+        account = self.get_account(account_id)
+        if account is None:
+            return False
+        self._unlink_row(account._row, account.user_id)
+        self._map[HEADER_SIZE + account._row * ROW_SIZE + LIVE_OFFSET] = 0
+        return True
+
+    def get_all_accounts(self):
+        """Get views of all accounts in the file."""
+        return [MappedAccountRow(self, row) for row in self._live_rows()]
+
+    def get_user_accounts(self, user_id):
+        """Get views of all accounts for a specific user."""
+        return [MappedAccountRow(self, row) for row in self._rows_of_user(user_id)]
+
+    # Vectorized evaluation
+
+    def split_account_conditions(self, conditions):
+        """Split account query conditions into those evaluated on the file and the rest."""
+        return split_column_conditions(conditions)
+
+    def find_accounts(self, conditions):
+        """Get views of the accounts matching conditions pushed by
+        split_account_conditions().
+
+        Args:
+            conditions: List of (field, operator, value) tuples
+
+        Returns:
+            List of matching MappedAccountRow views in row order
+        """
+        if not self._row_count:
+            return []
+
+        def user_code(user_id):
+            try:
+                return _numeric_id(user_id)
+            except ValueError:
+                return None
+
+        rows = self._rows_view()
+        mask = column_mask(
+            conditions,
+            live=rows["live"],
+            balance=rows["balance"],
+            account_types=rows["type"],
+            user_ids=rows["user_id"],
+            type_code=self._type_name_codes.get,
+            user_code=user_code,
+        )
+        del rows  # Release the view so the map can be resized later
+        return [MappedAccountRow(self, row) for row in np.flatnonzero(mask).tolist()]
+
+    def total_balance_by_type(self):
+        """Sum the balances of all accounts per account type.
+
+        Returns:
+            Dict mapping account type to total balance
+        """
+        if np is not None and self._row_count:
+            rows = self._rows_view()
+            return column_totals(rows["live"], rows["balance"], rows["type"], self._type_names)
+
+        totals = {}
+        end = HEADER_SIZE + self._row_count * ROW_SIZE
+        with memoryview(self._map) as view:
+            for _, _, code, live, balance in ROW.iter_unpack(view[HEADER_SIZE:end]):
+                if live:
+                    name = self._type_names[code]
+                    totals[name] = totals.get(name, 0.0) + (balance if balance == balance else 0.0)
+        return totals
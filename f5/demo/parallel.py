@@ -0,0 +1,116 @@
+import heapq
+import multiprocessing
+import threading
+from itertools import islice
+
+from .cursor import order_key
+from .predicate import compile_bank_conditions
+
+# Smallest collection worth starting worker processes for
+PARALLEL_MIN_RECORDS = 50_000
+
+# Work for the forked workers. Set just before the pool is started, so each
+# worker inherits the records through fork's copy-on-write memory instead of
+# having them pickled.
+_scan = None
+_scan_lock = threading.Lock()
+
+
+def _partitions(size, parts):
+    """Split range(size) into contiguous (start, end) partitions."""
+    step = -(-size // parts)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def _scan_partition(bounds):
+    """Scan one partition in a worker process.
+
+    Returns:
+        The number of matches when counting, the positions of the matches
+        when not sorting, and otherwise order_key() tuples extended with
+        the position, in sort order
+    """
+    records, conditions, field, reverse, stop, counting = _scan
+    start, end = bounds
+    positions = range(start, end)
+    if conditions:
+        predicate = compile_bank_conditions(conditions)
+        positions = (position for position in positions if predicate(records[position]))
+    if counting:
+        return sum(1 for _ in islice(positions, stop))
+    if field is None:
+        return list(islice(positions, stop))
+
+    keyed = ((*order_key(getattr(records[position], field, None), records[position].id),
+              position) for position in positions)
+    if stop is None:
+        return sorted(keyed, reverse=reverse)
+    if reverse:
+        return heapq.nlargest(stop, keyed)
+    return heapq.nsmallest(stop, keyed)
+
+
+def _run(records, conditions, processes, field, reverse, stop, counting):
+    """Map _scan_partition over the records in a pool of forked processes."""
+    global _scan
+
+    parts = _partitions(len(records), processes * 4)
+    context = multiprocessing.get_context("fork")
+    with _scan_lock:
+        _scan = (records, conditions, field, reverse, stop, counting)
+        try:
+            with context.Pool(processes) as pool:
+                return pool.map(_scan_partition, parts)
+        finally:
+            _scan = None
+
+
+def parallel_scan(records, conditions, processes, sort_field=None, reverse=False, stop=None):
+    """Filter and optionally sort records on several processes.
+
+    The records are split into contiguous partitions. Forked workers
+    evaluate the compiled conditions and sort their own matches, and the
+    sorted partitions are combined with a k-way merge. The result is the
+    same as a sequential scan, including the order of ties, which are
+    broken by ID.
+
+    Args:
+        records: List of users or accounts
+        conditions: BankQuery conditions to filter by
+        processes: Number of worker processes
+        sort_field: Field to sort by, or None to keep the collection order
+        reverse: If True, sort in descending order
+        stop: Maximum number of results needed, or None for all
+
+    Returns:
+        List of matching records
+    """
+    parts = _run(records, conditions, processes, sort_field, reverse, stop, counting=False)
+    if sort_field is None:
+        positions = (position for part in parts for position in part)
+    else:
+        merged = heapq.merge(*parts, reverse=reverse)
+        positions = (key[-1] for key in merged)
+    return [records[position] for position in islice(positions, stop)]
+
+
+def parallel_count(records, conditions, processes, stop=None):
+    """Count the records matching conditions on several processes.
+
+    Args:
+        records: List of users or accounts
+        conditions: BankQuery conditions to filter by
+        processes: Number of worker processes
+        stop: Stop counting once this many matches are found, or None
+
+    Returns:
+        Number of matching records, at most stop
+    """
+    parts = _run(records, conditions, processes, None, False, stop, counting=True)
+    total = sum(parts)
+    return total if stop is None else min(total, stop)
+
+
+def fork_available():
+    """Check whether worker processes can be forked on this platform."""
+    return "fork" in multiprocessing.get_all_start_methods()
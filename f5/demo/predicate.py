@@ -0,0 +1,103 @@
+from functools import lru_cache
+
+# Source templates for each operator, by query style. "{r}" is the record's
+# value for the field and "{v}" the value from the condition; each template
+# is the test that makes the record fail the condition.
+RECORD_OPERATORS = {
+    "=": "{r} != {v}",
+    ">": "not ({r} and {r} > {v})",
+    "<": "not ({r} and {r} < {v})",
+    "!=": "{r} == {v}",
+    "in": "{r} not in {v}",
+    "contains": "not ({r} and {v} in {r})",
+    "starts_with": "not (isinstance({r}, str) and {r}.startswith({v}))",
+    "ends_with": "not (isinstance({r}, str) and {r}.endswith({v}))",
+}
+
+BANK_OPERATORS = {
+    "=": "{r} != {v}",
+    ">": "not ({r} and {r} > {v})",
+    "<": "not ({r} and {r} < {v})",
+    ">=": "not ({r} and {r} >= {v})",
+    "<=": "not ({r} and {r} <= {v})",
+    "!=": "{r} == {v}",
+    # Case-insensitive; the condition value is lowercased once when binding
+    "contains": "not ({r} and isinstance({r}, str) and {v} in {r}.lower())",
+    "starts_with": "not (isinstance({r}, str) and {r}.lower().startswith({v}))",
+}
+
+# BankQuery operators whose condition value is lowercased when binding
+CASE_INSENSITIVE = ("contains", "starts_with")
+
+# How each query style reads a field from a record
+GETTERS = {
+    "record": "record.get({field!r})",
+    "bank": "getattr(record, {field!r}, None)",
+}
+
+
+@lru_cache(maxsize=256)
+def _build(style, shape):
+    """Generate a predicate factory for a condition shape.
+
+    Args:
+        style: "record" for Query conditions, "bank" for BankQuery conditions
+        shape: Tuple of (field, operator) pairs
+
+    Returns:
+        A function taking the condition values and returning the predicate
+    """
+    operators = BANK_OPERATORS if style == "bank" else RECORD_OPERATORS
+    getter = GETTERS[style]
+
+    params = [f"v{i}" for i in range(len(shape))]
+    lines = [f"def make({', '.join(params)}):", "    def predicate(record):"]
+    for i, (field, operator) in enumerate(shape):
+        # Unknown operators never reject a record
+        if operator not in operators:
+            continue
+        lines.append(f"        r{i} = {getter.format(field=field)}")
+        test = operators[operator].format(r=f"r{i}", v=f"v{i}")
+        lines.append(f"        if {test}:")
+        lines.append("            return False")
+    lines.append("        return True")
+    lines.append("    return predicate")
+
+    namespace = {}
+    exec(compile("\n".join(lines), f"<{style} predicate>", "exec"), namespace)
+    return namespace["make"]
+
+
+def _compile(style, conditions):
+    """Compile a condition list into a single predicate function."""
+    shape = tuple((field, operator) for field, operator, _ in conditions)
+    values = []
+    for _, operator, value in conditions:
+        if style == "bank" and operator in CASE_INSENSITIVE and isinstance(value, str):
+            value = value.lower()
+        values.append(value)
+    return _build(style, shape)(*values)
+
+
+def compile_record_conditions(conditions):
+    """Compile Query conditions into a predicate.
+
+    Args:
+        conditions: List of (field, operator, value) tuples
+
+    Returns:
+        A function taking a record and returning True if it matches
+    """
+    return _compile("record", conditions)
+
+
+def compile_bank_conditions(conditions):
+    """Compile BankQuery conditions into a predicate.
+
+    Args:
+        conditions: List of (field, operator, value) tuples
+
+    Returns:
+        A function taking a user or account and returning True if it matches
+    """
+    return _compile("bank", conditions)
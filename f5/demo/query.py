@@ -1,4 +1,17 @@
+import heapq
+import os
+from itertools import islice
+
 from .record import User, Account
+from .index import BankCompositeIndex, BankSortedIndex, BankTextIndex
+from .bitmap import BankBitmapIndex, BitmapIndex, RowIds
+from .cursor import cursor_position, decode_cursor, encode_cursor, order_key
+from .predicate import compile_bank_conditions, compile_record_conditions
+from .parallel import PARALLEL_MIN_RECORDS, fork_available, parallel_count, parallel_scan
+
+# Field values an Index can look up without converting them
+INDEXABLE_TYPES = (str, int, float, bool, tuple)
+
 
 class Query:
     """Class for building and executing queries against the database."""
@@ -7,7 +20,7 @@ class Query:
         """Initialize a new query for the given database.
         
         Args:
-            database: The database to query
+            database: The Database collection to query
         """
         self.database = database
         self.conditions = []
@@ -15,6 +28,7 @@ class Query:
         self.sort_reverse = False
         self.limit_value = None
         self.skip_value = 0
+        self.after_value = None  # Decoded cursor to resume after
     
     def filter(self, field, operator, value):
         """Add a filter condition to the query.
@@ -68,57 +82,151 @@ class Query:
         self.skip_value = skip_value
         return self
     
-    def _matches_conditions(self, record):
-        """Check if a record matches all conditions."""
-        if not self.conditions:
-            return True
+    def after(self, cursor):
+        """Resume after the record a cursor points at (keyset pagination).
+        
+        Results are ordered by the sort field with ties broken by ID, and
+        records up to the cursor are filtered out instead of skipped, so
+        deep pages cost the same as the first.
+        
+        Args:
+            cursor: A cursor from cursor(), or None to start from the beginning
             
-        for field, operator, value in self.conditions:
-            record_value = record.get(field)
+        Returns:
+            self for method chaining
             
-            if operator == "=":
-                if record_value != value:
-                    return False
-            elif operator == ">":
-                if not (record_value and record_value > value):
-                    return False
-            elif operator == "<":
-                if not (record_value and record_value < value):
-                    return False
-            elif operator == "!=":
-                if record_value == value:
-                    return False
-            elif operator == "in":
-                if record_value not in value:
-                    return False
-            elif operator == "contains":
-                if not (record_value and value in record_value):
-                    return False
-            elif operator == "starts_with":
-                if not (isinstance(record_value, str) and record_value.startswith(value)):
-                    return False
-            elif operator == "ends_with":
-                if not (isinstance(record_value, str) and record_value.endswith(value)):
-                    return False
-        
-        return True
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        self.after_value = None if cursor is None else decode_cursor(cursor)
+        return self
+    
+    def cursor(self, record):
+        """Get the cursor pointing at a record, for after().
+        
+        Args:
+            record: A record returned by this query, usually the last of a page
+            
+        Returns:
+            An opaque cursor string
+            
+        Raises:
+            ValueError: If the query has no sort order
+        """
+        if self.sort_field is None:
+            raise ValueError("Cursor pagination needs a sort order, e.g. sort(\"id\")")
+        value, record_id = self._sort_key()(record)
+        return encode_cursor(self.sort_field, self.sort_reverse, value, record_id)
+    
+    def _sort_key(self):
+        """Get the sort key function: the sort field's value, then the ID."""
+        field = self.sort_field
+        if field == "id":
+            return lambda r: (r.id, r.id)
+        return lambda r: (r.get(field) or "", r.id)
+    
+    def _index_lookup(self, condition):
+        """Look up an "=" or "in" condition in its field's index.
+        
+        Returns:
+            A set of candidate record IDs, a Bitmap of candidate rows for a
+            bitmap index, or None if no index can answer the condition
+        """
+        get_index = getattr(self.database, "get_index", None)
+        field, operator, value = condition
+        index = get_index(field) if get_index is not None else None
+        if index is None or value is None:
+            return None
+        
+        find = index.bitmap if isinstance(index, BitmapIndex) else index.find
+        if operator == "=" and isinstance(value, INDEXABLE_TYPES):
+            return find(value)
+        if operator == "in" and isinstance(value, (list, tuple, set, frozenset)):
+            if not all(isinstance(item, INDEXABLE_TYPES) for item in value):
+                return None
+            matches = [find(item) for item in value]
+            if not matches:
+                return set()
+            result = matches[0]
+            for other in matches[1:]:
+                result = result | other  # Set union or bitmap OR
+            return result
+        return None
+    
+    def _candidates(self):
+        """Get the records to filter, narrowed by indexes where possible.
+        
+        Each "=" or "in" condition on an indexed field contributes the IDs
+        its index finds; bitmap lookups are combined with bitmap AND first,
+        and the smallest sets are intersected first. Without any, every
+        record in the collection is a candidate.
+        """
+        lookups = []
+        bitmaps = []
+        for condition in self.conditions:
+            ids = self._index_lookup(condition)
+            if isinstance(ids, set):
+                lookups.append(ids)
+            elif ids is not None:
+                bitmaps.append(ids)
+        if bitmaps:
+            bitmaps.sort(key=len)
+            rows = bitmaps[0]
+            if len(bitmaps) == 1:
+                rows = rows.copy()  # May be the index's own bitmap, which writers change
+            for other in bitmaps[1:]:
+                rows = rows & other
+            lookups.append(RowIds(rows))
+        if not lookups:
+            return self.database.get_all_records()
+        
+        lookups.sort(key=len)
+        ids = set(lookups[0])
+        for other_ids in lookups[1:]:
+            if not ids:
+                break
+            if isinstance(other_ids, set):
+                ids &= other_ids
+            else:  # Bitmap rows are probed rather than listed
+                ids = {record_id for record_id in ids if record_id in other_ids}
+        records = (self.database.get(record_id) for record_id in ids)
+        return [record for record in records if record is not None]
     
     def execute(self):
-        """Execute the query and return matching records."""
-        # Try to use an index if available
+        """Execute the query and return matching records.
+        
+        Indexed "=" and "in" conditions narrow the records to check; all
+        conditions are still evaluated on them, so the results are the same
+        as a full scan. Unless sort() is used, the order of the results is
+        unspecified.
+        """
         results = []
         
-        # If no index is available or useful, scan all records
-        for record in self.database.get_all_records():
-            if self._matches_conditions(record):
-                results.append(record)
+        records = self._candidates()
+        if self.conditions:
+            results = list(filter(compile_record_conditions(self.conditions), records))
+        else:
+            results = list(records)
+        
+        # Resume after the cursor
+        if self.after_value is not None:
+            after = cursor_position(self.after_value, self.sort_field, self.sort_reverse)
+            key = self._sort_key()
+            if self.sort_reverse:
+                results = [r for r in results if key(r) < after]
+            else:
+                results = [r for r in results if key(r) > after]
         
-        # Apply sorting if specified
+        # Apply sorting if specified; with a limit, only the first skip +
+        # limit results need to be ordered
         if self.sort_field:
-            results.sort(
-                key=lambda r: r.get(self.sort_field) or "", 
-                reverse=self.sort_reverse
-            )
+            key = self._sort_key()
+            if self.limit_value:
+                stop = self.skip_value + self.limit_value
+                select = heapq.nlargest if self.sort_reverse else heapq.nsmallest
+                results = select(stop, results, key=key)
+            else:
+                results.sort(key=key, reverse=self.sort_reverse)
         
         # Apply skip and limit
         if self.skip_value:
@@ -153,6 +261,10 @@ class BankQuery:
         self.conditions = []
         self.sort_field = None
         self.sort_reverse = False
+        self.limit_value = None
+        self.skip_value = 0
+        self.after_value = None  # Decoded cursor to resume after
+        self.processes = None  # Worker processes for parallel scans
         
     def users(self):
         """Query for users.
@@ -200,6 +312,48 @@ class BankQuery:
         self.conditions.append(("email", "=", email))
         return self
     
+    def filter_name_prefix(self, prefix):
+        """Filter users by the start of their name.
+        
+        Args:
+            prefix: Prefix to filter by (case-insensitive)
+            
+        Returns:
+            self for method chaining
+        """
+        if self._type != "user":
+            self._type = "user"  # Default to users if not specified
+        self.conditions.append(("name", "starts_with", prefix.lower()))
+        return self
+    
+    def filter_email_prefix(self, prefix):
+        """Filter users by the start of their email.
+        
+        Args:
+            prefix: Prefix to filter by (case-insensitive)
+            
+        Returns:
+            self for method chaining
+        """
+        if self._type != "user":
+            self._type = "user"  # Default to users if not specified
+        self.conditions.append(("email", "starts_with", prefix.lower()))
+        return self
+    
+    def filter_email_contains(self, text):
+        """Filter users by part of their email.
+        
+        Args:
+            text: Text the email must contain (case-insensitive)
+            
+        Returns:
+            self for method chaining
+        """
+        if self._type != "user":
+            self._type = "user"  # Default to users if not specified
+        self.conditions.append(("email", "contains", text.lower()))
+        return self
+    
     def filter_user_id(self, user_id):
         """Filter accounts by user ID.
         
@@ -270,76 +424,494 @@ class BankQuery:
         self.sort_reverse = reverse
         return self
     
-    def _matches_conditions(self, record):
-        """Check if a record matches all conditions."""
-        for field, operator, value in self.conditions:
-            # Get the record value
-            record_value = None
+    def limit(self, limit_value):
+        """Limit the number of results.
+        
+        Args:
+            limit_value: Maximum number of results to return
             
-            if hasattr(record, field):
-                record_value = getattr(record, field)
+        Returns:
+            self for method chaining
+        """
+        self.limit_value = limit_value
+        return self
+    
+    def skip(self, skip_value):
+        """Skip a number of results.
+        
+        Args:
+            skip_value: Number of results to skip
             
-            # Apply the condition
-            if operator == "=":
-                if record_value != value:
-                    return False
-            elif operator == ">":
-                if not (record_value and record_value > value):
-                    return False
-            elif operator == "<":
-                if not (record_value and record_value < value):
-                    return False
-            elif operator == ">=":
-                if not (record_value and record_value >= value):
-                    return False
-            elif operator == "<=":
-                if not (record_value and record_value <= value):
-                    return False
-            elif operator == "!=":
-                if record_value == value:
-                    return False
-            elif operator == "contains":
-                # Case-insensitive contains
-                if not (record_value and isinstance(record_value, str) and 
-                        value.lower() in record_value.lower()):
-                    return False
-        
-        return True
+        Returns:
+            self for method chaining
+        """
+        self.skip_value = skip_value
+        return self
     
-    def execute(self):
-        """Execute the query and return matching records.
+    def after(self, cursor):
+        """Resume after the record a cursor points at (keyset pagination).
+        
+        Results are ordered by the sort field with ties broken by ID, so a
+        cursor from cursor() marks an exact position. Each page costs the
+        same however deep it is: a sorted index on the sort field seeks
+        straight to the cursor, and otherwise records before it are
+        filtered out rather than skipped. Records inserted between pages
+        neither repeat nor shift later results.
         
+        Args:
+            cursor: A cursor from cursor(), or None to start from the beginning
+            
         Returns:
-            List of matching users or accounts
+            self for method chaining
             
         Raises:
-            ValueError: If no query type is specified
+            ValueError: If the cursor is malformed
+        """
+        self.after_value = None if cursor is None else decode_cursor(cursor)
+        return self
+    
+    def cursor(self, record):
+        """Get the cursor pointing at a record, for after().
+        
+        Args:
+            record: A record returned by this query, usually the last of a page
+            
+        Returns:
+            An opaque cursor string
+            
+        Raises:
+            ValueError: If the query has no sort order
+        """
+        if self.sort_field is None:
+            raise ValueError("Cursor pagination needs a sort order, e.g. sort_by(\"id\")")
+        return encode_cursor(self.sort_field, self.sort_reverse,
+                             getattr(record, self.sort_field, None), record.id)
+    
+    def parallel(self, processes=None):
+        """Run full scans of large collections on several processes.
+        
+        Only queries that would scan the whole collection are affected, and
+        only when it holds at least PARALLEL_MIN_RECORDS records and the
+        platform can fork; results are the same as without it.
+        
+        Args:
+            processes: Number of worker processes, defaults to the CPU count
+            
+        Returns:
+            self for method chaining
+        """
+        self.processes = processes or os.cpu_count() or 1
+        return self
+    
+    def _scan_records(self, plan):
+        """Get the records to scan in parallel for a plan, or None to scan
+        sequentially."""
+        if plan["access"] != "scan" or not self.processes or self.processes < 2:
+            return None
+        if "after" in plan:
+            return None  # Cursors are checked sequentially
+        if not fork_available():
+            return None
+        records = self._candidates(plan)
+        if len(records) < PARALLEL_MIN_RECORDS:
+            return None
+        return list(records)
+    
+    def _collection(self):
+        """Get the database collection name for the query type."""
+        return "users" if self._type == "user" else "accounts"
+    
+    def _plan(self):
+        """Choose how to fetch candidate records for this query.
+        
+        Equality conditions on indexed fields are answered by their index,
+        most selective first, and range conditions by a sorted index when
+        that is narrower. Equality conditions covering a leading prefix of
+        a composite index's fields are answered by one probe of it.
+        Equality conditions on bitmap indexes are combined with bitmap AND,
+        and inequality conditions on them with AND NOT. Prefix and
+        substring conditions on a text index narrow the candidates but are
+        still checked on them. Every other condition is evaluated on the
+        candidates that remain.
+        
+        Returns:
+            A dict with the access path ("index", "range", "user_accounts",
+            "ordered", "storage" or "scan"), the index lookups, the residual
+            conditions, whether candidates already come out in sort order
+            and, with a cursor, the (value, id) key to resume "after"
+            
+        Raises:
+            ValueError: If no query type is specified, or the cursor doesn't
+                match the sort order
         """
         if not self._type:
             raise ValueError("Query type not specified. Call users() or accounts() first.")
+        after = None
+        if self.after_value is not None:
+            after = cursor_position(self.after_value, self.sort_field, self.sort_reverse)
         
-        # Get all records of the requested type
-        if self._type == "user":
-            records = self.database.get_all_users()
-        else:  # account
-            records = []
-            for user in self.database.get_all_users():
-                records.extend(self.database.get_user_accounts(user.id))
+        hash_indexes = {}
+        sorted_indexes = {}
+        text_indexes = {}
+        bitmap_indexes = {}
+        composite_indexes = []
+        for index in self.database.get_indexes(self._collection()):
+            if isinstance(index, BankCompositeIndex):
+                composite_indexes.append(index)
+            elif isinstance(index, BankSortedIndex):
+                sorted_indexes.setdefault(index.field, index)
+            elif isinstance(index, BankTextIndex):
+                text_indexes.setdefault(index.field, index)
+            elif isinstance(index, BankBitmapIndex):
+                bitmap_indexes.setdefault(index.field, index)
+            else:
+                hash_indexes.setdefault(index.field, index)
         
-        # Filter by conditions
-        results = []
-        for record in records:
-            if self._matches_conditions(record):
-                results.append(record)
+        lookups = []  # (field, operator, value, matching ids)
+        composite = self._composite_conditions(
+            composite_indexes, set(hash_indexes) | set(sorted_indexes) | set(bitmap_indexes))
+        if composite is not None:
+            index, conditions = composite
+            ids = index.find(tuple(value for _, _, value in conditions))
+            lookups.append((None, "composite", conditions, ids))
+        bounds = {}  # field -> [min, max] for range conditions on sorted indexes
+        bitmap_terms = []  # ("=" condition, bitmap) to AND together
+        bitmap_exclusions = []  # ("!=" condition, bitmap) to AND NOT
+        residual = []
+        for field, operator, value in self.conditions:
+            if composite is not None and (field, operator, value) in composite[1]:
+                continue
+            if operator == "=" and value is not None:
+                index = hash_indexes.get(field) or sorted_indexes.get(field)
+                if index is None and field in bitmap_indexes:
+                    bitmap_terms.append(((field, operator, value),
+                                         bitmap_indexes[field].bitmap(value)))
+                    continue
+                if index is None and isinstance(value, str):
+                    index = text_indexes.get(field)
+                if index is not None:
+                    lookups.append((field, operator, value, index.find(value)))
+                    continue
+            elif operator == "!=" and value is not None and field in bitmap_indexes:
+                bitmap_exclusions.append(((field, operator, value),
+                                          bitmap_indexes[field].bitmap(value)))
+                continue
+            elif operator in ("contains", "starts_with") and field in text_indexes and value:
+                index = text_indexes[field]
+                ids = index.search(value) if operator == "contains" else index.prefix(value)
+                lookups.append((field, operator, value, ids))
+            elif operator in (">", ">=", "<", "<=") and field in sorted_indexes and value is not None:
+                # Range conditions stay in the residual so their exact
+                # semantics still apply to the candidates
+                low, high = bounds.setdefault(field, [None, None])
+                if operator in (">", ">="):
+                    bounds[field][0] = value if low is None else max(low, value)
+                else:
+                    bounds[field][1] = value if high is None else min(high, value)
+            residual.append((field, operator, value))
+        
+        if bitmap_terms:
+            # One combined lookup: AND the equality bitmaps, smallest first,
+            # then AND NOT the inequality bitmaps
+            bitmap_terms.sort(key=lambda term: len(term[1]))
+            rows = bitmap_terms[0][1]
+            if len(bitmap_terms) == 1:
+                # Copy the index's bitmap so concurrent writers can't change
+                # it while it is combined and the results are consumed
+                rows = rows.copy()
+            for _, bitmap in bitmap_terms[1:]:
+                rows = rows & bitmap
+            for _, bitmap in bitmap_exclusions:
+                rows = rows - bitmap
+            conditions = [condition for condition, _ in bitmap_terms + bitmap_exclusions]
+            lookups.append((None, "bitmap", conditions, RowIds(rows)))
+        else:
+            # Without a bitmap to subtract from, inequalities are filters
+            residual.extend(condition for condition, _ in bitmap_exclusions)
+        lookups.sort(key=lambda lookup: len(lookup[3]))
+        
+        plan = {"access": "scan", "lookups": [], "residual": residual, "ordered": False}
+        best = len(lookups[0][3]) if lookups else None
+        for field, (low, high) in bounds.items():
+            size = sorted_indexes[field].count_range(low, high)
+            if best is None or size < best:
+                best = size
+                plan.update(access="range", index=sorted_indexes[field], field=field,
+                            low=low, high=high, size=size)
+        
+        if plan["access"] == "range":
+            # The range is narrower than any equality lookup, so those are
+            # checked on the candidates instead
+            for field, operator, value, _ in lookups:
+                if operator == "=":
+                    residual.append((field, operator, value))
+                elif operator in ("bitmap", "composite"):
+                    residual.extend(value)
+            plan["ordered"] = plan["field"] == self.sort_field
+        elif lookups:
+            plan["access"] = "index"
+            plan["lookups"] = lookups
+        elif self._type == "account" and any(
+                field == "user_id" and operator == "=" for field, operator, _ in residual):
+            # Without an index, a user ID filter can still use the storage's
+            # per-user account listing instead of a scan
+            for condition in residual:
+                if condition[0] == "user_id" and condition[1] == "=":
+                    plan["access"] = "user_accounts"
+                    plan["user_id"] = condition[2]
+                    residual.remove(condition)
+                    break
+        elif self.sort_field in sorted_indexes:
+            plan.update(access="ordered", index=sorted_indexes[self.sort_field],
+                        field=self.sort_field, ordered=True)
+        elif self._type == "account" and residual:
+            # Let a storage that can evaluate conditions itself (such as
+            # ColumnarStorage) do so instead of a record-by-record scan
+            storage = getattr(self.database, "storage", None)
+            if storage is not None:
+                pushed, remaining = storage.split_account_conditions(residual)
+                if pushed:
+                    plan.update(access="storage", storage=storage, pushed=pushed,
+                                residual=remaining)
+        if after is not None:
+            plan["after"] = after
+        return plan
+    
+    def _composite_conditions(self, indexes, single_fields):
+        """Find the composite index covering the most equality conditions.
+        
+        An index is usable when "=" conditions cover a leading prefix of
+        its fields. A one-field prefix is only used when that field has no
+        index of its own.
+        
+        Args:
+            indexes: Composite indexes of the queried collection
+            single_fields: Fields with a hash, sorted or bitmap index
+            
+        Returns:
+            A tuple of (index, conditions in field order), or None
+        """
+        equalities = {}
+        for field, operator, value in self.conditions:
+            if operator == "=" and value is not None:
+                equalities.setdefault(field, (field, operator, value))
+        
+        best = None
+        for index in indexes:
+            conditions = []
+            for field in index.fields:
+                if field not in equalities:
+                    break
+                conditions.append(equalities[field])
+            if len(conditions) == 1 and conditions[0][0] in single_fields:
+                continue
+            if conditions and (best is None or len(conditions) > len(best[1])):
+                best = (index, conditions)
+        return best
+    
+    def _candidates(self, plan):
+        """Fetch the candidate records for a plan.
+        
+        Returns:
+            An iterable of candidate records, fetched lazily where possible
+        """
+        if plan["access"] == "user_accounts":
+            return self.database.get_user_accounts(plan["user_id"])
+        if plan["access"] == "storage":
+            return plan["storage"].find_accounts(plan["pushed"])
+        if plan["access"] == "scan":
+            if self._type == "user":
+                return self.database.get_all_users()
+            return self.database.get_all_accounts()
+        
+        if plan["access"] == "index":
+            first, others = plan["lookups"][0][3], [lookup[3] for lookup in plan["lookups"][1:]]
+            if isinstance(first, RowIds):
+                # Bitmap rows come out in ascending order; keep it
+                ids = [record_id for record_id in first
+                       if all(record_id in other_ids for other_ids in others)]
+            else:
+                # Copy the index's set so concurrent writers can't change it
+                # while the results are consumed
+                ids = set(first)
+                for other_ids in others:
+                    if not ids:
+                        break
+                    if isinstance(other_ids, set):
+                        ids = ids & other_ids
+                    else:  # Bitmap rows are probed rather than listed
+                        ids = {record_id for record_id in ids if record_id in other_ids}
+        elif plan["access"] == "range":
+            if plan["ordered"]:
+                ids = plan["index"].iter_range(plan["low"], plan["high"], self.sort_reverse,
+                                               after=plan.get("after"))
+            else:
+                ids = plan["index"].iter_range(plan["low"], plan["high"])
+        else:  # ordered
+            ids = plan["index"].ordered(reverse=self.sort_reverse, after=plan.get("after"))
+        
+        get = self.database.get_user if self._type == "user" else self.database.get_account
+        return (record for record in map(get, ids) if record is not None)
+    
+    def explain(self):
+        """Describe how the query would be executed.
+        
+        Returns:
+            A multi-line string with one step of the plan per line
+        """
+        plan = self._plan()
+        collection = self._collection()
+        lines = [f"QUERY {collection}"]
+        
+        if plan["access"] == "index":
+            for position, (field, operator, value, ids) in enumerate(plan["lookups"]):
+                step = "INDEX LOOKUP" if position == 0 else "INTERSECT"
+                if operator == "bitmap":
+                    lines.append(f"  {step} bitmap ({len(ids)} ids)")
+                    for term, (term_field, term_operator, term_value) in enumerate(value):
+                        if term_operator == "!=":
+                            combine = "AND NOT"
+                        else:
+                            combine = "AND" if term else "BITMAP"
+                        lines.append(f"    {combine} {collection}.{term_field} = {term_value!r}")
+                elif operator == "composite":
+                    fields = ", ".join(term[0] for term in value)
+                    values = tuple(term[2] for term in value)
+                    lines.append(f"  {step} {collection}.({fields}) = {values!r} "
+                                 f"({len(ids)} ids)")
+                else:
+                    lines.append(f"  {step} {collection}.{field} {operator} {value!r} "
+                                 f"({len(ids)} ids)")
+        elif plan["access"] == "range":
+            lines.append(f"  RANGE SCAN {collection}.{plan['field']} "
+                         f"[{plan['low']!r}, {plan['high']!r}] ({plan['size']} ids)")
+        elif plan["access"] == "ordered":
+            lines.append(f"  ORDERED SCAN {collection}.{plan['field']}")
+        elif plan["access"] == "user_accounts":
+            lines.append(f"  USER ACCOUNTS user_id = {plan['user_id']!r}")
+        elif plan["access"] == "storage":
+            for field, operator, value in plan["pushed"]:
+                lines.append(f"  STORAGE FILTER {field} {operator} {value!r}")
+        elif self.processes and self.processes > 1:
+            lines.append(f"  FULL SCAN {collection} (up to {self.processes} processes)")
+        else:
+            lines.append(f"  FULL SCAN {collection}")
+        
+        for field, operator, value in plan["residual"]:
+            lines.append(f"  FILTER {field} {operator} {value!r}")
+        if "after" in plan:
+            step = "SEEK" if plan["ordered"] else "FILTER"
+            operator = "<" if self.sort_reverse else ">"
+            lines.append(f"  {step} ({self.sort_field}, id) {operator} {plan['after']!r}")
         
-        # Apply sorting
         if self.sort_field:
-            results.sort(
-                key=lambda r: getattr(r, self.sort_field) if hasattr(r, self.sort_field) else None, 
-                reverse=self.sort_reverse
-            )
+            direction = "DESC" if self.sort_reverse else "ASC"
+            if plan["ordered"]:
+                source = " (from index)"
+            elif self.limit_value is not None:
+                source = f" (top {self.skip_value + self.limit_value})"
+            else:
+                source = ""
+            lines.append(f"  SORT {self.sort_field} {direction}{source}")
+        
+        if self.skip_value:
+            lines.append(f"  SKIP {self.skip_value}")
+        if self.limit_value is not None:
+            lines.append(f"  LIMIT {self.limit_value}")
+        
+        return "\n".join(lines)
+    
+    def _matches(self, plan):
+        """Lazily filter the candidates of a plan by its residual conditions.
+        
+        The conditions are compiled into a single predicate once per
+        execution rather than interpreted for every record.
+        """
+        candidates = self._candidates(plan)
+        if "after" in plan and not plan["ordered"]:
+            # The index didn't seek to the cursor, so drop what precedes it
+            key = self._sort_key()
+            after = order_key(*plan["after"])
+            if self.sort_reverse:
+                candidates = (record for record in candidates if key(record) < after)
+            else:
+                candidates = (record for record in candidates if key(record) > after)
+        if not plan["residual"]:
+            return iter(candidates)
+        return filter(compile_bank_conditions(plan["residual"]), candidates)
+    
+    def _sort_key(self):
+        """Get the sort key function: the sort field's value, then the ID.
+        
+        Breaking ties by ID makes the order total and the same as a sorted
+        index's, which cursors rely on. Records without a value sort first;
+        see order_key().
+        """
+        field = self.sort_field
+        return lambda record: order_key(getattr(record, field, None), record.id)
+    
+    def _results(self, limit):
+        """Build the result pipeline with sorting, skip and the given limit.
+        
+        Args:
+            limit: Maximum number of results, or None for no limit
             
-        return results
+        Returns:
+            An iterator over the results
+        """
+        plan = self._plan()
+        stop = None if limit is None else self.skip_value + limit
+        
+        records = self._scan_records(plan)
+        if records is not None:
+            matches = parallel_scan(records, plan["residual"], self.processes,
+                                    self.sort_field, self.sort_reverse, stop)
+            return islice(matches, self.skip_value, stop)
+        
+        matches = self._matches(plan)
+        
+        # Sort, unless the index already produced sorted candidates. With a
+        # limit only the first skip + limit results are needed, so a bounded
+        # heap replaces the full sort.
+        if self.sort_field and not plan["ordered"]:
+            key = self._sort_key()
+            if stop is None:
+                matches = iter(sorted(matches, key=key, reverse=self.sort_reverse))
+            elif self.sort_reverse:
+                matches = iter(heapq.nlargest(stop, matches, key=key))
+            else:
+                matches = iter(heapq.nsmallest(stop, matches, key=key))
+        
+        return islice(matches, self.skip_value, stop)
+    
+    def iter(self):
+        """Iterate over the matching records lazily.
+        
+        Records are fetched and filtered as they are consumed, so stopping
+        early avoids the remaining work. The database should not be modified
+        while iterating; use execute() for a stable list.
+        
+        Returns:
+            An iterator over matching users or accounts
+            
+        Raises:
+            ValueError: If no query type is specified
+        """
+        return self._results(self.limit_value)
+    
+    def execute(self):
+        """Execute the query and return matching records.
+        
+        Returns:
+            List of matching users or accounts
+            
+        Raises:
+            ValueError: If no query type is specified
+        """
+        cache = getattr(self.database, "query_cache", None)
+        if cache is not None and self._type:
+            return cache.fetch(self, "execute", lambda: list(self.iter()))
+        return list(self.iter())
     
     def count(self):
         """Count the number of matching records.
@@ -347,7 +919,27 @@ class BankQuery:
         Returns:
             Number of matching records
         """
-        return len(self.execute())
+        cache = getattr(self.database, "query_cache", None)
+        if cache is not None and self._type:
+            return cache.fetch(self, "count", self._count)
+        return self._count()
+    
+    def _count(self):
+        """Count the matching records without the query cache."""
+        plan = self._plan()
+        stop = None if self.limit_value is None else self.skip_value + self.limit_value
+        records = self._scan_records(plan)
+        if (plan["access"] == "index" and len(plan["lookups"]) == 1
+                and not plan["residual"] and "after" not in plan):
+            # The lookup is the answer: a set size, or a bitmap popcount
+            total = len(plan["lookups"][0][3])
+            if stop is not None:
+                total = min(total, stop)
+        elif records is not None:
+            total = parallel_count(records, plan["residual"], self.processes, stop)
+        else:
+            total = sum(1 for _ in islice(self._matches(plan), stop))
+        return max(0, total - self.skip_value)
     
     def first(self):
         """Get the first matching record.
@@ -355,5 +947,16 @@ class BankQuery:
         Returns:
             First matching record or None if no matches
         """
-        results = self.execute()
-        return results[0] if results else None
\ No newline at end of file
+        limit = 1 if self.limit_value is None else min(1, self.limit_value)
+        return next(self._results(limit), None)
+    
+    def exists(self):
+        """Check whether any record matches, stopping at the first match.
+        
+        Returns:
+            True if at least one record matches, False otherwise
+        """
+        if self.limit_value == 0:
+            return False
+        matches = self._matches(self._plan())
+        return next(islice(matches, self.skip_value, None), None) is not None
@@ -0,0 +1,201 @@
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from .predicate import compile_bank_conditions
+
+
+class _Entry:
+    """One cached query result and what it depends on."""
+
+    __slots__ = ("key", "collection", "predicate", "fields", "result", "valid")
+
+    def __init__(self, key, collection, conditions, sort_field):
+        self.key = key
+        self.collection = collection
+        self.predicate = compile_bank_conditions(conditions)
+        self.fields = {field for field, _, _ in conditions}
+        if sort_field:
+            self.fields.add(sort_field)
+        self.result = None
+        self.valid = True
+
+
+class QueryCache:
+    """Memoizes BankQuery results until a write could change them.
+
+    Results are keyed by the query's type, conditions (in any order), sort,
+    limit, skip and cursor. BankDatabase reports every write, and only the
+    entries the write can affect are dropped: a new or deleted record
+    invalidates the queries it matches, and an update invalidates the
+    queries that filter or sort on a changed field and match the record
+    before or after the change. A query that is still running when such a
+    write happens returns its result without caching it.
+    """
+
+    def __init__(self, max_size=256):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached results
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> _Entry with a result
+        self._by_collection = {}  # collection -> set of watched _Entry
+        self._by_field = {}  # (collection, field) -> set of watched _Entry
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query, operation):
+        """Build the normalized cache key for a query.
+
+        Args:
+            query: The BankQuery
+            operation: Name of the query method producing the result
+
+        Returns:
+            A hashable key
+        """
+        conditions = tuple(sorted(query.conditions, key=repr))
+        return (operation, query._type, conditions, query.sort_field,
+                query.sort_reverse, query.limit_value, query.skip_value, query.after_value)
+
+    def fetch(self, query, operation, compute):
+        """Get a query result from the cache, computing and caching it on a miss.
+
+        Args:
+            query: The BankQuery being executed
+            operation: Name of the query method producing the result
+            compute: Function computing the result
+
+        Returns:
+            The result; lists are copied so callers can't change the cache
+        """
+        key = self.key(query, operation)
+        try:
+            hash(key)
+        except TypeError:
+            return compute()  # Unhashable condition values aren't cached
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry.result)
+            self.misses += 1
+            entry = _Entry(key, query._collection(), query.conditions, query.sort_field)
+            self._watch(entry)
+
+        try:
+            result = compute()
+        except BaseException:
+            with self._lock:
+                self._unwatch(entry)
+            raise
+
+        with self._lock:
+            if not entry.valid:
+                return result  # A write landed while computing
+            entry.result = _copy(result)
+            replaced = self._entries.pop(key, None)
+            if replaced is not None:
+                self._unwatch(replaced)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._unwatch(evicted)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            for watched in self._by_collection.values():
+                for entry in watched:
+                    entry.valid = False
+            self._entries.clear()
+            self._by_collection.clear()
+            self._by_field.clear()
+
+    def stats(self):
+        """Get the cache counters.
+
+        Returns:
+            A dict with "hits", "misses", "evictions", "invalidations" and
+            the current "size"
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+    # Dependency tracking
+
+    def _watch(self, entry):
+        """Register an entry so writes to its fields find it."""
+        self._by_collection.setdefault(entry.collection, set()).add(entry)
+        for field in entry.fields:
+            self._by_field.setdefault((entry.collection, field), set()).add(entry)
+
+    def _unwatch(self, entry):
+        """Stop tracking an entry."""
+        self._by_collection.get(entry.collection, set()).discard(entry)
+        for field in entry.fields:
+            watched = self._by_field.get((entry.collection, field))
+            if watched is not None:
+                watched.discard(entry)
+                if not watched:  # Clean up empty sets
+                    del self._by_field[(entry.collection, field)]
+
+    def _invalidate(self, entries, records):
+        """Drop the entries whose queries match any of the records."""
+        for entry in list(entries):
+            if any(entry.predicate(record) for record in records):
+                entry.valid = False
+                self._unwatch(entry)
+                if self._entries.get(entry.key) is entry:
+                    del self._entries[entry.key]
+                    self.invalidations += 1
+
+    # Write notifications from BankDatabase
+
+    def records_inserted(self, collection, records):
+        """Invalidate the queries matching newly created records."""
+        with self._lock:
+            self._invalidate(self._by_collection.get(collection, ()), records)
+
+    def records_deleted(self, collection, records):
+        """Invalidate the queries matching deleted records."""
+        self.records_inserted(collection, records)
+
+    def record_updated(self, collection, record, old_values):
+        """Invalidate the queries an in-place update can affect.
+
+        Args:
+            collection: Either "users" or "accounts"
+            record: The record in its new state
+            old_values: Field values from before the update
+        """
+        changed = [field for field, value in old_values.items()
+                   if getattr(record, field, None) != value]
+        if not changed:
+            return
+        old_record = SimpleNamespace(**old_values)
+        with self._lock:
+            entries = set()
+            for field in changed:
+                entries.update(self._by_field.get((collection, field), ()))
+            self._invalidate(entries, (old_record, record))
+
+
+def _copy(result):
+    """Copy list results so cached and returned lists are independent."""
+    return list(result) if isinstance(result, list) else result
@@ -1,5 +1,146 @@
+class _Shape:
+    """Field layout shared by every Record with the same fields in the same order.
+    
+    Records keep only a list of values and point to their shape for the
+    field names, so a million records with the same fields share one copy
+    of the names instead of one dict each. Adding a field moves a record to
+    the next shape, which is created once and then reused.
+    """
+    
+    __slots__ = ("fields", "positions", "_next")
+    
+    def __init__(self, fields):
+        self.fields = fields  # Tuple of field names
+        self.positions = {field: position for position, field in enumerate(fields)}
+        self._next = {}  # field -> shape with that field appended
+    
+    def add(self, field):
+        """Get the shape with a field appended."""
+        shape = self._next.get(field)
+        if shape is None:
+            shape = self._next[field] = _Shape(self.fields + (field,))
+        return shape
+
+
+_EMPTY_SHAPE = _Shape(())
+
+
+def _shape_for(fields):
+    """Get the shared shape for a sequence of field names."""
+    shape = _EMPTY_SHAPE
+    for field in fields:
+        shape = shape.add(field)
+    return shape
+
+
+class Record:
+    """Schema-less record for generic database collections.
+    
+    Fields are read with get() or indexing like a dict, but stored compactly
+    as a list of values plus a shape shared with all records that have the
+    same fields.
+    """
+    
+    __slots__ = ("id", "_shape", "_values")
+    
+    def __init__(self, data=None, record_id=None):
+        """Initialize a new record.
+        
+        Args:
+            data: Dict of field values
+            record_id: Unique identifier for this record
+        """
+        self.id = record_id
+        data = data or {}
+        self._shape = _shape_for(data)
+        self._values = list(data.values())
+    
+    def get(self, field, default=None):
+        """Get a field's value.
+        
+        Args:
+            field: The field name
+            default: Value to return if the record doesn't have the field
+        """
+        position = self._shape.positions.get(field)
+        return default if position is None else self._values[position]
+    
+    def set(self, field, value):
+        """Set a field's value, adding the field if needed."""
+        position = self._shape.positions.get(field)
+        if position is None:
+            self._shape = self._shape.add(field)
+            self._values.append(value)
+        else:
+            self._values[position] = value
+    
+    def update(self, data):
+        """Set several fields from a dict."""
+        for field, value in data.items():
+            self.set(field, value)
+    
+    def remove(self, field):
+        """Remove a field.
+        
+        Returns:
+            True if the record had the field, False otherwise
+        """
+        position = self._shape.positions.get(field)
+        if position is None:
+            return False
+        fields = self._shape.fields
+        self._shape = _shape_for(fields[:position] + fields[position + 1:])
+        del self._values[position]
+        return True
+    
+    def fields(self):
+        """Get the record's field names."""
+        return list(self._shape.fields)
+    
+    def __getitem__(self, field):
+        position = self._shape.positions.get(field)
+        if position is None:
+            raise KeyError(field)
+        return self._values[position]
+    
+    def __setitem__(self, field, value):
+        self.set(field, value)
+    
+    def __contains__(self, field):
+        return field in self._shape.positions
+    
+    def to_dict(self):
+        """Convert the record to a dictionary representation."""
+        data = {"id": self.id}
+        data.update(zip(self._shape.fields, self._values))
+        return data
+    
+    def __str__(self):
+        """String representation of the record."""
+        return f"Record(id={self.id}, {dict(zip(self._shape.fields, self._values))})"
+
+
+_SLOT_NAMES = {}  # BankRecord subclass -> names of all its slots
+
+
+def _slot_names(cls):
+    """Get the slot names a record class and its bases declare."""
+    names = _SLOT_NAMES.get(cls)
+    if names is None:
+        names = _SLOT_NAMES[cls] = tuple(
+            name for klass in reversed(cls.__mro__) for name in getattr(klass, "__slots__", ()))
+    return names
+
+
 class BankRecord:
-    """Base class for bank database records."""
+    """Base class for bank database records.
+    
+    Records use __slots__ instead of a per-instance __dict__, which saves
+    about a third of their memory. Subclasses must declare __slots__ for
+    their own fields.
+    """
+    
+    __slots__ = ("id",)
     
     def __init__(self, record_id=None):
         """Initialize a new record.
@@ -9,6 +150,14 @@ class BankRecord:
         """
         self.id = record_id
     
+    def copy(self):
+        """Get an independent copy of the record."""
+        cls = type(self)
+        record = cls.__new__(cls)
+        for field in _slot_names(cls):
+            setattr(record, field, getattr(self, field))
+        return record
+    
     def to_dict(self):
         """Convert the record to a dictionary representation."""
         raise NotImplementedError("Subclasses must implement to_dict()")
@@ -21,6 +170,8 @@ class BankRecord:
 class User(BankRecord):
     """User record representing a bank customer."""
     
+    __slots__ = ("name", "email", "address")
+    
     def __init__(self, user_id=None, name=None, email=None, address=None):
         """Initialize a new user.
         
@@ -52,6 +203,8 @@ class User(BankRecord):
 class Account(BankRecord):
     """Account record representing a bank account."""
     
+    __slots__ = ("user_id", "account_type", "balance")
+    
     def __init__(self, account_id=None, user_id=None, account_type=None, balance=0.0):
         """Initialize a new account.
         
@@ -0,0 +1,366 @@
+import threading
+import weakref
+from contextlib import contextmanager
+
+from .query import BankQuery
+
+
+class _Version:
+    """A record's state from before one write, kept for open snapshots."""
+
+    __slots__ = ("stamp", "record")
+
+    def __init__(self, stamp, record):
+        self.stamp = stamp  # Epoch the write happened in
+        self.record = record  # Copy of the prior state, or None if it didn't exist
+
+
+class _WriteGate:
+    """Context manager around one write; shared, as it holds no state."""
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store):
+        self._store = store
+
+    def __enter__(self):
+        self._store._enter_write()
+
+    def __exit__(self, *exc_info):
+        self._store._exit_write()
+
+
+class VersionStore:
+    """Prior versions of the records BankDatabase writes while snapshots are open.
+
+    Time is divided into epochs; opening a snapshot starts a new one, and
+    the snapshot sees every write from earlier epochs and none from its own
+    or later ones. While any snapshot is open, the first write to a record
+    in each epoch saves a copy of the record it is about to change, delete
+    or create (as "didn't exist") before touching it; later writes in the
+    same epoch need none, as no snapshot can see between them. A snapshot
+    reading a record that was written in its epoch or later uses the
+    oldest such copy instead of the live record.
+
+    Every write runs inside writing(). Opening a snapshot waits for the
+    writes in progress to finish, holding back new ones only until then,
+    so no write straddles an epoch boundary and a transfer's two accounts
+    are always seen both before or both after it. Versions are discarded
+    as soon as no open snapshot needs them.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._gate = _WriteGate(self)
+        self._epoch = 0
+        self._writers = 0  # Writes in progress
+        self._paused = False  # New writes are held back; see _pause()
+        self._open = {}  # epoch -> number of open snapshots
+        self._history = {"users": {}, "accounts": {}}  # collection -> id -> [_Version]
+        self._inserting = {}  # id(record) -> record, for creates in progress
+
+    # Writers
+
+    def writing(self):
+        """Get the context manager every write runs in; see the class docstring."""
+        return self._gate
+
+    def _enter_write(self):
+        with self._condition:
+            while self._paused:
+                self._condition.wait()
+            self._writers += 1
+
+    def _exit_write(self):
+        with self._condition:
+            self._writers -= 1
+            if not self._writers and self._paused:
+                self._condition.notify_all()
+
+    def record_changes(self, collection, records):
+        """Save the current state of records about to be updated or deleted."""
+        with self._condition:
+            if not self._open:
+                return
+            history = self._history[collection]
+            for record in records:
+                versions = history.setdefault(record.id, [])
+                if not versions or versions[-1].stamp != self._epoch:
+                    versions.append(_Version(self._epoch, record.copy()))
+
+    def begin_inserts(self, records):
+        """Hide records about to be created from open snapshots.
+
+        Their IDs may not be known until they are saved, so they are
+        tracked by identity until end_inserts(). Storages assign the ID to
+        the record passed in before the new record can be read, but may
+        store and return a different object (a row view), so snapshots
+        hide live records by the IDs assigned so far.
+        """
+        with self._condition:
+            if self._open:
+                for record in records:
+                    self._inserting[id(record)] = record
+
+    def end_inserts(self, collection, records):
+        """Record that created records didn't exist before this epoch."""
+        with self._condition:
+            if self._open:
+                history = self._history[collection]
+                for record in records:
+                    versions = history.setdefault(record.id, [])
+                    if not versions or versions[-1].stamp != self._epoch:
+                        versions.append(_Version(self._epoch, None))
+            for record in records:
+                self._inserting.pop(id(record), None)
+
+    @contextmanager
+    def exclusive(self):
+        """Hold back writes while the block runs, once those in progress finish.
+
+        For building state from a full read of storage, such as a new index,
+        that every later write must then keep up to date.
+        """
+        with self._condition:
+            self._pause()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._resume()
+
+    def _pause(self):
+        """Hold back new writes and wait for those in progress; needs the lock."""
+        while self._paused:
+            self._condition.wait()
+        self._paused = True
+        while self._writers:
+            self._condition.wait()
+
+    def _resume(self):
+        """Let writes held back by _pause() continue; needs the lock."""
+        self._paused = False
+        self._condition.notify_all()
+
+    # Snapshots
+
+    def open(self, on_open=None):
+        """Start a new epoch for a snapshot.
+
+        Args:
+            on_open: Optional function to call at the epoch boundary, while
+                no write is in progress: the snapshot sees every write
+                finished before the call and none started after it. It
+                must not write itself.
+
+        Returns:
+            The snapshot's epoch
+        """
+        with self._condition:
+            self._pause()
+            self._epoch += 1
+            self._open[self._epoch] = self._open.get(self._epoch, 0) + 1
+            if on_open is not None:
+                on_open()
+            self._resume()
+            return self._epoch
+
+    def release(self, epoch):
+        """Forget a closed snapshot and the versions only it needed."""
+        with self._condition:
+            self._open[epoch] -= 1
+            if not self._open[epoch]:
+                del self._open[epoch]
+            if not self._open:
+                self._history = {"users": {}, "accounts": {}}
+                self._inserting = {}  # Left behind only by failed creates
+                return
+            oldest = min(self._open)
+            for history in self._history.values():
+                for record_id in list(history):
+                    versions = [version for version in history[record_id]
+                                if version.stamp >= oldest]
+                    if versions:
+                        history[record_id] = versions
+                    else:
+                        del history[record_id]
+
+    def version_count(self):
+        """Count the versions kept for open snapshots."""
+        with self._condition:
+            return sum(len(versions) for history in self._history.values()
+                       for versions in history.values())
+
+    def _older(self, versions, epoch):
+        """Find the state from before the first write at or after epoch.
+
+        Returns:
+            A tuple of (found, record); record is None if it didn't exist
+        """
+        for version in versions:
+            if version.stamp >= epoch:
+                return True, version.record
+        return False, None
+
+    def _pending_ids(self):
+        """Get the IDs assigned so far to records being created."""
+        return {record.id for record in self._inserting.values() if record.id is not None}
+
+    def resolve_one(self, collection, epoch, record_id, live, record):
+        """Get the state of one record as a snapshot sees it.
+
+        Args:
+            collection: Either "users" or "accounts"
+            epoch: The snapshot's epoch
+            record_id: The record's ID
+            live: The live record, or None if it doesn't exist now
+            record: A copy of live taken before this call
+
+        Returns:
+            The record visible to the snapshot, or None
+        """
+        with self._condition:
+            found, older = self._older(self._history[collection].get(record_id, ()), epoch)
+            if found:
+                return older
+            if live is not None and record_id in self._pending_ids():
+                return None
+        return record
+
+    def resolve(self, collection, epoch, records, include_removed=None):
+        """Get the state of records as a snapshot sees them.
+
+        Args:
+            collection: Either "users" or "accounts"
+            epoch: The snapshot's epoch
+            records: Live records, copied by the caller before this call so
+                any write to them since is in the history
+            include_removed: Optional filter; when given, records that no
+                longer exist live but did at the epoch and pass it are
+                added to the result
+
+        Returns:
+            List of the records visible to the snapshot
+        """
+        with self._condition:
+            older = {}
+            for record_id, versions in self._history[collection].items():
+                found, record = self._older(versions, epoch)
+                if found:
+                    older[record_id] = record
+            inserting = self._pending_ids()
+
+        visible = []
+        seen = set()
+        for live, record in records:
+            if record.id in inserting:
+                continue
+            if record.id in older:
+                seen.add(record.id)
+                record = older[record.id]
+            if record is not None:
+                visible.append(record)
+        if include_removed is not None:
+            visible.extend(record for record_id, record in older.items()
+                           if record is not None and record_id not in seen
+                           and include_removed(record))
+        return visible
+
+
+class Snapshot:
+    """Read-only point-in-time view of a BankDatabase.
+
+    Created by BankDatabase.snapshot(). Reads return copies of the records
+    as they were when the snapshot was taken, however the database has
+    changed since, and BankQuery works on the snapshot as on the database
+    (without indexes, which only describe the present). Close the snapshot
+    when done so its old versions can be reclaimed; it can also be used as
+    a context manager.
+    """
+
+    def __init__(self, database, versions, on_open=None):
+        """Open a snapshot; use BankDatabase.snapshot() instead.
+
+        Args:
+            database: The BankDatabase to view
+            versions: The database's VersionStore
+            on_open: Optional function to call as the snapshot is taken;
+                see VersionStore.open()
+        """
+        self._database = database
+        self._versions = versions
+        self.epoch = versions.open(on_open)
+        # Released on close(), or when the snapshot is garbage collected
+        self._release = weakref.finalize(self, versions.release, self.epoch)
+
+    def close(self):
+        """Release the snapshot; reading from it afterwards raises ValueError."""
+        self._release()
+
+    @property
+    def closed(self):
+        """Whether the snapshot has been released."""
+        return not self._release.alive
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read(self, collection, live, include_removed=None):
+        """Resolve live records, copying them first; see VersionStore.resolve()."""
+        if self.closed:
+            raise ValueError("Snapshot is closed")
+        records = [(record, record.copy()) for record in live]
+        return self._versions.resolve(collection, self.epoch, records, include_removed)
+
+    def _read_one(self, collection, record_id, live):
+        """Resolve one live record, or None if it doesn't exist now."""
+        if self.closed:
+            raise ValueError("Snapshot is closed")
+        record = live.copy() if live is not None else None
+        return self._versions.resolve_one(collection, self.epoch, record_id, live, record)
+
+    # Reads, with the same signatures as BankDatabase
+
+    def get_user(self, user_id):
+        """Get a user by ID, or None if it didn't exist."""
+        return self._read_one("users", user_id, self._database.storage.get_user(user_id))
+
+    def get_all_users(self):
+        """Get all users."""
+        return self._read("users", self._database.storage.get_all_users(), bool)
+
+    def get_account(self, account_id):
+        """Get an account by ID, or None if it didn't exist."""
+        return self._read_one("accounts", account_id,
+                              self._database.storage.get_account(account_id))
+
+    def get_all_accounts(self):
+        """Get all accounts."""
+        return self._read("accounts", self._database.storage.get_all_accounts(), bool)
+
+    def get_user_accounts(self, user_id):
+        """Get all accounts of a user."""
+        return self._read("accounts", self._database.storage.get_user_accounts(user_id),
+                          lambda account: account.user_id == user_id)
+
+    def get_account_balance(self, account_id):
+        """Get an account's balance.
+
+        Raises:
+            ValueError: If the account didn't exist
+        """
+        account = self.get_account(account_id)
+        if not account:
+            raise ValueError(f"Account with ID {account_id} not found")
+        return account.balance
+
+    def get_indexes(self, collection):
+        """Get the indexes of a collection; there are none on a snapshot."""
+        return []
+
+    def query(self):
+        """Start a BankQuery against the snapshot."""
+        return BankQuery(self)
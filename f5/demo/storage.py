@@ -1,3 +1,8 @@
+import json
+import os
+import threading
+import time
+
 from .record import User, Account
 
 class BankStorage:
@@ -11,6 +16,17 @@ class BankStorage:
         """Save a user record."""
         raise NotImplementedError("Subclasses must implement save_user()")
     
+    def save_users(self, users):
+        """Save a batch of new user records.
+        
+        Subclasses can override this to save a batch more cheaply than one
+        save_user() call per record.
+        
+        Returns:
+            List of saved users
+        """
+        return [self.save_user(user) for user in users]
+    
     def get_user(self, user_id):
         """Get a user by ID."""
         raise NotImplementedError("Subclasses must implement get_user()")
@@ -27,6 +43,17 @@ class BankStorage:
         """Save an account record."""
         raise NotImplementedError("Subclasses must implement save_account()")
     
+    def save_accounts(self, accounts):
+        """Save a batch of new account records.
+        
+        Subclasses can override this to save a batch more cheaply than one
+        save_account() call per record.
+        
+        Returns:
+            List of saved accounts
+        """
+        return [self.save_account(account) for account in accounts]
+    
     def get_account(self, account_id):
         """Get an account by ID."""
         raise NotImplementedError("Subclasses must implement get_account()")
@@ -42,6 +69,22 @@ class BankStorage:
     def get_user_accounts(self, user_id):
         """Get all accounts for a user."""
         raise NotImplementedError("Subclasses must implement get_user_accounts()")
+    
+    def split_account_conditions(self, conditions):
+        """Split account query conditions into those this storage can evaluate
+        itself and the rest.
+        
+        Args:
+            conditions: List of (field, operator, value) tuples
+            
+        Returns:
+            A tuple of (pushed conditions, remaining conditions)
+        """
+        return [], list(conditions)
+    
+    def find_accounts(self, conditions):
+        """Get the accounts matching conditions pushed by split_account_conditions()."""
+        raise NotImplementedError("This storage does not evaluate account conditions")
 
 
 class MemoryStorage(BankStorage):
@@ -52,6 +95,8 @@ class MemoryStorage(BankStorage):
         super().__init__()
         self._users = {}  # user_id -> User
         self._accounts = {}  # account_id -> Account
+        self._user_accounts = {}  # user_id -> set of account_ids
+        self._account_owners = {}  # account_id -> user_id it is filed under
         self._next_user_id = 1
         self._next_account_id = 1
     
@@ -64,6 +109,31 @@ class MemoryStorage(BankStorage):
         self._users[user.id] = user
         return user
     
+    def save_users(self, users):
+        """Save a batch of new users, reserving their IDs in one step."""
+        users = list(users)
+        new_ids = self._reserve_ids("user", sum(1 for user in users if user.id is None))
+        for user in users:
+            if user.id is None:
+                user.id = next(new_ids)
+        self._users.update((user.id, user) for user in users)
+        return users
+    
+    def _reserve_ids(self, kind, count):
+        """Reserve a range of IDs for new records.
+        
+        Args:
+            kind: Either "user" or "account"
+            count: Number of IDs to reserve
+            
+        Returns:
+            An iterator over the reserved IDs
+        """
+        attribute = f"_next_{kind}_id"
+        start = getattr(self, attribute)
+        setattr(self, attribute, start + count)
+        return map(str, range(start, start + count))
+    
     def get_user(self, user_id):
         """Get a user from memory storage."""
         return self._users.get(user_id)
@@ -73,12 +143,9 @@ class MemoryStorage(BankStorage):
         if user_id in self._users:
             del self._users[user_id]
             # Also delete all associated accounts
-            account_ids = [
-                acc_id for acc_id, acc in self._accounts.items() 
-                if acc.user_id == user_id
-            ]
-            for acc_id in account_ids:
+            for acc_id in self._user_accounts.pop(user_id, ()):
                 del self._accounts[acc_id]
+                del self._account_owners[acc_id]
             return True
         return False
     
@@ -93,8 +160,45 @@ class MemoryStorage(BankStorage):
             self._next_account_id += 1
         
         self._accounts[account.id] = account
+        
+        # Keep the user -> accounts map in step, including ownership changes
+        owner = self._account_owners.get(account.id)
+        if owner != account.user_id or account.id not in self._account_owners:
+            if account.id in self._account_owners:
+                self._unlink_account(account.id, owner)
+            self._user_accounts.setdefault(account.user_id, set()).add(account.id)
+            self._account_owners[account.id] = account.user_id
         return account
     
+    def _unlink_account(self, account_id, user_id):
+        """Remove an account from its user's entry in the user -> accounts map."""
+        account_ids = self._user_accounts.get(user_id)
+        if account_ids is not None:
+            account_ids.discard(account_id)
+            if not account_ids:  # Clean up empty sets
+                del self._user_accounts[user_id]
+    
+    def save_accounts(self, accounts):
+        """Save a batch of new accounts, reserving their IDs in one step."""
+        accounts = list(accounts)
+        new_ids = self._reserve_ids("account", sum(1 for account in accounts if account.id is None))
+        stored = self._accounts
+        user_accounts = self._user_accounts
+        owners = self._account_owners
+        for account in accounts:
+            if account.id is None:
+                account.id = next(new_ids)
+            elif account.id in stored:
+                MemoryStorage.save_account(self, account)  # Updates need the owner checks
+                continue
+            stored[account.id] = account
+            owners[account.id] = account.user_id
+            account_ids = user_accounts.get(account.user_id)
+            if account_ids is None:
+                account_ids = user_accounts[account.user_id] = set()
+            account_ids.add(account.id)
+        return accounts
+    
     def get_account(self, account_id):
         """Get an account from memory storage."""
         return self._accounts.get(account_id)
@@ -103,6 +207,7 @@ class MemoryStorage(BankStorage):
         """Delete an account from memory storage."""
         if account_id in self._accounts:
             del self._accounts[account_id]
+            self._unlink_account(account_id, self._account_owners.pop(account_id))
             return True
         return False
     
@@ -112,4 +217,526 @@ class MemoryStorage(BankStorage):
     
     def get_user_accounts(self, user_id):
         """Get all accounts for a specific user."""
-        return [acc for acc in self._accounts.values() if acc.user_id == user_id]
\ No newline at end of file
+        return [self._accounts[acc_id] for acc_id in self._user_accounts.get(user_id, ())]
+
+
+class IdAllocator:
+    """Thread-safe allocator for sequential record IDs."""
+    
+    def __init__(self, start=1):
+        """Initialize the allocator.
+        
+        Args:
+            start: The first ID to hand out
+        """
+        self._next_id = start
+        self._lock = threading.Lock()
+    
+    def next_id(self):
+        """Allocate one ID."""
+        with self._lock:
+            next_id = self._next_id
+            self._next_id += 1
+        return str(next_id)
+    
+    def reserve(self, count):
+        """Allocate a contiguous range of IDs in one step.
+        
+        Args:
+            count: Number of IDs to reserve
+            
+        Returns:
+            An iterator over the reserved IDs
+        """
+        with self._lock:
+            start = self._next_id
+            self._next_id += count
+        return map(str, range(start, start + count))
+
+
+class _UserShard:
+    """One shard of a ConcurrentMemoryStorage's users."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = {}  # user_id -> User
+        self.user_accounts = {}  # user_id -> set of account_ids
+
+
+class _AccountShard:
+    """One shard of a ConcurrentMemoryStorage's accounts."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accounts = {}  # account_id -> Account
+        self.owners = {}  # account_id -> user_id it is filed under
+
+
+class ConcurrentMemoryStorage(BankStorage):
+    """Thread-safe in-memory implementation of the BankStorage interface.
+    
+    Users and accounts are spread over shards by ID hash, each shard with its
+    own lock, so writers to different shards don't wait for each other. IDs
+    come from an atomic allocator. Single-record reads take no lock.
+    
+    An account shard lock may be held while taking a user shard lock, never
+    the other way round, and never two shards of the same kind at once, so
+    the locks can't deadlock.
+    """
+    
+    def __init__(self, shards=16):
+        """Initialize a new concurrent memory storage instance.
+        
+        Args:
+            shards: Number of user shards and of account shards
+        """
+        super().__init__()
+        self._user_shards = [_UserShard() for _ in range(shards)]
+        self._account_shards = [_AccountShard() for _ in range(shards)]
+        self._user_ids = IdAllocator()
+        self._account_ids = IdAllocator()
+    
+    def _user_shard(self, user_id):
+        return self._user_shards[hash(user_id) % len(self._user_shards)]
+    
+    def _account_shard(self, account_id):
+        return self._account_shards[hash(account_id) % len(self._account_shards)]
+    
+    def save_user(self, user):
+        """Save a user to its shard."""
+        if user.id is None:
+            user.id = self._user_ids.next_id()
+        
+        shard = self._user_shard(user.id)
+        with shard.lock:
+            shard.users[user.id] = user
+        return user
+    
+    def save_users(self, users):
+        """Save a batch of new users, reserving their IDs in one step."""
+        users = list(users)
+        new_ids = self._user_ids.reserve(sum(1 for user in users if user.id is None))
+        for user in users:
+            if user.id is None:
+                user.id = next(new_ids)
+            self.save_user(user)
+        return users
+    
+    def get_user(self, user_id):
+        """Get a user from its shard."""
+        return self._user_shard(user_id).users.get(user_id)
+    
+    def delete_user(self, user_id):
+        """Delete a user and all their accounts."""
+        shard = self._user_shard(user_id)
+        with shard.lock:
+            if shard.users.pop(user_id, None) is None:
+                return False
+            account_ids = shard.user_accounts.pop(user_id, ())
+        
+        for account_id in account_ids:
+            self.delete_account(account_id)
+        return True
+    
+    def get_all_users(self):
+        """Get all users from every shard."""
+        users = []
+        for shard in self._user_shards:
+            users.extend(list(shard.users.values()))
+        return users
+    
+    def _link_account(self, account_id, user_id):
+        """File an account under a user in the user's shard."""
+        shard = self._user_shard(user_id)
+        with shard.lock:
+            shard.user_accounts.setdefault(user_id, set()).add(account_id)
+    
+    def _unlink_account(self, account_id, user_id):
+        """Remove an account from a user's entry in the user's shard."""
+        shard = self._user_shard(user_id)
+        with shard.lock:
+            account_ids = shard.user_accounts.get(user_id)
+            if account_ids is not None:
+                account_ids.discard(account_id)
+                if not account_ids:  # Clean up empty sets
+                    del shard.user_accounts[user_id]
+    
+    def save_account(self, account):
+        """Save an account to its shard."""
+        if account.id is None:
+            account.id = self._account_ids.next_id()
+        
+        shard = self._account_shard(account.id)
+        with shard.lock:
+            shard.accounts[account.id] = account
+            filed = account.id in shard.owners
+            owner = shard.owners.get(account.id)
+            if not filed or owner != account.user_id:
+                if filed:
+                    self._unlink_account(account.id, owner)
+                self._link_account(account.id, account.user_id)
+                shard.owners[account.id] = account.user_id
+        return account
+    
+    def save_accounts(self, accounts):
+        """Save a batch of new accounts, reserving their IDs in one step."""
+        accounts = list(accounts)
+        new_ids = self._account_ids.reserve(sum(1 for account in accounts if account.id is None))
+        for account in accounts:
+            if account.id is None:
+                account.id = next(new_ids)
+            self.save_account(account)
+        return accounts
+    
+    def get_account(self, account_id):
+        """Get an account from its shard."""
+        return self._account_shard(account_id).accounts.get(account_id)
+    
+    def delete_account(self, account_id):
+        """Delete an account from its shard."""
+        shard = self._account_shard(account_id)
+        with shard.lock:
+            if shard.accounts.pop(account_id, None) is None:
+                return False
+            self._unlink_account(account_id, shard.owners.pop(account_id))
+        return True
+    
+    def get_all_accounts(self):
+        """Get all accounts from every shard."""
+        accounts = []
+        for shard in self._account_shards:
+            accounts.extend(list(shard.accounts.values()))
+        return accounts
+    
+    def get_user_accounts(self, user_id):
+        """Get all accounts for a specific user."""
+        shard = self._user_shard(user_id)
+        with shard.lock:
+            account_ids = list(shard.user_accounts.get(user_id, ()))
+        accounts = (self.get_account(account_id) for account_id in account_ids)
+        return [account for account in accounts if account is not None]
+
+
+class FileStorage(MemoryStorage):
+    """Durable on-disk implementation of the BankStorage interface.
+    
+    Records are served from memory as in MemoryStorage. Every change is also
+    appended to a write-ahead log, which is fsynced once per batch of writes
+    (group commit) and compacted into a snapshot once it grows long enough.
+    On startup the snapshot is loaded and the log replayed on top of it.
+    
+    Writes since the last sync (at most sync_every writes, or those of the
+    last sync_interval seconds) can be lost on a crash; a background thread
+    syncs them once sync_interval has passed. Call sync() or close() to make
+    them durable at once.
+    """
+    
+    SNAPSHOT_FILE = "snapshot.json"
+    LOG_FILE = "wal.log"
+    
+    def __init__(self, path, sync_every=100, sync_interval=0.05, compact_every=100000):
+        """Open or create a file storage in a directory.
+        
+        Args:
+            path: Directory holding the snapshot and log files
+            sync_every: Number of writes to batch into one fsync
+            sync_interval: Seconds after which logged writes are fsynced
+                even if the batch is not full
+            compact_every: Number of log entries after which the log is
+                compacted into a snapshot, or None to only compact on demand
+        """
+        super().__init__()
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+        self._snapshot_path = os.path.join(path, self.SNAPSHOT_FILE)
+        self._log_path = os.path.join(path, self.LOG_FILE)
+        self._log_entries = 0  # Entries in the log since the last snapshot
+        self._unsynced = 0  # Entries written since the last fsync
+        self._last_sync = time.monotonic()
+        self._log_lock = threading.Lock()
+        self._log_written = threading.Condition(self._log_lock)  # Wakes the flusher
+        
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        self._log = open(self._log_path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                         name="FileStorage flusher")
+        self._flusher.start()
+    
+    # Recovery
+    
+    def _load(self):
+        """Load the snapshot and replay the log."""
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            for data in snapshot["users"]:
+                self._apply({"op": "save_user", "record": data})
+            for data in snapshot["accounts"]:
+                self._apply({"op": "save_account", "record": data})
+            self._next_user_id = max(self._next_user_id, snapshot["next_user_id"])
+            self._next_account_id = max(self._next_account_id, snapshot["next_account_id"])
+        
+        if not os.path.exists(self._log_path):
+            return
+        
+        valid_size = 0
+        with open(self._log_path, "rb") as log_file:
+            for line in log_file:
+                # A line without a newline is a write torn by a crash
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(json.loads(line))
+                self._log_entries += 1
+                valid_size += len(line)
+        
+        # Drop a torn tail so new entries are not appended to it
+        if valid_size < os.path.getsize(self._log_path):
+            with open(self._log_path, "r+b") as log_file:
+                log_file.truncate(valid_size)
+    
+    def _apply(self, entry):
+        """Apply a log entry to the in-memory state without logging it.
+        
+        Entries hold full records, so applying one twice is harmless.
+        """
+        op = entry["op"]
+        if op == "save_user":
+            data = entry["record"]
+            user = User(data["id"], data["name"], data["email"], data["address"])
+            MemoryStorage.save_user(self, user)
+            self._next_user_id = max(self._next_user_id, self._next_id(user.id))
+        elif op == "save_account":
+            data = entry["record"]
+            account = Account(data["id"], data["user_id"], data["account_type"], data["balance"])
+            MemoryStorage.save_account(self, account)
+            self._next_account_id = max(self._next_account_id, self._next_id(account.id))
+        elif op == "delete_user":
+            MemoryStorage.delete_user(self, entry["id"])
+        elif op == "delete_account":
+            MemoryStorage.delete_account(self, entry["id"])
+        else:
+            raise ValueError(f"Unknown log entry: {op}")
+    
+    def _next_id(self, record_id):
+        """Get the counter value that follows a numeric record ID."""
+        try:
+            return int(record_id) + 1
+        except (TypeError, ValueError):
+            return 1
+    
+    # Logging
+    
+    def _append(self, entry):
+        """Append an entry to the log, syncing and compacting when due."""
+        self._append_many((entry,))
+    
+    def _append_many(self, entries):
+        """Append a batch of entries to the log with one sync check."""
+        lines = [json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries]
+        with self._log_lock:
+            self._log.write("".join(lines))
+            self._unsynced += len(lines)
+            self._log_entries += len(lines)
+            
+            if (self._unsynced >= self.sync_every or
+                    time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+            if self.compact_every and self._log_entries >= self.compact_every:
+                self._compact()
+            if self._unsynced:
+                self._log_written.notify()
+    
+    def _flush_loop(self):
+        """Sync logged writes once sync_interval has passed, until closed."""
+        with self._log_written:
+            while not self._log.closed:
+                if not self._unsynced:
+                    self._log_written.wait()
+                    continue
+                delay = self._last_sync + self.sync_interval - time.monotonic()
+                if delay > 0:
+                    self._log_written.wait(delay)
+                else:
+                    self._sync()
+    
+    def sync(self):
+        """Flush and fsync all logged writes."""
+        with self._log_lock:
+            self._sync()
+    
+    def _sync(self):
+        if self._unsynced:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def compact(self):
+        """Write a snapshot of the current state and start a new log."""
+        with self._log_lock:
+            self._compact()
+    
+    def _compact(self):
+        self._sync()
+        snapshot = {
+            "next_user_id": self._next_user_id,
+            "next_account_id": self._next_account_id,
+            "users": [user.to_dict() for user in list(self._users.values())],
+            "accounts": [account.to_dict() for account in list(self._accounts.values())],
+        }
+        
+        # Write the snapshot next to the old one and swap it in atomically.
+        # A crash before the log is truncated just replays it again.
+        temp_path = self._snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, self._snapshot_path)
+        
+        self._log.close()
+        self._log = open(self._log_path, "w", encoding="utf-8")
+        self._log_entries = 0
+    
+    def close(self):
+        """Sync outstanding writes and close the log."""
+        with self._log_lock:
+            if not self._log.closed:
+                self._sync()
+                self._log.close()
+                self._log_written.notify()
+        self._flusher.join()
+    
+    # BankStorage interface
+    
+    def save_user(self, user):
+        """Save a user and log the change."""
+        user = super().save_user(user)
+        self._append({"op": "save_user", "record": user.to_dict()})
+        return user
+    
+    def save_users(self, users):
+        """Save a batch of new users and log them."""
+        users = super().save_users(users)
+        self._append_many({"op": "save_user", "record": user.to_dict()} for user in users)
+        return users
+    
+    def delete_user(self, user_id):
+        """Delete a user and their accounts and log the change."""
+        if not super().delete_user(user_id):
+            return False
+        self._append({"op": "delete_user", "id": user_id})
+        return True
+    
+    def save_account(self, account):
+        """Save an account and log the change."""
+        account = super().save_account(account)
+        self._append({"op": "save_account", "record": account.to_dict()})
+        return account
+    
+    def save_accounts(self, accounts):
+        """Save a batch of new accounts and log them."""
+        accounts = super().save_accounts(accounts)
+        self._append_many(
+            {"op": "save_account", "record": account.to_dict()} for account in accounts
+        )
+        return accounts
+    
+    def delete_account(self, account_id):
+        """Delete an account and log the change."""
+        if not super().delete_account(account_id):
+            return False
+        self._append({"op": "delete_account", "id": account_id})
+        return True
+
+
+class Storage:
+    """In-memory storage for generic database collections.
+    
+    Records are kept per collection and keyed by ID, with IDs handed out
+    per collection. Subclasses can override these methods to keep records
+    elsewhere.
+    """
+    
+    def __init__(self):
+        """Initialize a new storage instance."""
+        self._collections = {}  # collection name -> {record_id: Record}
+        self._ids = {}  # collection name -> IdAllocator
+        self._lock = threading.Lock()
+    
+    def _records(self, collection):
+        """Get the record map of a collection, creating it if needed."""
+        records = self._collections.get(collection)
+        if records is None:
+            with self._lock:
+                records = self._collections.setdefault(collection, {})
+                self._ids.setdefault(collection, IdAllocator())
+        return records
+    
+    def save(self, collection, record):
+        """Save a record, giving it an ID if it has none.
+        
+        Args:
+            collection: Name of the collection
+            record: The Record to save
+            
+        Returns:
+            The saved record
+        """
+        records = self._records(collection)
+        if record.id is None:
+            record.id = self._ids[collection].next_id()
+        records[record.id] = record
+        return record
+    
+    def save_many(self, collection, records):
+        """Save a batch of records, reserving IDs for new ones in one step.
+        
+        Returns:
+            List of saved records
+        """
+        records = list(records)
+        stored = self._records(collection)
+        new_ids = self._ids[collection].reserve(sum(1 for record in records if record.id is None))
+        for record in records:
+            if record.id is None:
+                record.id = next(new_ids)
+            stored[record.id] = record
+        return records
+    
+    def get(self, collection, record_id):
+        """Get a record by ID, or None if it doesn't exist."""
+        return self._collections.get(collection, {}).get(record_id)
+    
+    def delete(self, collection, record_id):
+        """Delete a record by ID.
+        
+        Returns:
+            True if the record was deleted, False otherwise
+        """
+        return self._collections.get(collection, {}).pop(record_id, None) is not None
+    
+    def get_all(self, collection):
+        """Get all records in a collection."""
+        return list(self._collections.get(collection, {}).values())
+    
+    def count(self, collection):
+        """Count the records in a collection."""
+        return len(self._collections.get(collection, {}))
+    
+    def collections(self):
+        """Get the names of all collections."""
+        return list(self._collections)
+    
+    def drop(self, collection):
+        """Delete a collection and all its records.
+        
+        Returns:
+            True if the collection existed, False otherwise
+        """
+        with self._lock:
+            self._ids.pop(collection, None)
+            return self._collections.pop(collection, None) is not None
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TransferEngine:
+    """Runs batches of transfers in parallel on a thread pool.
+
+    Every transfer goes through BankDatabase.transfer(), which locks both
+    accounts in a fixed order and rolls back on failure, so each transfer is
+    applied completely or not at all. A failed transfer is reported and does
+    not stop the rest of the batch; transfers in a batch may be applied in
+    any order.
+    """
+
+    def __init__(self, database, workers=8):
+        """Initialize a transfer engine.
+
+        Args:
+            database: The BankDatabase to transfer money in
+            workers: Number of threads to run transfers on
+        """
+        self.database = database
+        self.workers = workers
+
+    def run(self, transfers):
+        """Apply a batch of transfers.
+
+        Args:
+            transfers: Iterable of (from_account_id, to_account_id, amount) tuples
+
+        Returns:
+            A dict with the number of transfers "completed" and "failed",
+            the "errors" as (position, transfer, message) tuples, the elapsed
+            "seconds" and the throughput in "transfers_per_sec"
+        """
+        transfers = list(transfers)
+        workers = max(1, min(self.workers, len(transfers)))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self._run_share, transfers, worker, workers)
+                for worker in range(workers)
+            ]
+            errors = [error for future in futures for error in future.result()]
+        seconds = time.perf_counter() - start
+
+        errors.sort(key=lambda error: error[0])
+        return {
+            "completed": len(transfers) - len(errors),
+            "failed": len(errors),
+            "errors": errors,
+            "seconds": seconds,
+            "transfers_per_sec": len(transfers) / seconds if seconds else 0.0,
+        }
+
+    def _run_share(self, transfers, worker, workers):
+        """Apply every workers-th transfer starting at position worker.
+
+        Returns:
+            List of (position, transfer, message) tuples for failed transfers
+        """
+        transfer = self.database.transfer
+        errors = []
+        for position in range(worker, len(transfers), workers):
+            from_account_id, to_account_id, amount = transfers[position]
+            try:
+                transfer(from_account_id, to_account_id, amount)
+            except ValueError as error:  # Rejected, e.g. for insufficient funds
+                errors.append((position, transfers[position], str(error)))
+            except Exception as error:
+                # Reported like a rejection, so the rest of the share still runs
+                errors.append((position, transfers[position], f"{type(error).__name__}: {error}"))
+        return errors
@@ -0,0 +1,70 @@
+import os
+from collections import namedtuple
+
+import pytest
+
+from f5.demo import (BankDatabase, CachingStorage, ColumnarStorage, ConcurrentMemoryStorage,
+                     FileStorage, MappedStorage, MemoryStorage)
+
+STORAGES = ("memory", "concurrent", "file", "caching", "columnar", "mapped")
+
+Bank = namedtuple("Bank", "db users accounts")
+
+
+def make_storage(kind, path):
+    """Create an empty BankStorage of a kind from STORAGES under path."""
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "concurrent":
+        return ConcurrentMemoryStorage(shards=4)
+    if kind == "file":
+        return FileStorage(os.path.join(path, "bank"), sync_every=1)
+    if kind == "caching":
+        return CachingStorage(MemoryStorage(), max_size=16)
+    if kind == "columnar":
+        return ColumnarStorage()
+    if kind == "mapped":
+        return MappedStorage(os.path.join(path, "accounts.bin"))
+    raise ValueError(kind)
+
+
+@pytest.fixture(params=STORAGES)
+def storage(request, tmp_path):
+    """Each storage backend in turn, closed after the test."""
+    storage = make_storage(request.param, str(tmp_path))
+    yield storage
+    if hasattr(storage, "close"):
+        storage.close()
+
+
+@pytest.fixture
+def db(storage):
+    """A BankDatabase on each storage backend."""
+    return BankDatabase(storage=storage)
+
+
+@pytest.fixture
+def memory_db():
+    """A BankDatabase on MemoryStorage."""
+    return BankDatabase()
+
+
+@pytest.fixture
+def bank_layout():
+    """Accounts for the bank fixture: one [(account_type, balance)] list per user.
+
+    Override this fixture in a test module to populate the bank differently.
+    """
+    return [[("savings", 100.0), ("checking", 50.0)], [("savings", 75.5)]]
+
+
+@pytest.fixture
+def bank(db, bank_layout):
+    """The db fixture populated from bank_layout, as a Bank of (db, users, accounts)."""
+    users, accounts = [], []
+    for n, owned in enumerate(bank_layout):
+        user = db.create_user(f"user{n}", f"user{n}@example.com")
+        users.append(user)
+        accounts.extend(db.create_account(user.id, account_type, balance)
+                        for account_type, balance in owned)
+    return Bank(db, users, accounts)
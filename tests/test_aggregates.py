@@ -0,0 +1,114 @@
+import math
+import threading
+
+import pytest
+
+from f5.demo import BankDatabase
+from tests.test_index_maintenance import GatedStorage, run_during_scan
+
+
+def recompute(accounts):
+    """Aggregates of a group of accounts computed from scratch."""
+    balances = [account.balance for account in accounts if account.balance is not None]
+    return {"count": len(accounts), "sum": math.fsum(balances),
+            "min": min(balances, default=None), "max": max(balances, default=None)}
+
+
+def assert_matches(db):
+    accounts = db.get_all_accounts()
+    aggregates = db.aggregates
+    assert aggregates.bank() == recompute(accounts)
+    for user_id in {account.user_id for account in accounts}:
+        assert aggregates.user(user_id) == recompute(
+            [account for account in accounts if account.user_id == user_id])
+    for account_type in {account.account_type for account in accounts}:
+        assert aggregates.account_type(account_type) == recompute(
+            [account for account in accounts if account.account_type == account_type])
+    assert db.check_aggregates() == []
+
+
+@pytest.fixture
+def bank(bank):
+    bank.db.enable_aggregates()
+    return bank
+
+
+def test_enable_counts_existing_accounts(bank):
+    db, (alice, _), _ = bank
+    assert db.aggregates.user(alice.id) == {"count": 2, "sum": 150.0, "min": 50.0, "max": 100.0}
+    assert_matches(db)
+
+
+def test_insert_update_delete(bank):
+    db, (alice, bob), accounts = bank
+    db.create_account(bob.id, "business", 10.0)
+    db.bulk_create_accounts([(alice.id, "savings", 5.0), (bob.id, "checking", 500.0)])
+    assert_matches(db)
+    db.deposit(accounts[0].id, 25.0)
+    db.withdraw(accounts[2].id, 75.5)
+    assert_matches(db)
+    db.delete_account(accounts[1].id)
+    assert_matches(db)
+    db.delete_user(bob.id)
+    assert db.aggregates.user(bob.id)["count"] == 0
+    assert_matches(db)
+
+
+def test_transfer(bank):
+    db, _, accounts = bank
+    db.transfer(accounts[0].id, accounts[2].id, 40.0)
+    assert_matches(db)
+    with pytest.raises(ValueError):
+        db.transfer(accounts[1].id, accounts[2].id, 1000.0)
+    assert_matches(db)
+
+
+def test_balance_ties(bank):
+    db, (alice, _), accounts = bank
+    twins = [db.create_account(alice.id, "savings", 1.0) for _ in range(3)]
+    assert db.aggregates.bank()["min"] == 1.0
+    db.delete_account(twins[0].id)
+    db.deposit(twins[1].id, 1000.0)
+    assert db.aggregates.bank()["min"] == 1.0
+    assert db.aggregates.bank()["max"] == 1001.0
+    assert_matches(db)
+    db.delete_account(twins[2].id)
+    assert db.aggregates.bank()["min"] == 50.0
+    assert_matches(db)
+
+
+def test_enable_counts_concurrent_creates_once(memory_db):
+    user = memory_db.create_user("carol", "carol@example.com")
+    memory_db.bulk_create_accounts((user.id, "savings", 1.0) for _ in range(20000))
+    stop = threading.Event()
+
+    def create_accounts():
+        while not stop.is_set():
+            memory_db.create_account(user.id, "checking", 2.0)
+
+    writer = threading.Thread(target=create_accounts)
+    writer.start()
+    try:
+        memory_db.enable_aggregates()
+    finally:
+        stop.set()
+        writer.join()
+    assert_matches(memory_db)
+
+
+def test_enable_lets_writes_through_and_catches_up():
+    storage = GatedStorage()
+    db = BankDatabase(storage=storage)
+    alice = db.create_user("alice", "alice@example.com")
+    bob = db.create_user("bob", "bob@example.com")
+    accounts = [db.create_account(user.id, "savings", 10.0) for user in (alice, bob)]
+
+    def write():
+        db.create_account(alice.id, "checking", 1.0)
+        db.deposit(accounts[0].id, 5.0)
+        db.delete_user(bob.id)
+
+    assert not run_during_scan(storage, db.enable_aggregates, write)
+    assert_matches(db)
+    db.withdraw(accounts[0].id, 2.0)
+    assert_matches(db)
@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from f5.demo import AsyncBankDatabase, BankDatabase, ConcurrentMemoryStorage
+
+
+@pytest.mark.parametrize("offload", [False, True])
+def test_operations_match_sync_api(offload):
+    async def scenario():
+        db = AsyncBankDatabase(BankDatabase(storage=ConcurrentMemoryStorage()), offload=offload)
+        user = await db.create_user("alice", "alice@example.com")
+        source = await db.create_account(user.id, "savings", 100.0)
+        target = await db.create_account(user.id, "checking", 0.0)
+        await db.deposit(source.id, 10.0)
+        await db.withdraw(source.id, 20.0)
+        assert await db.transfer(source.id, target.id, 40.0) == (50.0, 40.0)
+        with pytest.raises(ValueError):
+            await db.transfer(source.id, target.id, 1000.0)
+        assert (await db.get_user(user.id)).name == "alice"
+        query = db.query().accounts().filter_user_id(user.id)
+        assert len(await db.execute(query)) == 2
+        assert await db.count(query) == 2
+        assert (await db.first(db.query().accounts().filter_min_balance(45.0))).id == source.id
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_reads_of_one_account_are_coalesced():
+    async def scenario():
+        with ThreadPoolExecutor(2) as executor:
+            db = AsyncBankDatabase(executor=executor)
+            user = await db.create_user("alice", "alice@example.com")
+            account = await db.create_account(user.id, "savings", 1.0)
+            results = await asyncio.gather(*(db.get_account(account.id) for _ in range(10)))
+            assert {result.id for result in results} == {account.id}
+            assert db.coalesced_reads > 0
+            assert db._account_reads == {}
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_one_reader_keeps_the_shared_read():
+    async def scenario():
+        db = AsyncBankDatabase(offload=True)
+        user = await db.create_user("alice", "alice@example.com")
+        account = await db.create_account(user.id, "savings", 1.0)
+        first = asyncio.ensure_future(db.get_account(account.id))
+        second = asyncio.ensure_future(db.get_account(account.id))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert (await second).id == account.id
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+import copy
+import json
+import sys
+
+import pytest
+
+from f5.benchmarks import suite
+
+
+def test_percentile_and_summary():
+    assert suite.percentile([], 0.5) == 0.0
+    assert suite.percentile([1, 2, 3, 4], 0.5) == 3
+    stats = suite.summarize([2_000, 1_000, 3_000])
+    assert stats["calls"] == 3
+    assert stats["p50_us"] == 2.0
+    assert stats["ops_per_sec"] == pytest.approx(3 / 6e-6)
+
+
+def test_run_scale_reports_every_operation():
+    results = suite.run_scale(50, seed=1, samples=5, query_samples=2)
+    operations = results["operations"]
+    for name in ("create_user", "deposit", "transfer", "delete_user"):
+        assert operations[name]["calls"] == 5
+    for name in suite.QUERIES:
+        assert operations[f"query_{name}_scan"]["calls"] == 2
+        assert operations[f"query_{name}_indexed"]["calls"] == 2
+    assert results["dataset"]["users"] == 50
+
+
+def test_compare_flags_slowdowns_only():
+    stats = {"calls": 1, "ops_per_sec": 1000.0, "p50_us": 10.0, "p99_us": 20.0}
+    baseline = {"results": {"10": {"dataset": {"peak_memory_bytes": 100},
+                                   "operations": {"deposit": stats}}}}
+    same = copy.deepcopy(baseline)
+    assert suite.compare(same, baseline, 0.2) == []
+
+    slower = copy.deepcopy(baseline)
+    slower["results"]["10"]["operations"]["deposit"].update(p50_us=20.0, ops_per_sec=500.0)
+    slower["results"]["10"]["dataset"]["peak_memory_bytes"] = 200
+    flagged = {(name, metric) for _, name, metric, _, _ in suite.compare(slower, baseline, 0.2)}
+    assert flagged == {("deposit", "p50_us"), ("deposit", "ops_per_sec"),
+                       ("dataset", "peak_memory_bytes")}
+
+
+def test_main_writes_report_and_checks_baseline(tmp_path, monkeypatch):
+    output = tmp_path / "report.json"
+    monkeypatch.setattr(sys, "argv", [
+        "suite", "--scales", "30", "--samples", "3", "--query-samples", "1",
+        "--output", str(output), "--save-baseline", str(tmp_path / "baseline.json")])
+    suite.main()
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == {"30"}
+
+    # Against an impossibly fast baseline, every operation regresses
+    for stats in report["results"]["30"]["operations"].values():
+        stats.update(p50_us=0.0, ops_per_sec=float("inf"))
+    (tmp_path / "fast.json").write_text(json.dumps(report))
+    monkeypatch.setattr(sys, "argv", [
+        "suite", "--scales", "30", "--samples", "3", "--query-samples", "1",
+        "--output", str(output), "--baseline", str(tmp_path / "fast.json")])
+    with pytest.raises(SystemExit) as exit_info:
+        suite.main()
+    assert exit_info.value.code == 1
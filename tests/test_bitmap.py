@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+
+import pytest
+
+from f5.demo import Account, BankBitmapIndex, BankQuery, Bitmap
+from f5.demo.bitmap import ARRAY_LIMIT, RowIds, find_row, id_of, row_of
+
+
+@pytest.fixture(params=["sparse", "dense", "mixed"])
+def sets(request):
+    rng = random.Random(request.param)
+    if request.param == "sparse":
+        rows = lambda: {rng.randrange(1 << 20) for _ in range(500)}
+    elif request.param == "dense":
+        rows = lambda: {rng.randrange(20_000) for _ in range(12_000)}
+    else:
+        rows = lambda: ({rng.randrange(65536) for _ in range(ARRAY_LIMIT * 2)}
+                        | {rng.randrange(65536, 1 << 22) for _ in range(300)})
+    return rows(), rows()
+
+
+def test_set_algebra_matches_python_sets(sets):
+    left, right = sets
+    a, b = Bitmap(left), Bitmap(right)
+    assert list(a) == sorted(left)
+    assert len(a) == len(left)
+    assert set(a & b) == left & right
+    assert set(a | b) == left | right
+    assert set(a - b) == left - right
+    assert all(row in a for row in list(left)[:100])
+
+
+def test_discard_converts_back_and_empties(sets):
+    left, _ = sets
+    bitmap = Bitmap(left)
+    copy = bitmap.copy()
+    for row in left:
+        bitmap.discard(row)
+    bitmap.discard(12345678)  # Absent rows are ignored
+    assert not bitmap and len(bitmap) == 0
+    assert set(copy) == left
+
+
+def test_row_mapping_round_trips():
+    for record_id in ("1", "42", "007", "abc", "-3"):
+        assert id_of(row_of(record_id)) == record_id
+    assert row_of("42") == 42
+
+
+def test_bitmap_index_lookups():
+    index = BankBitmapIndex("account_type")
+
+    class Row:
+        def __init__(self, record_id, account_type):
+            self.id, self.account_type = record_id, account_type
+
+    index.add_accounts([Row(str(i), ("savings", "checking")[i % 2]) for i in range(1, 11)])
+    assert set(index.find("savings")) == {"2", "4", "6", "8", "10"}
+    assert index.count("checking") == 5
+    assert index.remove("2", "savings")
+    assert index.count("savings") == 4
+    assert isinstance(index.find("savings"), (set, RowIds))
+
+
+def test_bitmap_queries_match_scans(db):
+    user = db.create_user("alice", "alice@example.com")
+    rng = random.Random(5)
+    db.bulk_create_accounts((user.id, rng.choice(["savings", "checking", "business"]),
+                             float(rng.randrange(100))) for _ in range(200))
+
+    def run():
+        query = (BankQuery(db).accounts().filter_account_type("savings")
+                 .filter_min_balance(50.0))
+        query.conditions.append(("user_id", "!=", "nobody"))
+        return [account.id for account in query.sort_by("balance").execute()]
+
+    scanned = run()
+    db.create_index("accounts", "account_type", "bitmap")
+    assert "bitmap" in BankQuery(db).accounts().filter_account_type("savings").explain()
+    assert run() == scanned
+
+
+def test_lookups_of_unknown_ids_assign_no_rows():
+    index = BankBitmapIndex("account_type")
+    index.add_account(Account("1", "1", "savings", 1.0))
+    rows = RowIds(index.bitmap("savings"))
+    assigned = row_of("known-id")
+    assert "1" in rows and "known-id" not in rows
+    assert "not-an-id" not in rows
+    assert not index.remove("also-not-an-id", "savings")
+    assert find_row("not-an-id") is None and find_row("also-not-an-id") is None
+    assert find_row("known-id") == assigned
+
+
+def test_queries_survive_concurrent_writes(memory_db):
+    user = memory_db.create_user("alice", "alice@example.com")
+    memory_db.create_account(user.id, "savings", 1.0)
+    index = memory_db.create_index("accounts", "account_type", "bitmap")
+    stop = threading.Event()
+
+    def churn():
+        # As writes would: rows in other containers, so each removal drops one
+        rows = [Account(str(row), user.id, "savings", 1.0) for row in (1 << 16, 2 << 16)]
+        while not stop.is_set():
+            index.add_accounts(rows)
+            for account in rows:
+                index.remove(account.id, "savings")
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            accounts = BankQuery(memory_db).accounts().filter_account_type("savings").execute()
+            assert "1" in [account.id for account in accounts]
+    finally:
+        stop.set()
+        writer.join()
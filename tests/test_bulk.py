@@ -0,0 +1,38 @@
+import pytest
+
+from f5.demo import BankQuery
+
+
+def test_bulk_users_from_dicts_tuples_and_generators(db):
+    users = db.bulk_create_users(
+        [{"name": "alice", "email": "alice@example.com", "address": "1 main st"},
+         ("bob", "bob@example.com")], batch_size=1)
+    more = db.bulk_create_users(((f"user{i}", f"user{i}@example.com") for i in range(5)),
+                                batch_size=2)
+    assert [user.name for user in users] == ["alice", "bob"]
+    assert users[0].address == "1 main st"
+    ids = [user.id for user in users + more]
+    assert len(set(ids)) == 7 and None not in ids
+    assert sorted(ids) == sorted(user.id for user in db.get_all_users())
+
+
+def test_bulk_accounts_are_indexed_and_counted(db):
+    db.create_index("accounts", "account_type")
+    db.enable_aggregates()
+    user = db.create_user("alice", "alice@example.com")
+    accounts = db.bulk_create_accounts(
+        [(user.id, "savings", 5.0), {"user_id": user.id, "account_type": "checking",
+                                     "initial_balance": 7.0}, (user.id, "savings")],
+        batch_size=2)
+    assert [account.balance for account in accounts] == [5.0, 7.0, 0.0]
+    assert len(BankQuery(db).accounts().filter_account_type("savings").execute()) == 2
+    assert db.aggregates.bank()["sum"] == 12.0
+    assert sorted(a.id for a in db.get_user_accounts(user.id)) == sorted(a.id for a in accounts)
+
+
+def test_failing_batch_creates_nothing_of_it(db):
+    user = db.create_user("alice", "alice@example.com")
+    rows = [(user.id, "savings", 1.0), (user.id, "savings", 2.0), ("missing", "savings", 3.0)]
+    with pytest.raises(ValueError, match="missing"):
+        db.bulk_create_accounts(rows, batch_size=2)
+    assert sorted(a.balance for a in db.get_all_accounts()) == [1.0, 2.0]
@@ -0,0 +1,77 @@
+import threading
+
+from f5.demo import BankDatabase, CachingStorage, MemoryStorage
+
+
+class PausingStorage(MemoryStorage):
+    """MemoryStorage whose get_account() can be paused after reading."""
+
+    def __init__(self):
+        super().__init__()
+        self.read = threading.Event()
+        self.resume = threading.Event()
+        self.pause = False
+
+    def get_account(self, account_id):
+        account = super().get_account(account_id)
+        if self.pause:
+            self.read.set()
+            self.resume.wait(5)
+        return account
+
+
+def test_hits_misses_and_eviction():
+    cache = CachingStorage(MemoryStorage(), max_size=2)
+    db = BankDatabase(storage=cache)
+    user = db.create_user("alice", "alice@example.com")
+    accounts = [db.create_account(user.id, "savings", 1.0) for _ in range(3)]
+    cache.clear()
+    before = cache.stats()
+    assert db.get_account(accounts[0].id).id == accounts[0].id
+    assert db.get_account(accounts[0].id).id == accounts[0].id
+    after = cache.stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+    db.get_account(accounts[1].id)
+    db.get_account(accounts[2].id)
+    assert cache.stats()["evictions"] - before["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_ttl_expires_entries():
+    cache = CachingStorage(MemoryStorage(), ttl=0)
+    user = cache.save_user(BankDatabase().create_user("bob", "bob@example.com"))
+    assert cache.get_user(user.id).id == user.id
+    assert cache.stats()["expirations"] == 1
+
+
+def test_delete_user_drops_cached_accounts():
+    cache = CachingStorage(MemoryStorage())
+    db = BankDatabase(storage=cache)
+    user = db.create_user("carol", "carol@example.com")
+    account = db.create_account(user.id, "savings", 1.0)
+    db.get_account(account.id)
+    db.delete_user(user.id)
+    assert db.get_user(user.id) is None
+    assert db.get_account(account.id) is None
+
+
+def test_miss_racing_delete_does_not_resurrect_record():
+    backend = PausingStorage()
+    cache = CachingStorage(backend)
+    db = BankDatabase(storage=cache)
+    user = db.create_user("dave", "dave@example.com")
+    account = db.create_account(user.id, "savings", 1.0)
+    cache.clear()
+
+    backend.pause = True
+    reader = threading.Thread(target=cache.get_account, args=(account.id,))
+    reader.start()
+    assert backend.read.wait(5)
+    backend.pause = False
+    db.delete_account(account.id)
+    backend.resume.set()
+    reader.join()
+
+    assert cache.get_account(account.id) is None
+    assert cache.stats()["size"] == 0
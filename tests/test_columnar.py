@@ -0,0 +1,90 @@
+import pytest
+
+from f5.demo import Account, BankDatabase, BankQuery, ColumnarStorage
+from f5.demo.columnar import np
+
+CONDITION_SETS = [
+    [("balance", ">", 20.0)],
+    [("balance", "<=", 30.0), ("account_type", "=", "savings")],
+    [("account_type", "!=", "checking")],
+    [("user_id", "=", "2"), ("balance", ">=", 0.0)],
+    [("account_type", "=", "loan")],
+]
+
+
+def fill(db):
+    users = [db.create_user(f"user{i}", f"user{i}@example.com") for i in range(3)]
+    for i in range(12):
+        db.create_account(users[i % 3].id, ("savings", "checking", "business")[i % 3],
+                          float(i * 5))
+    return users
+
+
+def query(db, conditions):
+    q = BankQuery(db).accounts()
+    q.conditions = list(conditions)
+    return sorted((a.id, a.user_id, a.account_type, a.balance) for a in q.execute())
+
+
+@pytest.fixture
+def pair():
+    memory, columnar = BankDatabase(), BankDatabase(storage=ColumnarStorage())
+    fill(memory)
+    fill(columnar)
+    return memory, columnar
+
+
+@pytest.mark.parametrize("conditions", CONDITION_SETS)
+def test_column_filters_match_row_filters(pair, conditions):
+    memory, columnar = pair
+    assert query(columnar, conditions) == query(memory, conditions)
+
+
+@pytest.mark.skipif(np is None, reason="needs NumPy")
+def test_filters_are_pushed_to_storage(pair):
+    _, columnar = pair
+    plan = BankQuery(columnar).accounts().filter_min_balance(10.0).explain()
+    assert "STORAGE FILTER balance >= 10.0" in plan
+
+
+def test_totals_by_type(pair):
+    memory, columnar = pair
+    expected = {}
+    for account in memory.get_all_accounts():
+        expected[account.account_type] = expected.get(account.account_type, 0.0) + account.balance
+    assert columnar.storage.total_balance_by_type() == pytest.approx(expected)
+    assert columnar.storage.total_balance() == pytest.approx(sum(expected.values()))
+
+
+def test_row_views_write_through_and_copy_detaches():
+    storage = ColumnarStorage()
+    account = storage.save_account(Account(None, "1", "savings", 5.0))
+    view = storage.get_account(account.id)
+    view.balance = 7.0
+    view.account_type = "checking"
+    assert storage.get_account(account.id).balance == 7.0
+    copy = view.copy()
+    copy.balance = 1.0
+    assert storage.get_account(account.id).balance == 7.0
+    assert copy.to_dict() == {"id": account.id, "user_id": "1",
+                              "account_type": "checking", "balance": 1.0}
+
+
+def test_deleted_rows_disappear():
+    storage = ColumnarStorage()
+    first = storage.save_account(Account(None, "1", "savings", 5.0))
+    second = storage.save_account(Account(None, "1", "savings", 6.0))
+    assert storage.delete_account(first.id)
+    assert not storage.delete_account(first.id)
+    assert storage.get_account(first.id) is None
+    assert [a.id for a in storage.get_all_accounts()] == [second.id]
+    assert [a.id for a in storage.get_user_accounts("1")] == [second.id]
+    if np is not None:
+        assert [a.id for a in storage.find_accounts([("balance", ">", 0.0)])] == [second.id]
+
+
+def test_none_balance_round_trips():
+    storage = ColumnarStorage()
+    account = storage.save_account(Account(None, "1", "savings", None))
+    assert storage.get_account(account.id).balance is None
+    assert storage.total_balance() == 0.0
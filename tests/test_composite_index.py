@@ -0,0 +1,61 @@
+import pytest
+
+from f5.demo import BankCompositeIndex, BankQuery
+
+
+@pytest.fixture
+def bank_layout():
+    return [[("savings", 10.0 * n), ("checking", 10.0 * n), ("savings", 10.0 * n)]
+            for n in range(4)]
+
+
+def ids(query):
+    return sorted(account.id for account in query.execute())
+
+
+def test_full_and_prefix_lookups(bank):
+    db, users, accounts = bank
+    index = db.create_index("accounts", ("user_id", "account_type"), "composite")
+    owned = {a.id for a in accounts if a.user_id == users[1].id}
+    assert index.find((users[1].id,)) == owned
+    assert index.find((users[1].id, "savings")) == {
+        a.id for a in accounts if a.user_id == users[1].id and a.account_type == "savings"}
+    assert index.find((users[1].id, "loan")) == set()
+    with pytest.raises(ValueError):
+        index.find(())
+    with pytest.raises(ValueError):
+        index.find(("1", "savings", "extra"))
+
+
+def test_queries_use_the_index_and_match_scans(bank):
+    db, users, _ = bank
+    build = lambda: BankQuery(db).accounts().filter_user_id(users[2].id).filter_account_type(
+        "savings")
+    scanned = ids(build())
+    db.create_index("accounts", ("user_id", "account_type"), "composite")
+    plan = build().explain()
+    assert "accounts.(user_id, account_type)" in plan
+    assert ids(build()) == scanned
+    assert len(scanned) == 2
+
+
+def test_index_follows_writes(bank):
+    db, users, accounts = bank
+    index = db.create_index("accounts", ("user_id", "account_type"), "composite")
+    new = db.create_account(users[0].id, "business", 1.0)
+    assert index.find((users[0].id, "business")) == {new.id}
+    db.delete_account(new.id)
+    assert index.find((users[0].id, "business")) == set()
+    db.delete_user(users[3].id)
+    assert index.find((users[3].id,)) == set()
+    assert index.find((users[0].id,)) == {a.id for a in accounts if a.user_id == users[0].id}
+
+
+def test_records_without_leading_field_are_skipped():
+    index = BankCompositeIndex(("user_id", "account_type"))
+
+    class Row:
+        id, user_id, account_type = "1", None, "savings"
+
+    assert not index.add_account(Row())
+    assert index.find((None, "savings")) == set()
@@ -0,0 +1,66 @@
+import threading
+
+from f5.demo import Account, BankDatabase, ConcurrentMemoryStorage, User
+from f5.demo.storage import IdAllocator
+
+
+def run_threads(target, count=8):
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_id_allocator_never_repeats():
+    allocator = IdAllocator()
+    ids = []
+    lock = threading.Lock()
+
+    def allocate(_):
+        mine = [allocator.next_id() for _ in range(500)] + list(allocator.reserve(500))
+        with lock:
+            ids.extend(mine)
+
+    run_threads(allocate)
+    assert len(ids) == len(set(ids)) == 8000
+
+
+def test_concurrent_creates_get_unique_ids():
+    storage = ConcurrentMemoryStorage(shards=4)
+    user = storage.save_user(User(None, "alice", "alice@example.com"))
+
+    def create(n):
+        for i in range(200):
+            storage.save_account(Account(None, user.id, "savings", float(n)))
+        storage.save_accounts(Account(None, user.id, "checking", 0.0) for _ in range(100))
+
+    run_threads(create)
+    accounts = storage.get_all_accounts()
+    assert len(accounts) == len({account.id for account in accounts}) == 2400
+    assert len(storage.get_user_accounts(user.id)) == 2400
+
+
+def test_delete_user_removes_accounts_from_every_shard():
+    storage = ConcurrentMemoryStorage(shards=4)
+    user = storage.save_user(User(None, "alice", "alice@example.com"))
+    other = storage.save_user(User(None, "bob", "bob@example.com"))
+    storage.save_accounts(Account(None, user.id, "savings", 1.0) for _ in range(20))
+    kept = storage.save_account(Account(None, other.id, "savings", 1.0))
+    assert storage.delete_user(user.id)
+    assert not storage.delete_user(user.id)
+    assert storage.get_user(user.id) is None
+    assert [account.id for account in storage.get_all_accounts()] == [kept.id]
+
+
+def test_concurrent_deposits_are_not_lost():
+    db = BankDatabase(storage=ConcurrentMemoryStorage())
+    user = db.create_user("alice", "alice@example.com")
+    accounts = [db.create_account(user.id, "savings", 0.0) for _ in range(4)]
+
+    def deposit(n):
+        for _ in range(250):
+            db.deposit(accounts[n % 4].id, 1.0)
+
+    run_threads(deposit)
+    assert [db.get_account_balance(account.id) for account in accounts] == [500.0] * 4
@@ -0,0 +1,77 @@
+import pytest
+
+from f5.demo import BankQuery, Database
+from f5.demo.cursor import decode_cursor, encode_cursor
+
+
+def pages(build, size=3):
+    """Collect every page of a query by following cursors."""
+    collected, cursor = [], None
+    while True:
+        query = build().limit(size)
+        if cursor is not None:
+            query = query.after(cursor)
+        page = query.execute()
+        collected.extend(record.id for record in page)
+        if len(page) < size:
+            return collected
+        cursor = query.cursor(page[-1])
+
+
+@pytest.fixture
+def bank_layout():
+    balances = (5.0, 1.0, 3.0, 3.0, 8.0, 3.0, 2.0, 9.0, 1.0, 7.0)
+    return [[("savings", balance) for balance in balances]]
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("indexed", [False, True])
+def test_pages_cover_results_once_in_order(bank, reverse, indexed):
+    db = bank.db
+    if indexed:
+        db.create_index("accounts", "balance", "sorted")
+    build = lambda: BankQuery(db).accounts().sort_by("balance", reverse=reverse)
+    assert pages(build) == [account.id for account in build().execute()]
+    ranged = lambda: build().filter_min_balance(2.0)
+    assert pages(ranged, size=2) == [account.id for account in ranged().execute()]
+
+
+def test_inserts_between_pages_do_not_shift_later_pages(bank):
+    db = bank.db
+    build = lambda: BankQuery(db).accounts().sort_by("balance")
+    first = build().limit(4)
+    page = first.execute()
+    cursor = first.cursor(page[-1])
+    user_id = page[0].user_id
+    db.create_account(user_id, "savings", 0.5)  # Sorts before the cursor
+    rest = [account.id for account in build().after(cursor).execute()]
+    expected = [account.id for account in build().execute()]
+    assert rest == expected[expected.index(page[-1].id) + 1:]
+
+
+def test_cursor_errors(bank):
+    db = bank.db
+    query = BankQuery(db).accounts().sort_by("balance").limit(1)
+    record = query.execute()[0]
+    cursor = query.cursor(record)
+    with pytest.raises(ValueError):
+        BankQuery(db).accounts().after("not a cursor!").execute()
+    with pytest.raises(ValueError):
+        BankQuery(db).accounts().sort_by("balance", reverse=True).after(cursor).execute()
+    with pytest.raises(ValueError):
+        BankQuery(db).accounts().cursor(record)
+
+
+def test_encode_decode_round_trip():
+    cursor = encode_cursor("balance", True, [1, "a"], "7")
+    assert decode_cursor(cursor) == ("balance", True, (1, "a"), "7")
+    with pytest.raises(ValueError):
+        encode_cursor("balance", False, object(), "1")
+
+
+def test_generic_query_pagination():
+    db = Database()
+    db.collection("people").insert_many({"name": f"user{i}", "age": 20 + i % 4}
+                                        for i in range(11))
+    build = lambda: db.query("people").sort("age")
+    assert pages(build, size=4) == [record.id for record in build().execute()]
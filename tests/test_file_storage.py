@@ -0,0 +1,118 @@
+import os
+import time
+
+from f5.demo import BankDatabase, FileStorage
+
+
+def open_db(path, **options):
+    storage = FileStorage(str(path), **options)
+    return storage, BankDatabase(storage=storage)
+
+
+def state(storage):
+    return ({user.id: user.to_dict() for user in storage.get_all_users()},
+            {account.id: account.to_dict() for account in storage.get_all_accounts()})
+
+
+def test_reopen_restores_every_write(tmp_path):
+    storage, db = open_db(tmp_path)
+    alice = db.create_user("alice", "alice@example.com", "1 main st")
+    account = db.create_account(alice.id, "savings", 10.0)
+    db.deposit(account.id, 5.0)
+    db.update_user(alice.id, name="alicia")
+    db.bulk_create_users([{"name": "bob", "email": "bob@example.com"}])
+    expected = state(storage)
+    storage.close()
+
+    storage, db = open_db(tmp_path)
+    assert state(storage) == expected
+    assert db.get_account_balance(account.id) == 15.0
+    new_user = db.create_user("carol", "carol@example.com")
+    assert new_user.id not in expected[0]  # IDs are not reused
+    storage.close()
+
+
+def test_synced_writes_survive_a_crash(tmp_path):
+    storage, db = open_db(tmp_path, sync_every=1)
+    user = db.create_user("alice", "alice@example.com")
+    account = db.create_account(user.id, "checking", 3.0)
+    db.withdraw(account.id, 1.0)
+    expected = state(storage)
+
+    recovered, _ = open_db(tmp_path)  # The first storage was never closed
+    assert state(recovered) == expected
+    recovered.close()
+    storage.close()
+
+
+def test_idle_writes_are_synced_after_the_interval(tmp_path):
+    storage, db = open_db(tmp_path, sync_every=1000, sync_interval=0.05)
+    user = db.create_user("alice", "alice@example.com")
+    db.create_account(user.id, "savings", 4.0)
+    expected = state(storage)
+
+    deadline = time.monotonic() + 5
+    while storage._unsynced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    recovered, _ = open_db(tmp_path)  # No further write or sync() came
+    assert state(recovered) == expected
+    recovered.close()
+    storage.close()
+
+
+def test_torn_log_tail_is_dropped(tmp_path):
+    storage, db = open_db(tmp_path)
+    user = db.create_user("alice", "alice@example.com")
+    db.create_account(user.id, "savings", 1.0)
+    expected = state(storage)
+    storage.close()
+
+    log_path = os.path.join(tmp_path, FileStorage.LOG_FILE)
+    size = os.path.getsize(log_path)
+    with open(log_path, "ab") as log_file:
+        log_file.write(b'{"op":"save_account","record":{"id":"9"')
+
+    storage, db = open_db(tmp_path)
+    assert state(storage) == expected
+    assert os.path.getsize(log_path) == size
+    account = db.create_account(user.id, "checking", 2.0)
+    storage.close()
+
+    storage, db = open_db(tmp_path)
+    assert db.get_account_balance(account.id) == 2.0
+    storage.close()
+
+
+def test_compaction_and_replay_over_snapshot(tmp_path):
+    storage, db = open_db(tmp_path, compact_every=5)
+    user = db.create_user("alice", "alice@example.com")
+    accounts = [db.create_account(user.id, "savings", float(i)) for i in range(1, 8)]
+    db.delete_account(accounts[0].id)
+    assert os.path.exists(os.path.join(tmp_path, FileStorage.SNAPSHOT_FILE))
+    expected = state(storage)
+    storage.close()
+
+    storage, _ = open_db(tmp_path)
+    assert state(storage) == expected
+    storage.close()
+
+
+def test_crash_between_snapshot_and_log_truncation(tmp_path):
+    storage, db = open_db(tmp_path, compact_every=None)
+    user = db.create_user("alice", "alice@example.com")
+    account = db.create_account(user.id, "savings", 1.0)
+    db.deposit(account.id, 1.0)
+    storage.sync()
+    log_path = os.path.join(tmp_path, FileStorage.LOG_FILE)
+    with open(log_path, "rb") as log_file:
+        log = log_file.read()
+    storage.compact()
+    expected = state(storage)
+    storage.close()
+
+    # Put the old log back, as if the crash came before it was truncated
+    with open(log_path, "wb") as log_file:
+        log_file.write(log)
+    storage, _ = open_db(tmp_path)
+    assert state(storage) == expected
+    storage.close()
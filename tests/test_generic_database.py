@@ -0,0 +1,74 @@
+import pytest
+
+from f5.demo import Database, Query, Record, Storage
+
+
+def test_record_fields_and_shared_shapes():
+    first = Record({"name": "alice", "age": 30}, "1")
+    second = Record({"name": "bob", "age": 40}, "2")
+    assert first._shape is second._shape
+    first["city"] = "paris"
+    assert first.fields() == ["name", "age", "city"]
+    assert "city" in first and "city" not in second
+    assert first.get("missing", 5) == 5
+    first.remove("age")
+    assert first.to_dict() == {"id": "1", "name": "alice", "city": "paris"}
+    with pytest.raises(KeyError):
+        first["age"]
+
+
+def test_collection_crud_and_counts():
+    db = Database()
+    people = db.collection("people")
+    alice = people.insert({"name": "alice", "age": 30})
+    others = people.insert_many([{"name": "bob", "age": 40}, {"name": "carol", "age": 50}])
+    assert len({alice.id, *(record.id for record in others)}) == 3
+    assert people.count() == 3
+    assert db.update("people", alice.id, {"age": 31}).get("age") == 31
+    assert db.get("people", alice.id).get("age") == 31
+    assert db.delete("people", alice.id)
+    assert not db.delete("people", alice.id)
+    assert db.update("people", alice.id, {"age": 1}) is None
+    assert people.count() == 2
+    assert "people" in db.collections()
+    db.drop_collection("people")
+    assert "people" not in db.collections()
+
+
+def test_database_rejects_other_storages():
+    with pytest.raises(TypeError):
+        Database(storage=object())
+    assert Database(storage=Storage()).storage is not None
+
+
+@pytest.mark.parametrize("kind", ["hash", "bitmap"])
+def test_indexed_queries_match_scans(kind):
+    db = Database()
+    db.collection("people").insert_many(
+        {"name": f"user{i}", "team": ("red", "blue", "green")[i % 3], "age": 20 + i}
+        for i in range(30))
+
+    def run():
+        return sorted(record.id for record in db.query("people")
+                      .filter("team", "=", "blue").filter("age", ">", 30).execute())
+
+    scanned = run()
+    db.create_index("people", "team", kind)
+    assert run() == scanned
+    record = db.get("people", scanned[0])
+    db.update("people", record.id, {"team": "red"})
+    assert record.id not in run()
+    assert len(run()) == len(scanned) - 1
+
+
+def test_query_sort_limit_and_operators():
+    db = Database()
+    db.collection("people").insert_many(
+        [{"name": "alice", "age": 30}, {"name": "bob", "age": 25}, {"name": "al", "age": 35}])
+    query = Query(db.collection("people")).filter("name", "starts_with", "al").sort(
+        "age", reverse=True)
+    assert [record.get("name") for record in query.execute()] == ["al", "alice"]
+    names = [r.get("name") for r in db.query("people").sort("age").skip(1).limit(1).execute()]
+    assert names == ["alice"]
+    assert [r.get("name") for r in db.query("people")
+            .filter("age", "in", (25, 35)).sort("name").execute()] == ["al", "bob"]
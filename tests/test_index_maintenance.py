@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+from f5.demo import BankDatabase, BankQuery, MemoryStorage
+
+
+class GatedStorage(MemoryStorage):
+    """MemoryStorage whose full account scans wait until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.scanning = threading.Event()
+        self.release = threading.Event()
+
+    def get_all_accounts(self):
+        accounts = super().get_all_accounts()
+        if not self.release.is_set():
+            self.scanning.set()
+            self.release.wait()
+        return accounts
+
+
+def contents(index):
+    return {value: index.find(value) for value in index.values()}
+
+
+def run_during_scan(storage, build, write):
+    """Run write() while build() is stuck in its full scan.
+
+    Returns:
+        Whether write() was held back until the scan finished
+    """
+    builder = threading.Thread(target=build)
+    builder.start()
+    assert storage.scanning.wait(5)
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join(timeout=2)
+    stalled = writer.is_alive()
+    storage.release.set()
+    writer.join()
+    builder.join()
+    return stalled
+
+
+def test_indexes_follow_creates_updates_and_deletes(db):
+    by_type = db.create_index("accounts", "account_type")
+    by_name = db.create_index("users", "name")
+    user = db.create_user("alice", "alice@example.com")
+    savings = db.create_account(user.id, "savings", 10.0)
+    checking = db.create_account(user.id, "checking", 20.0)
+    assert by_type.find("savings") == {savings.id}
+    assert by_name.find("alice") == {user.id}
+
+    db.update_user(user.id, name="alicia")
+    assert by_name.find("alice") == set()
+    assert by_name.find("alicia") == {user.id}
+
+    db.delete_account(savings.id)
+    assert by_type.find("savings") == set()
+    assert by_type.find("checking") == {checking.id}
+
+
+def test_create_index_backfills_existing_records(db):
+    user = db.create_user("bob", "bob@example.com")
+    accounts = [db.create_account(user.id, "savings", float(i)) for i in range(1, 4)]
+    index = db.create_index("accounts", "account_type")
+    assert index.find("savings") == {account.id for account in accounts}
+    assert index in db.get_indexes("accounts")
+
+
+def test_create_index_misses_no_concurrent_write(memory_db):
+    user = memory_db.create_user("carol", "carol@example.com")
+    memory_db.bulk_create_accounts((user.id, "savings", 1.0) for _ in range(20000))
+    stop = threading.Event()
+
+    def create_accounts():
+        while not stop.is_set():
+            memory_db.create_account(user.id, "savings", 1.0)
+
+    writer = threading.Thread(target=create_accounts)
+    writer.start()
+    try:
+        indexes = [memory_db.create_index("accounts", "account_type", kind)
+                   for kind in ("hash", "sorted", "bitmap")]
+    finally:
+        stop.set()
+        writer.join()
+    expected = {account.id for account in memory_db.get_all_accounts()}
+    for index in indexes:
+        assert index.find("savings") == expected
+
+
+def test_indexed_query_matches_scan(db):
+    user = db.create_user("dave", "dave@example.com")
+    for i in range(10):
+        db.create_account(user.id, ("savings", "checking")[i % 2], float(i + 1))
+    scanned = {a.id for a in BankQuery(db).accounts().filter_account_type("savings").execute()}
+    db.create_index("accounts", "account_type")
+    indexed = {a.id for a in BankQuery(db).accounts().filter_account_type("savings").execute()}
+    assert indexed == scanned
+
+
+@pytest.mark.parametrize("kind, field", [("hash", "account_type"), ("sorted", "balance"),
+                                         ("bitmap", "account_type"),
+                                         ("composite", ("user_id", "account_type"))],
+                         ids=["hash", "sorted", "bitmap", "composite"])
+def test_create_index_lets_writes_through_and_catches_up(kind, field):
+    storage = GatedStorage()
+    db = BankDatabase(storage=storage)
+    alice = db.create_user("alice", "alice@example.com")
+    bob = db.create_user("bob", "bob@example.com")
+    accounts = [db.create_account(user.id, account_type, 10.0)
+                for user in (alice, bob) for account_type in ("savings", "checking")]
+    created = []
+
+    def write():
+        db.create_account(alice.id, "business", 1.0)
+        db.deposit(accounts[0].id, 5.0)
+        db.delete_account(accounts[1].id)
+        db.delete_user(bob.id)
+
+    stalled = run_during_scan(
+        storage, lambda: created.append(db.create_index("accounts", field, kind)), write)
+    assert not stalled
+    expected = BankDatabase.INDEX_KINDS[kind](field)
+    expected.add_accounts(storage.get_all_accounts())
+    assert contents(created[0]) == contents(expected)
+    db.deposit(accounts[0].id, 1.0)
+    expected.clear()
+    expected.add_accounts(storage.get_all_accounts())
+    assert contents(created[0]) == contents(expected)
@@ -0,0 +1,110 @@
+import pytest
+
+from f5.demo import Account, BankDatabase, BankQuery, MappedStorage, User
+from f5.demo.mapped import np
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "accounts.bin")
+
+
+def test_accounts_survive_reopening(path):
+    storage = MappedStorage(path)
+    db = BankDatabase(storage=storage)
+    user = db.create_user("alice", "alice@example.com")
+    accounts = [db.create_account(user.id, ("savings", "checking")[i % 2], float(i))
+                for i in range(1, 6)]
+    db.deposit(accounts[0].id, 10.0)
+    db.delete_account(accounts[1].id)
+    expected = sorted(account.to_dict().items() for account in storage.get_all_accounts())
+    storage.close()
+
+    storage = MappedStorage(path)
+    try:
+        assert sorted(a.to_dict().items() for a in storage.get_all_accounts()) == expected
+        assert storage.get_account(accounts[0].id).balance == 11.0
+        assert storage.get_account(accounts[1].id) is None
+        assert sorted(a.id for a in storage.get_user_accounts(user.id)) == sorted(
+            a.id for a in accounts if a.id != accounts[1].id)
+    finally:
+        storage.close()
+
+
+def test_file_grows_past_initial_capacity(path):
+    storage = MappedStorage(path)
+    try:
+        saved = storage.save_accounts(Account(None, "1", "savings", float(i))
+                                      for i in range(5000))
+        assert storage.get_account(saved[-1].id).balance == 4999.0
+        assert len(storage.get_all_accounts()) == 5000
+    finally:
+        storage.close()
+
+
+def test_rejects_other_files(tmp_path):
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"not an account file" * 10)
+    with pytest.raises(ValueError):
+        MappedStorage(str(other))
+
+
+def test_ownership_changes_update_user_accounts(path):
+    storage = MappedStorage(path)
+    try:
+        account = storage.save_account(Account(None, "1", "savings", 1.0))
+        assert [a.id for a in storage.get_user_accounts("1")] == [account.id]
+        storage.get_account(account.id).user_id = "2"
+        assert storage.get_user_accounts("1") == []
+        assert [a.id for a in storage.get_user_accounts("2")] == [account.id]
+    finally:
+        storage.close()
+
+
+def test_user_accounts_match_any_id_spelling(path):
+    storage = MappedStorage(path)
+    try:
+        account = storage.save_account(Account(None, 1, "savings", 1.0))
+        storage.get_account(account.id).user_id = 2
+        storage.save_account(Account(None, "2", "checking", 2.0))
+        assert storage.get_user_accounts("1") == []
+        assert len(storage.get_user_accounts("2")) == len(storage.get_user_accounts(2)) == 2
+        storage.users.save_user(User("2", "bob", "bob@example.com"))
+        assert storage.delete_user("2")
+        assert storage.get_all_accounts() == []
+    finally:
+        storage.close()
+
+
+def test_header_is_written_when_it_grows_or_on_flush(path, monkeypatch):
+    storage = MappedStorage(path)
+    writes = []
+    write_header = storage._write_header
+    monkeypatch.setattr(storage, "_write_header", lambda: writes.append(write_header()))
+    for i in range(100):
+        storage.save_account(Account(None, "1", ("savings", "checking")[i % 2], float(i)))
+    assert len(writes) == 2  # One per new account type
+    storage.close()
+    assert len(writes) == 3
+
+    storage = MappedStorage(path)
+    try:
+        assert len(storage.get_all_accounts()) == 100
+    finally:
+        storage.close()
+
+
+@pytest.mark.skipif(np is None, reason="needs NumPy")
+def test_pushed_filters_and_totals(path):
+    storage = MappedStorage(path)
+    db = BankDatabase(storage=storage)
+    try:
+        user = db.create_user("alice", "alice@example.com")
+        for i in range(1, 11):
+            db.create_account(user.id, ("savings", "checking")[i % 2], float(i))
+        query = BankQuery(db).accounts().filter_account_type("savings").filter_min_balance(5.0)
+        assert "STORAGE FILTER" in query.explain()
+        assert sorted(a.balance for a in query.execute()) == [6.0, 8.0, 10.0]
+        assert storage.total_balance_by_type() == {"savings": 30.0, "checking": 25.0}
+    finally:
+        storage.close()
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import f5.demo.query as query_module
+from f5.demo import Account, BankDatabase, BankQuery
+from f5.demo.parallel import fork_available, parallel_count, parallel_scan
+
+pytestmark = pytest.mark.skipif(not fork_available(), reason="needs fork")
+
+CONDITIONS = [("account_type", "=", "savings"), ("balance", ">", 20.0)]
+
+
+@pytest.fixture
+def accounts():
+    rng = random.Random(7)
+    return [Account(str(i), str(i % 5), rng.choice(["savings", "checking"]),
+                    float(rng.randrange(0, 50))) for i in range(1, 400)]
+
+
+def sequential(accounts, reverse=False):
+    matches = [a for a in accounts if a.account_type == "savings" and a.balance > 20.0]
+    return sorted(matches, key=lambda a: (a.balance, a.id), reverse=reverse)
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("stop", [None, 7])
+def test_parallel_scan_matches_sequential_order(accounts, reverse, stop):
+    result = parallel_scan(accounts, CONDITIONS, 3, "balance", reverse, stop)
+    assert [a.id for a in result] == [a.id for a in sequential(accounts, reverse)[:stop]]
+
+
+def test_unsorted_scan_keeps_collection_order(accounts):
+    result = parallel_scan(accounts, CONDITIONS, 3)
+    expected = [a.id for a in accounts if a.account_type == "savings" and a.balance > 20.0]
+    assert [a.id for a in result] == expected
+
+
+def test_parallel_count(accounts):
+    assert parallel_count(accounts, CONDITIONS, 3) == len(sequential(accounts))
+    assert parallel_count(accounts, CONDITIONS, 3, stop=5) == 5
+
+
+def test_query_results_match_without_parallel(monkeypatch, accounts):
+    db = BankDatabase()
+    user = db.create_user("alice", "alice@example.com")
+    db.bulk_create_accounts((user.id, a.account_type, a.balance) for a in accounts)
+    monkeypatch.setattr(query_module, "PARALLEL_MIN_RECORDS", 10)
+
+    def build():
+        return (BankQuery(db).accounts().filter_account_type("savings")
+                .filter_min_balance(21.0).sort_by("balance", reverse=True).skip(3).limit(10))
+
+    expected = [a.id for a in build().execute()]
+    assert "processes" in build().parallel(2).explain()
+    assert [a.id for a in build().parallel(2).execute()] == expected
+    assert build().parallel(2).count() == build().count()
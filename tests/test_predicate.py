@@ -0,0 +1,82 @@
+import itertools
+import operator
+import random
+
+import pytest
+
+from f5.demo import Account, Record, User
+from f5.demo.predicate import _build, compile_bank_conditions, compile_record_conditions
+
+
+COMPARISONS = {">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+
+
+def bank_reference(record, conditions):
+    """BankQuery's original condition-by-condition interpretation."""
+    for field, op, value in conditions:
+        actual = getattr(record, field, None)
+        if op == "=" and actual != value:
+            return False
+        if op == "!=" and actual == value:
+            return False
+        if op in COMPARISONS and not (actual and COMPARISONS[op](actual, value)):
+            return False
+        if op == "contains" and not (
+                actual and isinstance(actual, str) and value.lower() in actual.lower()):
+            return False
+    return True
+
+
+ACCOUNT_CONDITIONS = [
+    ("account_type", "=", "savings"),
+    ("account_type", "!=", "checking"),
+    ("balance", ">", 50.0),
+    ("balance", "<", 80.0),
+    ("balance", ">=", 0.0),
+    ("balance", "<=", 100.0),
+    ("account_type", "contains", "SAV"),
+    ("user_id", "=", "2"),
+]
+
+
+def test_bank_predicates_match_reference():
+    rng = random.Random(3)
+    accounts = [Account(str(i), str(rng.randrange(1, 4)), rng.choice(["savings", "checking"]),
+                        rng.choice([0.0, 25.0, 50.0, 75.0, 100.0]))
+                for i in range(1, 60)]
+    for size in (0, 1, 2, 3):
+        for conditions in itertools.combinations(ACCOUNT_CONDITIONS, size):
+            predicate = compile_bank_conditions(list(conditions))
+            for account in accounts:
+                assert predicate(account) == bank_reference(account, conditions), conditions
+
+
+def test_record_predicates():
+    record = Record({"name": "alice", "age": 30, "tags": "a,b"}, "1")
+    assert compile_record_conditions([("name", "starts_with", "al"),
+                                      ("age", ">", 18)])(record)
+    assert compile_record_conditions([("age", "in", (30, 31))])(record)
+    assert not compile_record_conditions([("name", "ends_with", "x")])(record)
+    assert not compile_record_conditions([("missing", "contains", "a")])(record)
+    assert compile_record_conditions([("tags", "contains", "b")])(record)
+
+
+def test_unknown_operators_never_reject():
+    account = Account("1", "1", "savings", 1.0)
+    assert compile_bank_conditions([("balance", "~", 5)])(account)
+
+
+def test_shapes_are_compiled_once():
+    conditions = [("balance", ">", 1.0), ("account_type", "=", "x-unique-shape")]
+    compile_bank_conditions(conditions)
+    hits = _build.cache_info().hits
+    predicate = compile_bank_conditions([("balance", ">", 5.0),
+                                         ("account_type", "=", "x-unique-shape")])
+    assert _build.cache_info().hits == hits + 1
+    assert not predicate(Account("1", "1", "x-unique-shape", 2.0))
+    assert predicate(Account("1", "1", "x-unique-shape", 6.0))
+
+
+@pytest.mark.parametrize("value", ["ALICE", "alice", "Lic"])
+def test_contains_is_case_insensitive(value):
+    assert compile_bank_conditions([("name", "contains", value)])(User("1", "Alice", "a@x"))
@@ -0,0 +1,67 @@
+import pytest
+
+from f5.demo import BankQuery
+
+
+@pytest.fixture
+def bank_layout():
+    return [[("savings", 10.0), ("checking", 20.0)], [("savings", 30.0)]]
+
+
+@pytest.fixture
+def cache(bank):
+    return bank.db.enable_query_cache(max_size=4)
+
+
+def savings(db):
+    return sorted(account.id for account in
+                  BankQuery(db).accounts().filter_account_type("savings").execute())
+
+
+def test_repeated_query_is_served_from_cache(bank, cache):
+    db = bank.db
+    first = savings(db)
+    hits = cache.stats()["hits"]
+    assert savings(db) == first
+    assert cache.stats()["hits"] == hits + 1
+
+
+def test_writes_invalidate_affected_results(bank, cache):
+    db, (alice, bob), accounts = bank
+    assert len(savings(db)) == 2
+    new = db.create_account(bob.id, "savings", 5.0)
+    assert new.id in savings(db)
+    db.delete_account(accounts[0].id)
+    assert accounts[0].id not in savings(db)
+    db.delete_user(bob.id)
+    assert savings(db) == []
+
+
+def test_updates_invalidate_sorted_and_filtered_queries(bank, cache):
+    db, (alice, bob), accounts = bank
+    richest = BankQuery(db).accounts().sort_by("balance", reverse=True).limit(1)
+    assert richest.execute()[0].id == accounts[2].id
+    rich = BankQuery(db).accounts().filter_min_balance(25.0)
+    assert [a.id for a in rich.execute()] == [accounts[2].id]
+    db.deposit(accounts[0].id, 100.0)
+    assert BankQuery(db).accounts().sort_by("balance", reverse=True).limit(1).execute()[0].id \
+        == accounts[0].id
+    assert sorted(a.id for a in BankQuery(db).accounts().filter_min_balance(25.0).execute()) \
+        == sorted([accounts[0].id, accounts[2].id])
+
+
+def test_unrelated_writes_keep_entries(bank, cache):
+    db, (alice, bob), accounts = bank
+    savings(db)
+    invalidations = cache.stats()["invalidations"]
+    db.deposit(accounts[1].id, 1.0)  # A checking account, outside the result
+    savings(db)
+    assert cache.stats()["invalidations"] == invalidations
+
+
+def test_cache_is_bounded(bank, cache):
+    db = bank.db
+    for minimum in range(10):
+        BankQuery(db).accounts().filter_min_balance(float(minimum)).execute()
+    assert cache.stats()["size"] == 4
+    assert cache.stats()["evictions"] >= 6
@@ -0,0 +1,73 @@
+import pytest
+
+from f5.demo import BankQuery
+
+
+@pytest.fixture
+def bank_layout():
+    return [[("savings", 10.0 * (i + 1)), ("checking" if i % 3 else "business", 5.0 * i)]
+            for i in range(6)]
+
+
+def run(db, build):
+    return sorted(account.id for account in build(BankQuery(db).accounts()).execute())
+
+
+QUERIES = {
+    "type": lambda q: q.filter_account_type("savings"),
+    "user and type": lambda q: q.filter_account_type("checking").filter_user_id("2"),
+    "balance range": lambda q: q.filter_min_balance(15.0).filter_max_balance(40.0),
+    "type and range": lambda q: q.filter_account_type("savings").filter_min_balance(30.0),
+}
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_indexed_results_match_scan(bank, name):
+    db = bank.db
+    scanned = run(db, QUERIES[name])
+    db.create_index("accounts", "account_type")
+    db.create_index("accounts", "user_id")
+    db.create_index("accounts", "balance", "sorted")
+    assert run(db, QUERIES[name]) == scanned
+
+
+def test_explain_uses_most_selective_index(bank):
+    db, users, _ = bank
+    db.create_index("accounts", "account_type")
+    db.create_index("accounts", "user_id")
+    query = BankQuery(db).accounts().filter_account_type("savings").filter_user_id(users[0].id)
+    lines = query.explain().splitlines()
+    assert lines[0] == "QUERY accounts"
+    assert lines[1].startswith(f"  INDEX LOOKUP accounts.user_id = {users[0].id!r}")
+    assert lines[2].startswith("  INTERSECT accounts.account_type = 'savings'")
+    assert [a.account_type for a in query.execute()] == ["savings"]
+
+
+def test_explain_without_index_scans(bank):
+    db = bank.db
+    plan = BankQuery(db).users().filter_name("user1").explain()
+    assert "FULL SCAN users" in plan
+    assert "FILTER name contains 'user1'" in plan
+
+
+def test_user_filter_uses_user_accounts_without_index(bank):
+    db, users, _ = bank
+    query = BankQuery(db).accounts().filter_user_id(users[1].id)
+    assert "USER ACCOUNTS" in query.explain()
+    assert len(query.execute()) == 2
+
+
+def test_count_first_and_exists(bank):
+    db = bank.db
+    db.create_index("accounts", "account_type")
+    query = BankQuery(db).accounts().filter_account_type("business")
+    assert query.count() == 2
+    assert query.exists()
+    assert query.first().account_type == "business"
+    assert not BankQuery(db).accounts().filter_account_type("loan").exists()
+
+
+def test_query_needs_a_type(bank):
+    db = bank.db
+    with pytest.raises(ValueError):
+        BankQuery(db).execute()
@@ -0,0 +1,49 @@
+import pickle
+
+import pytest
+
+from f5.demo import Account, User
+
+
+def test_records_have_no_instance_dict():
+    user = User("1", "alice", "alice@example.com")
+    account = Account("1", "1", "savings", 5.0)
+    for record in (user, account):
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.nickname = "x"
+
+
+def test_to_dict_and_str():
+    user = User("1", "alice", "alice@example.com", "1 main st")
+    assert user.to_dict() == {"id": "1", "name": "alice", "email": "alice@example.com",
+                              "address": "1 main st"}
+    account = Account("2", "1", "savings", 5.0)
+    assert account.to_dict() == {"id": "2", "user_id": "1", "account_type": "savings",
+                                 "balance": 5.0}
+    assert "alice" in str(user)
+
+
+def test_copy_is_independent():
+    account = Account("2", "1", "savings", 5.0)
+    copy = account.copy()
+    copy.balance = 9.0
+    assert type(copy) is Account
+    assert account.balance == 5.0
+    assert copy.to_dict() == {**account.to_dict(), "balance": 9.0}
+
+
+def test_records_pickle():
+    user = pickle.loads(pickle.dumps(User("1", "alice", "alice@example.com")))
+    assert user.to_dict()["name"] == "alice"
+
+
+def test_deposit_and_withdraw():
+    account = Account("1", "1", "savings", 10.0)
+    assert account.deposit(5.0) == 15.0
+    assert account.withdraw(15.0) == 0.0
+    with pytest.raises(ValueError):
+        account.withdraw(1.0)
+    with pytest.raises(ValueError):
+        account.deposit(0)
+    assert account.balance == 0.0
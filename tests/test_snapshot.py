@@ -0,0 +1,145 @@
+import gc
+import random
+import threading
+
+import pytest
+
+from f5.demo import BankQuery
+
+
+def make_bank(db, users=3, accounts_per_user=2):
+    created = [db.create_user(f"user{i}", f"user{i}@example.com") for i in range(users)]
+    accounts = [db.create_account(user.id, "checking" if j % 2 else "savings", 100.0 * (i + 1))
+                for i, user in enumerate(created) for j in range(accounts_per_user)]
+    return created, accounts
+
+
+def balances(reader):
+    return {account.id: account.balance for account in reader.get_all_accounts()}
+
+
+def test_snapshot_ignores_later_writes(db):
+    users, accounts = make_bank(db)
+    before = balances(db)
+    with db.snapshot() as snapshot:
+        db.deposit(accounts[0].id, 50.0)
+        db.withdraw(accounts[1].id, 25.0)
+        db.transfer(accounts[2].id, accounts[3].id, 10.0)
+        db.update_user(users[0].id, name="renamed")
+        assert balances(snapshot) == before
+        assert snapshot.get_account_balance(accounts[0].id) == before[accounts[0].id]
+        assert snapshot.get_user(users[0].id).name == "user0"
+        assert db.get_user(users[0].id).name == "renamed"
+        assert db.get_account_balance(accounts[0].id) == before[accounts[0].id] + 50.0
+
+
+def test_snapshot_sees_deleted_and_hides_created_records(db):
+    users, accounts = make_bank(db)
+    with db.snapshot() as snapshot:
+        db.delete_account(accounts[0].id)
+        new_user = db.create_user("late", "late@example.com")
+        new_account = db.create_account(new_user.id, "savings", 5.0)
+        assert snapshot.get_account(accounts[0].id).balance == 100.0
+        assert {a.id for a in snapshot.get_all_accounts()} == {a.id for a in accounts}
+        assert {a.id for a in snapshot.get_user_accounts(users[0].id)} == {
+            accounts[0].id, accounts[1].id}
+        assert snapshot.get_user(new_user.id) is None
+        assert snapshot.get_account(new_account.id) is None
+        assert len(snapshot.get_all_users()) == len(users)
+
+
+def test_snapshot_reads_are_detached_copies(db):
+    _, accounts = make_bank(db)
+    with db.snapshot() as snapshot:
+        copy = snapshot.get_account(accounts[0].id)
+        copy.balance = -1.0
+        assert db.get_account_balance(accounts[0].id) == 100.0
+        assert snapshot.get_account_balance(accounts[0].id) == 100.0
+
+
+def test_snapshot_query(db):
+    _, accounts = make_bank(db)
+    with db.snapshot() as snapshot:
+        db.deposit(accounts[1].id, 1000.0)
+        results = BankQuery(snapshot).accounts().sort_by("balance", reverse=True).limit(1).execute()
+        assert results[0].balance == 300.0
+    results = BankQuery(db).accounts().sort_by("balance", reverse=True).limit(1).execute()
+    assert results[0].id == accounts[1].id
+
+
+def test_versions_freed_on_close_and_collection(db):
+    _, accounts = make_bank(db)
+    snapshot = db.snapshot()
+    db.deposit(accounts[0].id, 1.0)
+    assert db._versions.version_count() > 0
+    snapshot.close()
+    assert db._versions.version_count() == 0
+    with pytest.raises(ValueError):
+        snapshot.get_all_accounts()
+
+    snapshot = db.snapshot()
+    db.deposit(accounts[0].id, 1.0)
+    del snapshot
+    gc.collect()
+    assert db._versions.version_count() == 0
+
+
+def test_repeated_writes_keep_one_version_per_epoch(memory_db):
+    _, accounts = make_bank(memory_db)
+    with memory_db.snapshot() as snapshot:
+        for _ in range(100):
+            memory_db.deposit(accounts[0].id, 1.0)
+        account = memory_db.create_account(accounts[0].user_id, "savings", 0.0)
+        memory_db.deposit(account.id, 1.0)
+        assert memory_db._versions.version_count() == 2
+        assert snapshot.get_account_balance(accounts[0].id) == 100.0
+        assert snapshot.get_account(account.id) is None
+
+
+def test_older_snapshot_keeps_its_versions(memory_db):
+    _, accounts = make_bank(memory_db)
+    first = memory_db.snapshot()
+    memory_db.deposit(accounts[0].id, 1.0)
+    second = memory_db.snapshot()
+    memory_db.deposit(accounts[0].id, 1.0)
+    second.close()
+    assert first.get_account_balance(accounts[0].id) == 100.0
+    first.close()
+
+
+def test_snapshot_total_is_consistent_under_concurrent_transfers(db):
+    _, accounts = make_bank(db, users=10, accounts_per_user=4)
+    ids = [account.id for account in accounts]
+    total = sum(balances(db).values())
+    stop = threading.Event()
+
+    def transfer(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            source, target = rng.sample(ids, 2)
+            try:
+                db.transfer(source, target, rng.randrange(1, 20))
+            except ValueError:
+                pass
+
+    def churn():
+        while not stop.is_set():
+            user = db.create_user("churn", "churn@example.com")
+            db.delete_user(user.id)
+
+    threads = [threading.Thread(target=transfer, args=(seed,)) for seed in range(3)]
+    threads.append(threading.Thread(target=churn))
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(30):
+            with db.snapshot() as snapshot:
+                first = balances(snapshot)
+                assert sum(first.values()) == pytest.approx(total)
+                assert balances(snapshot) == first
+                assert {user.id for user in snapshot.get_all_users()} >= {
+                    account.user_id for account in snapshot.get_all_accounts()}
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,83 @@
+import pytest
+
+from f5.demo import BankQuery, BankSortedIndex, User
+from f5.demo.parallel import fork_available, parallel_scan
+
+
+@pytest.fixture
+def users(db):
+    addresses = ["b street", None, "a street", "b street", None, "c street", None]
+    for i, address in enumerate(addresses):
+        db.create_user(f"user{i}", f"user{i}@example.com", address)
+    return db
+
+
+def ordered_ids(db, reverse=False, limit=None):
+    query = BankQuery(db).users().sort_by("address", reverse=reverse)
+    if limit is not None:
+        query = query.limit(limit)
+    return [user.id for user in query.execute()]
+
+
+def paged_ids(db, reverse=False, page=2):
+    ids, cursor = [], None
+    while True:
+        query = BankQuery(db).users().sort_by("address", reverse=reverse).limit(page)
+        if cursor is not None:
+            query = query.after(cursor)
+        results = query.execute()
+        if not results:
+            return ids
+        ids.extend(user.id for user in results)
+        cursor = query.cursor(results[-1])
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_ordered_index_keeps_records_without_value(users, reverse):
+    scanned = ordered_ids(users, reverse)
+    scanned_top = ordered_ids(users, reverse, limit=4)
+    scanned_pages = paged_ids(users, reverse)
+    users.create_index("users", "address", "sorted")
+    assert "ordered" in BankQuery(users).users().sort_by("address").explain().lower()
+    assert ordered_ids(users, reverse) == scanned
+    assert ordered_ids(users, reverse, limit=4) == scanned_top
+    assert paged_ids(users, reverse) == scanned
+    assert scanned_pages == scanned
+    assert len(scanned) == 7
+    values = [users.get_user(user_id).address for user_id in scanned]
+    if reverse:
+        values.reverse()
+    assert values[:3] == [None, None, None]
+
+
+def test_index_tracks_values_set_from_none(memory_db):
+    index = memory_db.create_index("users", "address", "sorted")
+    first = memory_db.create_user("a", "a@example.com", "x street")
+    second = memory_db.create_user("b", "b@example.com")
+    third = memory_db.create_user("c", "c@example.com")
+    assert list(index.ordered()) == [second.id, third.id, first.id]
+    memory_db.update_user(second.id, address="a street")
+    assert list(index.ordered()) == [third.id, second.id, first.id]
+    memory_db.delete_user(third.id)
+    assert list(index.ordered()) == [second.id, first.id]
+
+
+def test_range_and_top():
+    index = BankSortedIndex("address")
+    index.add_users([User(str(i), "n", "e", address) for i, address in
+                     enumerate(["d", None, "a", "c", "b"], start=1)])
+    assert index.range("b", "c") == ["5", "4"]
+    assert index.range(max_value="b", reverse=True) == ["5", "3"]
+    assert index.count_range("a") == 4
+    assert index.top(2) == ["1", "4"]
+    assert index.find("c") == {"4"}
+    assert list(index.ordered(after=(None, "2"))) == ["3", "5", "4", "1"]
+    assert list(index.ordered(reverse=True, after=("a", "3"))) == ["2"]
+
+
+@pytest.mark.skipif(not fork_available(), reason="needs fork")
+def test_parallel_scan_sorts_none_first():
+    records = [User(str(i), "n", "e", address) for i, address in
+               enumerate(["b", None, "a", None, "c"], start=1)]
+    result = parallel_scan(records, [], 2, sort_field="address")
+    assert [user.id for user in result] == ["2", "4", "3", "1", "5"]
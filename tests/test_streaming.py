@@ -0,0 +1,58 @@
+from f5.demo import BankDatabase, BankQuery, MemoryStorage
+
+
+class CountingStorage(MemoryStorage):
+    """MemoryStorage counting single-account reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_account(self, account_id):
+        self.reads += 1
+        return super().get_account(account_id)
+
+
+def make_db(accounts=50):
+    storage = CountingStorage()
+    db = BankDatabase(storage=storage)
+    user = db.create_user("alice", "alice@example.com")
+    db.bulk_create_accounts((user.id, "savings", float(i)) for i in range(1, accounts + 1))
+    db.create_index("accounts", "account_type")
+    storage.reads = 0
+    return db, storage
+
+
+def test_iter_fetches_only_what_is_consumed():
+    db, storage = make_db()
+    results = BankQuery(db).accounts().filter_account_type("savings").iter()
+    assert storage.reads == 0
+    first = [next(results) for _ in range(3)]
+    assert len(first) == 3
+    assert storage.reads == 3
+
+
+def test_first_and_exists_stop_early():
+    db, storage = make_db()
+    assert BankQuery(db).accounts().filter_account_type("savings").first() is not None
+    assert storage.reads == 1
+    storage.reads = 0
+    assert BankQuery(db).accounts().filter_account_type("savings").exists()
+    assert storage.reads == 1
+
+
+def test_limit_and_skip():
+    db, _ = make_db(10)
+    query = BankQuery(db).accounts().sort_by("balance").skip(2).limit(3)
+    assert [account.balance for account in query.execute()] == [3.0, 4.0, 5.0]
+    assert [account.balance for account in query.iter()] == [3.0, 4.0, 5.0]
+    query = BankQuery(db).accounts().sort_by("balance", reverse=True).limit(2)
+    assert [account.balance for account in query.execute()] == [10.0, 9.0]
+    assert BankQuery(db).accounts().skip(8).count() == 2
+    assert BankQuery(db).accounts().limit(0).execute() == []
+
+
+def test_count_matches_execute():
+    db, _ = make_db(20)
+    query = BankQuery(db).accounts().filter_min_balance(5.0).filter_max_balance(12.0)
+    assert query.count() == len(query.execute()) == 8
@@ -0,0 +1,68 @@
+import pytest
+
+from f5.demo import BankQuery, BankTextIndex, User
+
+NAMES = ["Alice Smith", "alicia keys", "Bob", "Al", "Malice", "Zed", None]
+
+
+@pytest.fixture
+def index():
+    index = BankTextIndex("name")
+    index.add_users([User(str(i), name, f"{i}@example.com")
+                     for i, name in enumerate(NAMES, start=1)])
+    return index
+
+
+def test_prefix_is_case_insensitive(index):
+    assert sorted(index.prefix("al")) == ["1", "2", "4"]
+    assert sorted(index.prefix("ALI")) == ["1", "2"]
+    assert index.count_prefix("al") == 3
+    assert list(index.prefix("q")) == []
+
+
+def test_search_candidates_contain_every_match(index):
+    for text in ("lic", "a", "ce s", "zed", "b"):
+        expected = {str(i) for i, name in enumerate(NAMES, start=1)
+                    if name and text.lower() in name.lower()}
+        assert expected <= set(index.search(text))
+
+
+def test_find_and_remove(index):
+    assert index.find("Bob") == {"3"}
+    assert index.find("bob") == set()  # Equality stays case-sensitive
+    assert index.remove("3", "Bob")
+    assert index.find("Bob") == set()
+    assert "3" not in set(index.search("bo"))
+
+
+@pytest.fixture
+def people(db):
+    for name in NAMES[:-1]:
+        db.create_user(name, f"{name.split()[0].lower()}@example.com")
+    return db
+
+
+QUERIES = {
+    "name prefix": lambda q: q.filter_name_prefix("al"),
+    "email prefix": lambda q: q.filter_email_prefix("ALI"),
+    "email contains": lambda q: q.filter_email_contains("lic"),
+}
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_indexed_text_queries_match_scan(people, name):
+    scanned = sorted(u.id for u in QUERIES[name](BankQuery(people).users()).execute())
+    people.create_index("users", "name", "text")
+    people.create_index("users", "email", "text")
+    query = QUERIES[name](BankQuery(people).users())
+    assert "INDEX LOOKUP" in query.explain()
+    assert sorted(u.id for u in query.execute()) == scanned
+    assert scanned
+
+
+def test_index_follows_renames(people):
+    index = people.create_index("users", "name", "text")
+    bob = next(user for user in people.get_all_users() if user.name == "Bob")
+    people.update_user(bob.id, name="Albert")
+    assert bob.id in set(index.prefix("alb"))
+    assert bob.id not in set(index.prefix("bob"))
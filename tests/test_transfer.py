@@ -0,0 +1,135 @@
+import random
+import threading
+
+import pytest
+
+from f5.demo import BankDatabase, MemoryStorage, TransferEngine
+
+
+class RecordingStorage(MemoryStorage):
+    """MemoryStorage that records saves and can fail one of them."""
+
+    def __init__(self):
+        super().__init__()
+        self.saved = []
+        self.fail_on = None  # Account ID whose next save raises
+
+    def save_account(self, account):
+        if self.fail_on is not None and account.id == self.fail_on:
+            self.fail_on = None
+            raise OSError("disk full")
+        self.saved.append(account.id)
+        return super().save_account(account)
+
+
+class InterleavingStorage(MemoryStorage):
+    """MemoryStorage that can run a callback in the middle of an account read."""
+
+    def __init__(self):
+        super().__init__()
+        self.on_read = None  # Called once, by the next get_account()
+
+    def get_account(self, account_id):
+        account = super().get_account(account_id)
+        callback, self.on_read = self.on_read, None
+        if callback is not None:
+            callback()
+        return account
+
+
+@pytest.fixture
+def recorded():
+    storage = RecordingStorage()
+    db = BankDatabase(storage=storage)
+    user = db.create_user("alice", "alice@example.com")
+    source = db.create_account(user.id, "checking", 100.0)
+    target = db.create_account(user.id, "savings", 10.0)
+    storage.saved.clear()
+    return db, storage, source, target
+
+
+def test_transfer_moves_money(db):
+    user = db.create_user("alice", "alice@example.com")
+    source = db.create_account(user.id, "checking", 100.0)
+    target = db.create_account(user.id, "savings", 10.0)
+    assert db.transfer(source.id, target.id, 30.0) == (70.0, 40.0)
+    assert db.get_account_balance(source.id) == 70.0
+    assert db.get_account_balance(target.id) == 40.0
+
+
+def test_rejected_transfer_writes_nothing(recorded):
+    db, storage, source, target = recorded
+    with pytest.raises(ValueError, match="Insufficient funds"):
+        db.transfer(source.id, target.id, 1000.0)
+    with pytest.raises(ValueError):
+        db.transfer(source.id, target.id, -5.0)
+    assert storage.saved == []
+    assert db.get_account_balance(source.id) == 100.0
+    assert db.get_account_balance(target.id) == 10.0
+
+
+def test_failed_save_rolls_back_saved_accounts_only(recorded):
+    db, storage, source, target = recorded
+    storage.fail_on = target.id
+    with pytest.raises(OSError):
+        db.transfer(source.id, target.id, 30.0)
+    assert storage.saved == [source.id, source.id]
+    assert db.get_account_balance(source.id) == 100.0
+    assert db.get_account_balance(target.id) == 10.0
+
+
+def test_engine_conserves_money_under_concurrency(db):
+    user = db.create_user("alice", "alice@example.com")
+    ids = [db.create_account(user.id, "checking", 100.0).id for _ in range(8)]
+    rng = random.Random(1)
+    transfers = [(*rng.sample(ids, 2), rng.randrange(1, 150)) for _ in range(2000)]
+    result = TransferEngine(db, workers=4).run(transfers)
+    assert result["completed"] + result["failed"] == len(transfers)
+    assert all("Insufficient funds" in message for _, _, message in result["errors"])
+    assert sum(db.get_account_balance(account_id) for account_id in ids) == 800.0
+
+
+@pytest.mark.parametrize("delete", ["account", "user"])
+def test_delete_during_deposit_is_not_undone(delete):
+    storage = InterleavingStorage()
+    db = BankDatabase(storage=storage)
+    db.enable_aggregates()
+    index = db.create_index("accounts", "account_type")
+    user = db.create_user("alice", "alice@example.com")
+    account = db.create_account(user.id, "savings", 100.0)
+    db.create_account(db.create_user("bob", "bob@example.com").id, "savings", 1.0)
+    if delete == "account":
+        deleter = threading.Thread(target=db.delete_account, args=(account.id,))
+    else:
+        deleter = threading.Thread(target=db.delete_user, args=(user.id,))
+
+    def start_delete():
+        # Runs inside deposit(), once it holds the lock and has read the account
+        deleter.start()
+        deleter.join(timeout=0.2)
+
+    storage.on_read = start_delete
+    assert db.deposit(account.id, 5.0) == 105.0
+    deleter.join()
+    assert db.get_account(account.id) is None
+    assert account.id not in index.find("savings")
+    assert db.check_aggregates() == []
+
+
+def test_engine_keeps_going_after_unexpected_errors(memory_db):
+    user = memory_db.create_user("alice", "alice@example.com")
+    ids = [memory_db.create_account(user.id, "checking", 100.0).id for _ in range(2)]
+    transfer = memory_db.transfer
+
+    def flaky_transfer(from_account_id, to_account_id, amount):
+        if amount == 7:
+            raise KeyError(from_account_id)
+        return transfer(from_account_id, to_account_id, amount)
+
+    memory_db.transfer = flaky_transfer
+    transfers = [(ids[0], ids[1], 7 if i % 5 == 0 else 1) for i in range(50)]
+    result = TransferEngine(memory_db, workers=2).run(transfers)
+    assert result["failed"] == 10
+    assert result["completed"] == 40
+    assert all(message.startswith("KeyError") for _, _, message in result["errors"])
+    assert memory_db.get_account_balance(ids[1]) == 140.0
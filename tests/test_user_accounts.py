@@ -0,0 +1,63 @@
+from f5.demo import Account, BankDatabase, FileStorage
+
+
+def by_user(storage, user_id):
+    return sorted(account.id for account in storage.get_user_accounts(user_id))
+
+
+def scanned(storage, user_id):
+    return sorted(account.id for account in storage.get_all_accounts()
+                  if account.user_id == user_id)
+
+
+def test_user_accounts_follow_writes(db):
+    alice = db.create_user("alice", "alice@example.com")
+    bob = db.create_user("bob", "bob@example.com")
+    first = db.create_account(alice.id, "savings", 1.0)
+    second = db.create_account(alice.id, "checking", 2.0)
+    db.bulk_create_accounts([(bob.id, "savings", 3.0), (bob.id, "savings", 4.0)])
+    for user in (alice, bob):
+        assert by_user(db.storage, user.id) == scanned(db.storage, user.id)
+    assert by_user(db.storage, alice.id) == sorted([first.id, second.id])
+
+    db.delete_account(first.id)
+    assert by_user(db.storage, alice.id) == [second.id]
+    db.delete_user(bob.id)
+    assert by_user(db.storage, bob.id) == []
+    assert db.get_user_accounts("missing") == []
+
+
+def test_moving_an_account_to_another_user(memory_db):
+    alice = memory_db.create_user("alice", "alice@example.com")
+    bob = memory_db.create_user("bob", "bob@example.com")
+    account = memory_db.create_account(alice.id, "savings", 1.0)
+    memory_db.storage.save_account(Account(account.id, bob.id, "savings", 1.0))
+    assert by_user(memory_db.storage, alice.id) == []
+    assert by_user(memory_db.storage, bob.id) == [account.id]
+    memory_db.delete_user(alice.id)
+    assert memory_db.get_account(account.id) is not None
+
+
+def test_map_is_rebuilt_after_crash(tmp_path):
+    storage = FileStorage(str(tmp_path), sync_every=1)
+    db = BankDatabase(storage=storage)
+    alice = db.create_user("alice", "alice@example.com")
+    bob = db.create_user("bob", "bob@example.com")
+    kept = db.create_account(alice.id, "savings", 1.0)
+    dropped = db.create_account(alice.id, "checking", 2.0)
+    db.create_account(bob.id, "savings", 3.0)
+    db.delete_account(dropped.id)
+    storage.compact()
+    db.create_account(bob.id, "checking", 4.0)
+    db.delete_user(bob.id)
+    storage.sync()
+
+    # Reopen without closing, as after a crash
+    recovered = FileStorage(str(tmp_path))
+    try:
+        assert by_user(recovered, alice.id) == [kept.id]
+        assert by_user(recovered, bob.id) == []
+        assert scanned(recovered, bob.id) == []
+    finally:
+        recovered.close()
+        storage.close()